@@ -0,0 +1,106 @@
+"""Deterministic generator for synthetic MIDI files of different shapes.
+
+Every shape is produced from a seeded random generator, so the same
+arguments always yield byte-identical files.
+"""
+
+### System ###
+import io
+import random
+
+### Local ###
+from py_midicsv.midi.containers import Pattern, Track
+from py_midicsv.midi.events import *
+from py_midicsv.midi.fileio import FileWriter
+
+SYLLABLES = ["la", "na", "oh", "yeah", "ba", "by", "caf\u00e9", 'say "hi"', "back\\slash", "tab\tbed"]
+
+
+def end_track(track):
+    track.append(EndOfTrackEvent(tick=0))
+    return track
+
+
+def note_track(rng, events, channel=0, running_status=False):
+    track = Track()
+    track.append(TrackNameEvent(tick=0, data=list(f"Channel {channel}".encode())))
+    track.append(ProgramChangeEvent(tick=0, channel=channel, value=rng.randrange(128)))
+    for _ in range(events // 2):
+        pitch = rng.randrange(24, 108)
+        track.append(
+            NoteOnEvent(tick=rng.randrange(0, 24), channel=channel, pitch=pitch, velocity=rng.randrange(1, 128))
+        )
+        if running_status:
+            # note off as note on with velocity 0 keeps the status byte constant
+            track.append(NoteOnEvent(tick=rng.randrange(1, 240), channel=channel, pitch=pitch, velocity=0))
+        else:
+            track.append(NoteOffEvent(tick=rng.randrange(1, 240), channel=channel, pitch=pitch, velocity=64))
+    return end_track(track)
+
+
+def dense(rng, events):
+    tracks = [note_track(rng, events)]
+    for i in range(events // 20):
+        tracks[0].insert(2 + i * 20, ControlChangeEvent(tick=0, control=1, value=rng.randrange(128)))
+    return tracks, False
+
+
+def multitrack(rng, events, count=256):
+    tempo = Track([SetTempoEvent(tick=0, mpqn=500000), TimeSignatureEvent(tick=0, data=[4, 2, 24, 8])])
+    return [end_track(tempo)] + [note_track(rng, events // count, i % 16) for i in range(count - 1)], False
+
+
+def sysex(rng, events):
+    track = Track()
+    # payloads are large, so fewer but heavier events
+    for _ in range(events // 8):
+        payload = [rng.randrange(128) for _ in range(rng.randrange(16, 256))]
+        track.append(SysexEvent(tick=rng.randrange(0, 48), data=[*payload, 0xF7]))
+    return [end_track(track)], False
+
+
+def lyrics(rng, events):
+    track = Track([TextMetaEvent(tick=0, data=list(("Lorem ipsum dolor sit amet " * 40).encode()))])
+    for _ in range(events // 3):
+        syllable = rng.choice(SYLLABLES).encode("latin-1", "replace")
+        pitch = rng.randrange(48, 84)
+        track.append(LyricsEvent(tick=rng.randrange(0, 120), data=list(syllable)))
+        track.append(NoteOnEvent(tick=0, pitch=pitch, velocity=100))
+        track.append(NoteOffEvent(tick=rng.randrange(1, 120), pitch=pitch, velocity=0))
+    return [end_track(track)], False
+
+
+def running_status(rng, events):
+    return [note_track(rng, events, 9, running_status=True)], True
+
+
+SHAPES = {
+    "dense": dense,
+    "multitrack": multitrack,
+    "sysex": sysex,
+    "lyrics": lyrics,
+    "running_status": running_status,
+}
+
+
+def generate_pattern(shape, events=100_000, seed=0):
+    """Builds the Pattern for one of the SHAPES with roughly `events` events.
+
+    Returns:
+        The Pattern and whether it is meant to be written with running status.
+    """
+    tracks, use_running_status = SHAPES[shape](random.Random(seed), events)
+    return Pattern(tracks=tracks, resolution=480, format=1), use_running_status
+
+
+def generate(shape, events=100_000, seed=0):
+    """Returns the bytes of a synthetic MIDI file of the given shape."""
+    pattern, use_running_status = generate_pattern(shape, events, seed)
+    previous = Pattern.useRunningStatus
+    Pattern.useRunningStatus = use_running_status
+    try:
+        out = io.BytesIO()
+        FileWriter(out).write(pattern)
+    finally:
+        Pattern.useRunningStatus = previous
+    return out.getvalue()
@@ -0,0 +1,142 @@
+"""Throughput benchmarks for the conversion paths.
+
+Generates the synthetic corpus from `corpus.py` into a temporary directory
+and times each case on each shape, reporting events per second and the
+peak memory allocated during the run.
+
+Usage:
+    python -m benchmarks.run [--events N] [--repeat N] [--shape NAME] [--case NAME] [--json]
+"""
+
+### System ###
+import argparse
+import gc
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+### Local ###
+from py_midicsv.csvmidi import encode
+from py_midicsv.csvmidi import parse as csv_to_midi
+from py_midicsv.midi import codec
+from py_midicsv.midi.containers import Pattern
+from py_midicsv.midi.fileio import FileReader, FileWriter, MidiIndex, Trackiter, read_midifile
+from py_midicsv.midicsv import parse as midi_to_csv
+
+from .corpus import SHAPES, generate
+
+
+def run_cli(command, source, destination):
+    script = f"import sys; from py_midicsv.cli import {command}; sys.exit({command}())"
+    subprocess.run([sys.executable, "-c", script, source, destination], check=True)
+
+
+def prepare(files):
+    """Builds the inputs of every case for one corpus file."""
+    rows = midi_to_csv(files["midi"])
+    with open(files["csv"], "w") as f:
+        f.writelines(rows)
+    with MidiIndex(files["midi"]) as index:
+        bodies = [index.read_track_data(track) for track in range(len(index))]
+    return {"rows": rows, "pattern": read_midifile(files["midi"], True), "bodies": bodies}
+
+
+def decode_offsets(bodies, native=False):
+    """Decodes track bodies by offset with `iter_trackbuffer`, with or without the accelerator."""
+    enabled = codec.NATIVE
+    codec.NATIVE = native and enabled
+    try:
+        return [list(FileReader().iter_trackbuffer(body)) for body in bodies]
+    finally:
+        codec.NATIVE = enabled
+
+
+def decode_bytewise(bodies):
+    """Decodes the same track bodies byte by byte with `parse_midi_event` over a `Trackiter`."""
+    return [list(FileReader().iter_trackdata(Trackiter(body))) for body in bodies]
+
+
+CASES = {
+    "midicsv.parse": lambda files, data: midi_to_csv(files["midi"]),
+    "decode.trackiter": lambda files, data: decode_bytewise(data["bodies"]),
+    "decode.offsets": lambda files, data: decode_offsets(data["bodies"]),
+    "decode.native": lambda files, data: decode_offsets(data["bodies"], native=True),
+    "csvmidi.parse": lambda files, data: csv_to_midi(data["rows"]),
+    "csvmidi.encode": lambda files, data: encode(data["rows"]),
+    "FileWriter.write": lambda files, data: FileWriter(io.BytesIO()).write(data["pattern"]),
+    "cli.midicsv": lambda files, data: run_cli("midicsv", files["midi"], files["out"]),
+    "cli.csvmidi": lambda files, data: run_cli("csvmidi", files["csv"], files["out"]),
+}
+
+
+def measure(case, files, data, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        CASES[case](files, data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    if case.startswith("cli."):
+        # the CLI runs in a child process, this is the largest resident set
+        # size of any child so far, so run CLI cases on their own for exact numbers
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        # reported in bytes on macOS, in kilobytes elsewhere
+        if sys.platform != "darwin":
+            peak *= 1024
+    else:
+        tracemalloc.start()
+        CASES[case](files, data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000, help="Approximate events per corpus file.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case, the best one is reported.")
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="Only run these shapes.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only run these cases.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for shape in args.shape or SHAPES:
+            files = {name: os.path.join(tmp, f"{shape}.{name}") for name in ("midi", "csv", "out")}
+            with open(files["midi"], "wb") as f:
+                f.write(generate(shape, args.events))
+            Pattern.useRunningStatus = True
+            data = prepare(files)
+            events = sum(len(track) for track in data["pattern"])
+            for case in args.case or CASES:
+                seconds, peak = measure(case, files, data, args.repeat)
+                results.append(
+                    {
+                        "shape": shape,
+                        "case": case,
+                        "events": events,
+                        "seconds": seconds,
+                        "events_per_second": events / seconds,
+                        "peak_memory": peak,
+                    }
+                )
+                if not args.json:
+                    print(
+                        f"{shape:>15} {case:>17} {events:>9} events {seconds:8.3f}s "
+                        f"{events / seconds:>12,.0f} ev/s {peak / 2**20:9.1f} MiB"
+                    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
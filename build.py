@@ -0,0 +1,36 @@
+### System ###
+import sys
+
+from setuptools import Distribution, Extension
+from setuptools.command.build_ext import build_ext
+
+# The accelerator is optional: when it cannot be compiled the package falls
+# back to the pure-Python implementation in py_midicsv/midi/codec.py.
+extensions = [Extension("py_midicsv.midi._codec", ["py_midicsv/midi/_codec.c"])]
+
+
+class OptionalBuildExt(build_ext):
+    def run(self):
+        try:
+            super().run()
+        except Exception as e:
+            print(f"Warning: not building the C accelerator ({e})", file=sys.stderr)
+
+    def build_extension(self, ext):
+        try:
+            super().build_extension(ext)
+        except Exception as e:
+            print(f"Warning: not building {ext.name} ({e})", file=sys.stderr)
+
+
+def build(setup_kwargs):
+    """Hook called by poetry to add the C extension to the build."""
+    setup_kwargs.update(ext_modules=extensions, cmdclass={"build_ext": OptionalBuildExt})
+
+
+if __name__ == "__main__":
+    # build the extension in place for development: python build.py
+    command = OptionalBuildExt(Distribution({"ext_modules": extensions}))
+    command.inplace = True
+    command.ensure_finalized()
+    command.run()
@@ -1,3 +1,34 @@
-from .csvmidi import parse as csv_to_midi  # noqa: F401
-from .midi.fileio import FileReader, FileWriter  # noqa: F401
-from .midicsv import parse as midi_to_csv  # noqa: F401
+### System ###
+from importlib import import_module
+
+# The public API is imported on first access, so that importing the package
+# (e.g. for the command line tools) does not load every converter up front.
+EXPORTS = {
+    "csv_to_midi_bytes": ("csvmidi", "encode"),
+    "csv_to_midi": ("csvmidi", "parse"),
+    "FileReader": ("midi.fileio", "FileReader"),
+    "FileWriter": ("midi.fileio", "FileWriter"),
+    "iter_midi_to_csv": ("midicsv", "iter_parse"),
+    "midi_to_csv": ("midicsv", "parse"),
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name):
+    if name in EXPORTS:
+        module, attribute = EXPORTS[name]
+        value = getattr(import_module(f".{module}", __name__), attribute)
+        globals()[name] = value
+        return value
+    # submodules like `py_midicsv.midicsv` used to be loaded by the package
+    try:
+        return import_module(f".{name}", __name__)
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted({*globals(), *EXPORTS})
@@ -0,0 +1,205 @@
+### System ###
+import asyncio
+import codecs
+import io
+from struct import pack, unpack
+
+### Local ###
+from .csvmidi import RowEncoder
+from .midi.constants import DEFAULT_READ_BLOCK_SIZE
+from .midi.fileio import FileReader
+from .midicsv import FORMAT_BATCH_SIZE, iter_track_rows
+
+
+class ChunkReader:
+    """Reads from an `asyncio.StreamReader` or an async iterator of byte chunks.
+
+    Args:
+        source: An object with `read`/`readexactly` coroutines like
+                `asyncio.StreamReader`, or an async iterable of bytes.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.buffer = bytearray()
+        self.chunks = None if hasattr(source, "readexactly") else source.__aiter__()
+
+    async def next_chunk(self):
+        if self.chunks is None:
+            return await self.source.read(DEFAULT_READ_BLOCK_SIZE)
+        try:
+            return bytes(await self.chunks.__anext__())
+        except StopAsyncIteration:
+            return b""
+
+    async def read_chunk(self):
+        """Returns whatever data is available next, an empty bytes object at the end of the stream."""
+        if self.buffer:
+            data = bytes(self.buffer)
+            self.buffer.clear()
+            return data
+        return await self.next_chunk()
+
+    async def read(self, size):
+        """Reads `size` bytes, fewer only if the stream ends before."""
+        if self.chunks is None and not self.buffer:
+            try:
+                return await self.source.readexactly(size)
+            except asyncio.IncompleteReadError as e:
+                return e.partial
+        while len(self.buffer) < size:
+            chunk = await self.next_chunk()
+            if not chunk:
+                break
+            self.buffer += chunk
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    async def iter_records(self, encoding="utf-8"):
+        """Yields lists of complete CSV lines as they arrive.
+
+        Lines are only handed out once every quoted field in them is closed,
+        so a row spanning several lines is never split between two lists.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        # pieces of the line after the last newline
+        partial = []
+        # complete lines of a row whose quotes are still open, and whether they are
+        held = []
+        quoted = False
+        while True:
+            chunk = await self.read_chunk()
+            lines = decoder.decode(chunk, final=not chunk).split("\n")
+            if len(lines) > 1:
+                lines[0] = "".join(partial) + lines[0]
+                partial.clear()
+            partial.append(lines.pop())
+            start = len(held)
+            held.extend(line + "\n" for line in lines)
+            if not chunk:
+                rest = "".join(partial)
+                if rest:
+                    held.append(rest)
+                if held:
+                    yield held
+                return
+            # only the lines that arrived with this chunk are scanned for quotes
+            complete = 0
+            for index in range(start, len(held)):
+                if held[index].count('"') % 2:
+                    quoted = not quoted
+                if not quoted:
+                    complete = index + 1
+            if complete:
+                yield held[:complete]
+                held = held[complete:]
+
+
+async def parse_midi_stream(source, strict=True):
+    """Parses a MIDI file arriving over a stream into CSV format.
+
+    Each track is converted as soon as its last byte has been received, so
+    memory use is bounded by the size of the largest track. Control is
+    returned to the event loop between batches of rows.
+
+    Args:
+        source: An `asyncio.StreamReader` or an async iterable of bytes.
+
+    Yields:
+        Strings, each containing one atomic MIDI command in CSV format,
+        identical to the output of `midicsv.iter_parse`.
+    """
+    stream = ChunkReader(source)
+    reader = FileReader()
+    magic = await stream.read(8)
+    padding = b""
+    if magic[:4] == b"MThd" and len(magic) == 8:
+        padding = await stream.read(max(unpack(">L", magic[4:])[0], 6))
+    pattern = reader.parse_file_header(io.BytesIO(magic + padding), strict)
+    yield f"0, 0, Header, {pattern.format}, {len(pattern)}, {pattern.resolution}\n"
+    for index in range(len(pattern)):
+        trksz = reader.parse_track_header(io.BytesIO(await stream.read(8)))
+        body = await stream.read(trksz)
+        rows = iter_track_rows(index + 1, reader.iter_trackbuffer(body, reader.basepos, strict))
+        for count, row in enumerate(rows, 1):
+            yield row
+            if count % FORMAT_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+        reader.basepos += trksz
+    yield "0, 0, End_of_file"
+
+
+class TrackChunks:
+    """Sink for a `RowEncoder` collecting every finished track as an MTrk chunk."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.chunks = []
+        self.tracks = 0
+        self.in_track = False
+
+    def start_track(self):
+        self.end_track()
+        self.tracks += 1
+        self.in_track = True
+
+    def flush(self):
+        # the chunk length is only known at the end of the track
+        pass
+
+    def end_track(self):
+        if self.in_track:
+            self.chunks.append(b"MTrk" + pack(">L", len(self.buffer)) + self.buffer)
+            self.buffer.clear()
+            self.in_track = False
+
+    def close(self, format, resolution):
+        self.end_track()
+
+    def take(self):
+        """Returns all finished chunks joined together and forgets them."""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+async def parse_csv_stream(source, encoding="utf-8", use_running_status=True):
+    """Parses a CSV file arriving over a stream into a MIDI file.
+
+    Each track is encoded and handed out as soon as the row starting the
+    next track has been received. Since the file header has to be sent
+    before the first track, the track count is taken from the CSV Header
+    row in that case, and only counted when the whole input arrived first.
+
+    Args:
+        source: An `asyncio.StreamReader` or an async iterable of bytes.
+        encoding: Text encoding of the CSV input.
+        use_running_status: Omit repeated status bytes of channel messages.
+                            Unlike `csvmidi.encode`, this does not depend on
+                            files read before, so concurrent conversions on
+                            the same event loop do not affect each other.
+
+    Yields:
+        Bytes objects, which concatenated form the MIDI file. For input
+        with a correct Header row this is identical to `csvmidi.encode`
+        writing with the same `use_running_status`.
+    """
+    sink = TrackChunks()
+    encoder = RowEncoder(sink, use_running_status=use_running_status)
+    header = encoder.header
+    sent_header = False
+    async for lines in ChunkReader(source).iter_records(encoding):
+        encoder.feed(lines)
+        if sink.chunks:
+            if not sent_header:
+                tracks = sink.tracks if encoder.declared_tracks is None else encoder.declared_tracks
+                yield b"MThd" + pack(">LHHH", 6, header.format, tracks, header.resolution)
+                sent_header = True
+            yield sink.take()
+        await asyncio.sleep(0)
+    encoder.close()
+    if not sent_header:
+        yield b"MThd" + pack(">LHHH", 6, header.format, sink.tracks, header.resolution)
+    if sink.chunks:
+        yield sink.take()
@@ -0,0 +1,159 @@
+### System ###
+import glob
+import os
+
+### Local ###
+from .csvmidi import write
+from .midicsv import iter_parse
+from .server import replacing
+
+MIDI_EXTENSIONS = (".mid", ".midi", ".smf", ".kar")
+CSV_EXTENSIONS = (".csv",)
+GLOB_CHARACTERS = ("*", "?", "[")
+
+
+def midi_to_csv_file(source, destination, strict=True):
+    with replacing(destination) as f:
+        f.writelines(row.encode() for row in iter_parse(source, strict))
+
+
+def csv_to_midi_file(source, destination, strict=True):
+    with replacing(destination) as f:
+        write(source, f, strict)
+
+
+def glob_root(pattern):
+    # the longest leading part of the pattern without any glob characters
+    parts = []
+    for part in pattern.split(os.sep):
+        if any(c in part for c in GLOB_CHARACTERS):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def mirrored_path(path, base=os.curdir):
+    """Returns the location of `path` below `base`, where its output goes in the mirrored tree.
+
+    Paths outside of `base` keep their full path from the filesystem root
+    instead, so that no output ends up outside of the output directory.
+    """
+    relpath = os.path.relpath(path, base)
+    if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+        relpath = os.path.splitdrive(os.path.abspath(path))[1].lstrip(os.sep)
+    return relpath
+
+
+def read_manifest(manifest):
+    """Reads a manifest file listing one input path per line.
+
+    Blank lines and lines starting with `#` are ignored, relative paths
+    are resolved against the directory of the manifest.
+    """
+    base = os.path.dirname(manifest)
+    with open(manifest) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield os.path.join(base, line)
+
+
+def collect_inputs(sources, manifests=(), extensions=MIDI_EXTENSIONS):
+    """Expands directories, globs and manifest files into input files.
+
+    Args:
+        sources: Paths to files or directories, or glob patterns.
+                 Directories are searched recursively for files with
+                 one of the given extensions.
+        manifests: Paths to manifest files, see `read_manifest`.
+        extensions: File extensions to pick up when searching directories.
+
+    Returns:
+        A list of (path, relative_path) tuples, where relative_path is the
+        location of the file below the directory or glob it was found in.
+        Files given directly are located relative to the current directory,
+        manifest entries relative to the directory of the manifest, see
+        `mirrored_path`.
+    """
+    inputs = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        path = os.path.join(root, name)
+                        inputs.append((path, os.path.relpath(path, source)))
+        elif any(c in source for c in GLOB_CHARACTERS):
+            root = glob_root(source)
+            for path in sorted(glob.glob(source, recursive=True)):
+                if os.path.isfile(path):
+                    inputs.append((path, os.path.relpath(path, root)))
+        else:
+            inputs.append((source, mirrored_path(source)))
+    for manifest in manifests:
+        for path in read_manifest(manifest):
+            inputs.append((path, mirrored_path(path, os.path.dirname(manifest))))
+    return inputs
+
+
+def convert_file(job):
+    """Runs a single conversion job inside a worker process.
+
+    Returns:
+        A (source, destination, error) tuple, where error is None on success
+        or a string describing the exception that occurred.
+    """
+    convert, source, destination, strict = job
+    try:
+        os.makedirs(os.path.dirname(destination) or os.curdir, exist_ok=True)
+        # the output of an earlier run is only replaced once the conversion has succeeded
+        convert(source, destination, strict)
+    except Exception as e:
+        return source, destination, f"{type(e).__name__}: {e}"
+    return source, destination, None
+
+
+def run_batch(inputs, output_dir, reverse=False, strict=True, workers=None, chunksize=1):
+    """Converts many files in parallel over a process pool.
+
+    Failures of single files are reported and do not abort the run.
+    Inputs whose output would be written to the same path as that of an
+    earlier input, e.g. `song.mid` and `song.midi`, are reported as failed
+    instead of overwriting it.
+
+    Args:
+        inputs: (path, relative_path) tuples as returned by `collect_inputs`.
+        output_dir: Directory in which the output tree mirrors the relative paths.
+        reverse: Convert CSV to MIDI instead of MIDI to CSV.
+        strict: Fail on parse/validation errors.
+        workers: Number of worker processes, defaults to the number of CPUs.
+        chunksize: Number of files handed to a worker at a time.
+
+    Yields:
+        A (source, destination, error) tuple for each input, in input order.
+    """
+    convert, extension = (csv_to_midi_file, ".mid") if reverse else (midi_to_csv_file, ".csv")
+    jobs = []
+    conflicts = {}
+    claimed = {}
+    for path, relpath in inputs:
+        destination = os.path.join(output_dir, os.path.splitext(relpath)[0] + extension)
+        key = os.path.normcase(os.path.abspath(destination))
+        if key in claimed:
+            conflicts[len(jobs)] = f"Output {destination} is written for {claimed[key]} already"
+        else:
+            claimed[key] = path
+        jobs.append((convert, path, destination, strict))
+    valid = [job for index, job in enumerate(jobs) if index not in conflicts]
+
+    def merge(results):
+        for index, (_, source, destination, _) in enumerate(jobs):
+            yield (source, destination, conflicts[index]) if index in conflicts else next(results)
+
+    if workers == 1:
+        yield from merge(map(convert_file, valid))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from merge(executor.map(convert_file, valid, chunksize=chunksize))
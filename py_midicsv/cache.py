@@ -0,0 +1,209 @@
+### System ###
+import hashlib
+import io
+import os
+import tempfile
+import zlib
+from functools import lru_cache
+
+### Local ###
+from .csvmidi import encode
+from .midi.constants import DEFAULT_READ_BLOCK_SIZE
+from .midicsv import parse
+
+DEFAULT_CACHE_SIZE = 1 << 30
+
+
+@lru_cache(maxsize=None)
+def library_version():
+    """Returns a fingerprint of the code of this package, used in every cache key.
+
+    It is derived from the package files themselves rather than the installed
+    version, so results are not reused by a checkout or editable install
+    whose code has changed since. The files are only read once per process.
+    """
+    digest = hashlib.blake2b(digest_size=10)
+    package = os.path.dirname(os.path.abspath(__file__))
+    for root, dirs, files in os.walk(package):
+        dirs[:] = sorted(name for name in dirs if name != "__pycache__")
+        for name in sorted(files):
+            if name.endswith((".py", ".c", ".so", ".pyd")):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, package).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """Persistent on-disk cache for conversion results.
+
+    Results are keyed by a hash of the input contents together with the
+    conversion options and the library version, and stored zlib-compressed
+    below `directory`. When the cache grows beyond `max_size` bytes the least
+    recently used entries are evicted.
+
+    The directory is scanned once to learn the size of the cache, after that
+    a running total is kept. Entries written by other processes are only
+    accounted for by the next scan, which happens on eviction.
+
+    Args:
+        directory: Directory holding the cache, created if missing.
+        max_size: Upper bound for the total size of all entries in bytes.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.version = library_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # number and total size of the entries, None until the directory is scanned
+        self.count = None
+        self.size = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self):
+        if self.size is None:
+            self.scan()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self.count,
+            "size": self.size,
+        }
+
+    def key(self, file, *options):
+        """Hashes the contents of `file` together with the given options.
+
+        Returns:
+            The hex digest and a source from which the contents can be read
+            again (the file rewound to its original position, or an in-memory
+            copy for unseekable streams).
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((self.version, *options)).encode())
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                self.update_digest(digest, f)
+            return digest.hexdigest(), file
+        if not file.seekable():
+            data = file.read()
+            file = io.StringIO(data) if isinstance(data, str) else io.BytesIO(data)
+        start = file.tell()
+        self.update_digest(digest, file)
+        file.seek(start)
+        return digest.hexdigest(), file
+
+    def update_digest(self, digest, file):
+        for block in iter(lambda: file.read(DEFAULT_READ_BLOCK_SIZE), file.read(0)):
+            digest.update(block.encode("utf-8", "surrogateescape") if isinstance(block, str) else block)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            self.misses += 1
+            return None
+        # mark as recently used for the LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            # evicted by another process in the meantime
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if self.size is None:
+            self.scan()
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(data, 1)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = None
+        os.replace(tmp, path)
+        if replaced is None:
+            self.count += 1
+            self.size += len(data)
+        else:
+            self.size += len(data) - replaced
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def scan(self):
+        entries = self.entries()
+        self.count = len(entries)
+        self.size = sum(size for _, _, size in entries)
+        return entries
+
+    def evict(self):
+        entries = sorted(self.scan())
+        for _, path, size in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.count -= 1
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, path, _ in self.entries():
+            os.remove(path)
+        self.count = self.size = 0
+
+    def midi_to_csv(self, file, strict=True, tracks=None, seconds=False, workers=1):
+        """Cached equivalent of `midicsv.parse`.
+
+        `workers` only affects how a file missing from the cache is decoded,
+        not the result, so it is not part of the key.
+        """
+        key, file = self.key(file, "midi_to_csv", strict, tracks, seconds)
+        data = self.get(key)
+        if data is not None:
+            return data.decode().splitlines(keepends=True)
+        rows = parse(file, strict, workers=workers, tracks=tracks, seconds=seconds)
+        self.put(key, "".join(rows).encode())
+        return rows
+
+    def csv_to_midi(self, file, strict=True, use_running_status=True):
+        """Cached equivalent of `csvmidi.encode`, returning the MIDI file as bytes.
+
+        Unlike `encode`, running status is not taken from `Pattern.useRunningStatus`,
+        which depends on the files decoded before, e.g. only on cache misses.
+        """
+        key, file = self.key(file, "csv_to_midi", strict, use_running_status)
+        data = self.get(key)
+        if data is not None:
+            return data
+        data = encode(file, strict, use_running_status)
+        self.put(key, data)
+        return data
@@ -1,20 +1,95 @@
+### System ###
+import io
+import json
+import sys
+from contextlib import ExitStack, contextmanager
+
 ### CLI ###
 import click
 
-from .csvmidi import parse as csv_to_midi
+# The converters are imported by the commands using them, so that starting
+# a command or printing its help does not load the whole package.
+
+CACHE_HELP = "Reuse results cached in this directory, --stats reports hits and misses."
+PROFILE_HELP = "Save a cProfile dump to this file, or collapsed stacks if it ends in .folded."
+# DEFAULT_SHARD_SIZE of py_midicsv.corpus, which is not imported up front
+SHARD_SIZE_HELP = "Approximate shard size in MiB.  [default: 256]"
+SOCKET_HELP = "Server socket (default: $MIDICSV_SOCKET, or py_midicsv-<uid>.sock in the temporary directory)."
+
+
+def print_stats(name, info):
+    if name == "summary":
+        print(json.dumps(info, indent=2), file=sys.stderr)
+
+
+@contextmanager
+def instrumented(input_file, output_file, stats=False, profile=None):
+    """Runs a conversion with the instrumentation asked for on the command line.
+
+    Yields:
+        The input and output file, wrapped to be measured if `stats` is set.
+    """
+    from .instrumentation import TimedFile, collect, profiling
+
+    with ExitStack() as stack:
+        if profile:
+            stack.enter_context(profiling(profile))
+        if stats:
+            collected = stack.enter_context(collect([print_stats]))
+            input_file = TimedFile(input_file, collected)
+            output_file = TimedFile(output_file, collected)
+        yield input_file, output_file
+
+
+def record_cache_stats(cache):
+    """Adds the hit and miss counts of `cache` to the --stats summary, if it is collected."""
+    from . import instrumentation
+
+    if instrumentation.current is not None:
+        instrumentation.current.cache = cache.stats
+
+
+def run_client(socket_path, convert, input_file, output_file):
+    """Runs a conversion on a server started with `serve`, for the client commands.
+
+    Args:
+        convert: Callable invoked as `convert(client, source, destination)`.
+        input_file: Path of the input, or "-" to send stdin along with the request.
+        output_file: Path of the output, or "-" to write the result to stdout.
+    """
+    from .server import Client, ServerError, default_socket_path
 
-### Local ###
-from .midi.fileio import FileWriter
-from .midicsv import parse as midi_to_csv
+    socket_path = socket_path or default_socket_path()
+    source = click.get_binary_stream("stdin").read() if input_file == "-" else input_file
+    destination = None if output_file == "-" else output_file
+    try:
+        client = Client(socket_path)
+    except OSError as e:
+        print(f"Cannot connect to the server at {socket_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    with client:
+        try:
+            result = convert(client, source, destination)
+        except ServerError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+    if destination is None:
+        click.get_binary_stream("stdout").write(result)
 
 
 @click.command()
 @click.option("-n", "--nostrict", is_flag=True, help="Do not fail on parse/validation errors.")
 @click.option("-u", "--usage", is_flag=True, help="Print usage information (NOOP)")
 @click.option("-v", "--verbose", is_flag=True, help="Print debug information (NOOP)")
+@click.option("-j", "--workers", default=1, type=click.IntRange(min=1), help="Decode tracks in this many processes.")
+@click.option("-t", "--track", multiple=True, type=click.IntRange(min=0), help="Only convert this track (0-based).")
+@click.option("-s", "--seconds", is_flag=True, help="Append the time of each event in seconds as a last column.")
+@click.option("--cache-dir", type=click.Path(file_okay=False), help=CACHE_HELP)
+@click.option("--stats", is_flag=True, help="Print timings, event counts and bytes read/written as JSON on stderr.")
+@click.option("--profile", type=click.Path(dir_okay=False), help=PROFILE_HELP)
 @click.argument("input_file", type=click.File("rb"))
 @click.argument("output_file", type=click.File("w"))
-def midicsv(usage, nostrict, verbose, input_file, output_file):
+def midicsv(usage, nostrict, verbose, workers, track, seconds, cache_dir, stats, profile, input_file, output_file):
     """Convert MIDI files to CSV files.
 
     midicsv reads a standard MIDI file and decodes it into a CSV file
@@ -31,8 +106,23 @@ def midicsv(usage, nostrict, verbose, input_file, output_file):
     Some arguments are kept for backwards-compatibility with the original midicsv tooling.
     These are marked as NOOP in this command line interface.
     """
-    csv_data = midi_to_csv(input_file, not nostrict)
-    output_file.writelines(csv_data)
+    from .midicsv import iter_parse as iter_midi_to_csv
+
+    tracks = list(track) if track else None
+    if (workers != 1 or tracks) and not input_file.seekable():
+        # tracks are located by seeking, so a stream like stdin is read into memory first
+        input_file = io.BytesIO(input_file.read())
+    with instrumented(input_file, output_file, stats, profile) as (input_file, output_file):
+        if cache_dir:
+            from .cache import ConversionCache
+
+            cache = ConversionCache(cache_dir)
+            output_file.writelines(cache.midi_to_csv(input_file, not nostrict, tracks, seconds, workers))
+            record_cache_stats(cache)
+        else:
+            output_file.writelines(
+                iter_midi_to_csv(input_file, not nostrict, workers=workers, tracks=tracks, seconds=seconds)
+            )
 
 
 @click.command()
@@ -41,9 +131,12 @@ def midicsv(usage, nostrict, verbose, input_file, output_file):
 @click.option("-v", "--verbose", is_flag=True, help="Print debug information (NOOP)")
 @click.option("-z", "--strict-csv", is_flag=True, help="Raise exceptions on CSV errors (NOOP)")
 @click.option("-x", "--no-compress", is_flag=True, help="Do not compress status bytes (NOOP)")
+@click.option("--cache-dir", type=click.Path(file_okay=False), help=CACHE_HELP)
+@click.option("--stats", is_flag=True, help="Print timings, event counts and bytes read/written as JSON on stderr.")
+@click.option("--profile", type=click.Path(dir_okay=False), help=PROFILE_HELP)
 @click.argument("input_file", type=click.File("r"))
 @click.argument("output_file", type=click.File("wb"))
-def csvmidi(usage, nostrict, verbose, strict_csv, no_compress, input_file, output_file):
+def csvmidi(usage, nostrict, verbose, strict_csv, no_compress, cache_dir, stats, profile, input_file, output_file):
     """Convert CSV files to MIDI files.
 
     csvmidi reads a CSV file in the format written by midicsv and creates
@@ -55,6 +148,206 @@ def csvmidi(usage, nostrict, verbose, strict_csv, no_compress, input_file, outpu
     Some arguments are kept for backwards-compatibility with the original csvmidi tooling.
     These are marked as NOOP in this command line interface.
     """
-    midi_data = csv_to_midi(input_file, not nostrict)
-    writer = FileWriter(output_file)
-    writer.write(midi_data)
+    from .csvmidi import write as write_midi
+
+    with instrumented(input_file, output_file, stats, profile) as (input_file, output_file):
+        if cache_dir:
+            from .cache import ConversionCache
+
+            cache = ConversionCache(cache_dir)
+            output_file.write(cache.csv_to_midi(input_file, not nostrict))
+            record_cache_stats(cache)
+        else:
+            write_midi(input_file, output_file, not nostrict)
+
+
+@click.command()
+@click.option("-n", "--nostrict", is_flag=True, help="Do not fail on parse/validation errors.")
+@click.option("-r", "--reverse", is_flag=True, help="Convert CSV files to MIDI files instead.")
+@click.option("-o", "--output-dir", required=True, type=click.Path(file_okay=False), help="Output directory.")
+@click.option(
+    "-m",
+    "--manifest",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="File listing one input path per line.",
+)
+@click.option("-j", "--workers", type=click.IntRange(min=1), help="Number of worker processes (default: CPU count).")
+@click.option(
+    "-c",
+    "--chunk-size",
+    default=16,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Files handed to a worker at a time.",
+)
+@click.argument("sources", nargs=-1)
+def batch(nostrict, reverse, output_dir, manifest, workers, chunk_size, sources):
+    """Convert many MIDI files to CSV files (or back) in parallel.
+
+    Each source can be a file, a directory (searched recursively) or a glob pattern.
+    Outputs are written to the output directory, mirroring the layout below
+    each source directory or glob.
+
+    Files that fail to convert are reported on stderr without aborting the run.
+    The exit code is 1 if any file failed.
+    """
+    from .batch import CSV_EXTENSIONS, MIDI_EXTENSIONS, collect_inputs, run_batch
+
+    extensions = CSV_EXTENSIONS if reverse else MIDI_EXTENSIONS
+    inputs = collect_inputs(sources, manifest, extensions)
+    failed = 0
+    for source, _, error in run_batch(inputs, output_dir, reverse, not nostrict, workers, chunk_size):
+        if error is not None:
+            failed += 1
+            print(f"{source}: {error}", file=sys.stderr)
+    print(f"Converted {len(inputs) - failed} of {len(inputs)} files.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+@click.command()
+@click.option("-n", "--nostrict", is_flag=True, help="Do not fail on parse/validation errors.")
+@click.option("-o", "--output-dir", required=True, type=click.Path(file_okay=False), help="Output directory.")
+@click.option(
+    "-m",
+    "--manifest",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="File listing one input path per line.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "shard_format",
+    default="csv",
+    show_default=True,
+    type=click.Choice(["csv", "parquet", "arrow", "feather", "npz"]),
+    help="Shard format.",
+)
+@click.option(
+    "-s",
+    "--shard-size",
+    type=click.IntRange(min=1),
+    help=SHARD_SIZE_HELP,
+)
+@click.option("--files-per-shard", type=click.IntRange(min=1), help="Maximum number of files in a shard.")
+@click.option("-j", "--workers", type=click.IntRange(min=1), help="Number of worker processes (default: CPU count).")
+@click.option(
+    "-c",
+    "--chunk-size",
+    default=16,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Files handed to a worker at a time.",
+)
+@click.argument("sources", nargs=-1)
+def corpus(nostrict, output_dir, manifest, shard_format, shard_size, files_per_shard, workers, chunk_size, sources):
+    """Convert a corpus of MIDI files into a few large shards.
+
+    Each source can be a file, a directory (searched recursively) or a glob pattern.
+    Every row of a shard is tagged with the id of the file it belongs to, and
+    manifest.jsonl in the output directory maps each id to its path, content hash,
+    shard, row range and event counts.
+
+    Files that fail to convert are recorded in the manifest and reported on stderr
+    without aborting the run. The exit code is 1 if any file failed.
+    """
+    from .batch import MIDI_EXTENSIONS, collect_inputs
+    from .corpus import DEFAULT_SHARD_SIZE, write_corpus
+
+    inputs = collect_inputs(sources, manifest, MIDI_EXTENSIONS)
+    entries = write_corpus(
+        inputs,
+        output_dir,
+        f".{shard_format}",
+        DEFAULT_SHARD_SIZE if shard_size is None else shard_size << 20,
+        files_per_shard,
+        not nostrict,
+        workers,
+        chunk_size,
+    )
+    failed = 0
+    for entry in entries:
+        if "error" in entry:
+            failed += 1
+            print(f"{entry['path']}: {entry['error']}", file=sys.stderr)
+    print(f"Converted {len(inputs) - failed} of {len(inputs)} files.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+@click.command()
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help=SOCKET_HELP)
+@click.option("-j", "--workers", type=click.IntRange(min=1), help="Number of worker processes (default: CPU count).")
+def serve(socket_path, workers):
+    """Run a resident conversion server on a Unix domain socket.
+
+    The server keeps the library loaded in a pool of worker processes, so
+    conversions requested with midicsvpy-client and csvmidipy-client do not
+    pay for starting Python and importing the converters each time.
+    Stop it with Ctrl+C.
+    """
+    from .server import ConversionServer, default_socket_path
+
+    socket_path = socket_path or default_socket_path()
+    try:
+        server = ConversionServer(socket_path, workers)
+    except OSError as e:
+        print(f"Cannot listen on {socket_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    with server:
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+@click.command()
+@click.option("-n", "--nostrict", is_flag=True, help="Do not fail on parse/validation errors.")
+@click.option("-u", "--usage", is_flag=True, help="Print usage information (NOOP)")
+@click.option("-v", "--verbose", is_flag=True, help="Print debug information (NOOP)")
+@click.option("-t", "--track", multiple=True, type=click.IntRange(min=0), help="Only convert this track (0-based).")
+@click.option("-s", "--seconds", is_flag=True, help="Append the time of each event in seconds as a last column.")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help=SOCKET_HELP)
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.argument("output_file", type=click.Path(dir_okay=False, allow_dash=True))
+def midicsv_client(usage, nostrict, verbose, track, seconds, socket_path, input_file, output_file):
+    """Convert MIDI files to CSV files on a running conversion server.
+
+    Takes the same arguments as midicsvpy, except for the options tuning
+    the conversion itself, but hands the work to a server started with
+    midicsvpy-server. Either argument can be stdin/stdout.
+    """
+    tracks = list(track) if track else None
+    run_client(
+        socket_path,
+        lambda client, source, destination: client.midi_to_csv(source, destination, not nostrict, tracks, seconds),
+        input_file,
+        output_file,
+    )
+
+
+@click.command()
+@click.option("-n", "--nostrict", is_flag=True, help="Do not fail on parse/validation errors.")
+@click.option("-u", "--usage", is_flag=True, help="Print usage information (NOOP)")
+@click.option("-v", "--verbose", is_flag=True, help="Print debug information (NOOP)")
+@click.option("-z", "--strict-csv", is_flag=True, help="Raise exceptions on CSV errors (NOOP)")
+@click.option("-x", "--no-compress", is_flag=True, help="Do not compress status bytes (NOOP)")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help=SOCKET_HELP)
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.argument("output_file", type=click.Path(dir_okay=False, allow_dash=True))
+def csvmidi_client(usage, nostrict, verbose, strict_csv, no_compress, socket_path, input_file, output_file):
+    """Convert CSV files to MIDI files on a running conversion server.
+
+    Takes the same arguments as csvmidipy, except for the options tuning
+    the conversion itself, but hands the work to a server started with
+    midicsvpy-server. Either argument can be stdin/stdout.
+    """
+    run_client(
+        socket_path,
+        lambda client, source, destination: client.csv_to_midi(source, destination, not nostrict),
+        input_file,
+        output_file,
+    )
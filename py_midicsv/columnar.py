@@ -0,0 +1,259 @@
+### System ###
+import os
+from importlib.util import find_spec
+
+### Local ###
+from .events import event_identifiers
+from .midi.containers import Pattern, Track
+from .midi.events import Event, KeySignatureEvent, PitchWheelEvent, SetTempoEvent, SysexEvent, TimeSignatureEvent
+from .midi.fileio import read_midifile
+
+# One row per CSV row of `midicsv.parse` except Header and End_of_file,
+# whose information is kept in `EventTable.format`/`resolution` instead.
+#
+#   track    1-based track number, as in the CSV output
+#   time     absolute time in ticks
+#   type     the CSV identifier, e.g. "Note_on_c", "Tempo" or "Start_track"
+#   channel  channel of channel messages, -1 otherwise
+#   value1   note, controller, program, pressure or pitch bend value, -1 if unused
+#   value2   velocity, controller value or pressure, -1 if unused
+#   data     raw payload of meta and sysex events, empty otherwise
+#
+# Meta events are rebuilt from `data` alone, so they round-trip even if
+# their payload is malformed. The most common ones are decoded into the
+# value columns as well, to be queried without parsing the payload:
+#
+#   Tempo           value1 = microseconds per quarter note
+#   Time_signature  value1 = numerator, value2 = denominator as a power of 2
+#   Key_signature   value1 = number of sharps (> 0) or flats (< 0), value2 = 1 if minor
+#
+# The remaining Time_signature fields (clocks per click, 32nd notes per
+# quarter note) are only kept in `data`.
+#
+# The .npz layout stores these as arrays of the same names, except that
+# `type` holds indices into the `types` array of identifiers and `data` is
+# the concatenation of all payloads, split by the n + 1 `data_offsets`.
+# The 0-d arrays `format` and `resolution` hold the file header fields.
+#
+# Tables combining several files, see `corpus.write_corpus`, have an extra
+# `file_id` column with the id of the file each row belongs to.
+COLUMNS = ("track", "time", "type", "channel", "value1", "value2", "data")
+FILE_COLUMN = "file_id"
+EVENT_TYPES = {identifier: cls for cls, identifier in event_identifiers.items()}
+START_TRACK = "Start_track"
+# used when no format is asked for explicitly
+# numpy and pyarrow take long to import, so they are only imported once a
+# table is actually written or read
+DEFAULT_EXTENSION = ".parquet" if find_spec("pyarrow") is not None else ".npz"
+
+
+class EventTable:
+    """Column-oriented version of the rows of a MIDI file in CSV format.
+
+    `columns` maps each name in `COLUMNS` to a list of values, see the
+    description of the columns above.
+    """
+
+    def __init__(self, format, resolution, columns):
+        self.format = format
+        self.resolution = resolution
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["time"])
+
+    def __repr__(self):
+        return f"EventTable(format={self.format!r}, resolution={self.resolution!r}, rows={len(self)})"
+
+
+def meta_values(event, payload):
+    if isinstance(event, SetTempoEvent) and len(payload) == 3:
+        return int.from_bytes(payload, "big"), -1
+    if isinstance(event, TimeSignatureEvent) and len(payload) >= 2:
+        return payload[0], payload[1]
+    if isinstance(event, KeySignatureEvent) and len(payload) >= 2:
+        return payload[0] - 256 if payload[0] > 127 else payload[0], payload[1]
+    return -1, -1
+
+
+def event_values(event):
+    if not isinstance(event, Event) or isinstance(event, SysexEvent):
+        payload = event.payload
+        return -1, *meta_values(event, payload), payload
+    data = event.data
+    if isinstance(event, PitchWheelEvent):
+        return event.channel, data[0] | (data[1] << 7), -1, b""
+    return event.channel, data[0], data[1] if len(data) > 1 else -1, b""
+
+
+def midi_to_table(file, strict=True, event_filter=None):
+    """Decodes a MIDI file into an `EventTable`.
+
+    Args:
+        file: A string giving the path to a file on disk or
+              an open binary file-like object.
+        event_filter: An optional `EventFilter` selecting the events to include.
+    """
+    pattern = read_midifile(file, strict, event_filter=event_filter)
+    rows = []
+    add = rows.append
+    for index, track in enumerate(pattern):
+        if event_filter is not None and not event_filter.accepts_track(index):
+            continue
+        add((index + 1, 0, START_TRACK, -1, -1, -1, b""))
+        abstime = 0
+        for event in track:
+            abstime += event.tick
+            add((index + 1, abstime, event_identifiers[type(event)], *event_values(event)))
+    values = zip(*rows) if rows else ([] for _ in COLUMNS)
+    columns = {name: list(column) for name, column in zip(COLUMNS, values)}
+    return EventTable(pattern.format, pattern.resolution, columns)
+
+
+def table_to_pattern(table):
+    """Builds a Pattern with relative ticks from an `EventTable`."""
+    columns = table.columns
+    pattern = Pattern(resolution=table.resolution, format=table.format, tick_relative=False)
+    track = None
+    rows = zip(*(columns[name] for name in COLUMNS))
+    for _, time, identifier, channel, value1, value2, data in rows:
+        if identifier == START_TRACK:
+            track = Track(tick_relative=False)
+            pattern.append(track)
+            continue
+        cls = EVENT_TYPES[identifier]
+        if not issubclass(cls, Event) or issubclass(cls, SysexEvent):
+            track.append(cls(tick=time, data=list(data)))
+        elif cls is PitchWheelEvent:
+            track.append(cls(tick=time, channel=channel, data=[value1 & 0x7F, (value1 >> 7) & 0x7F]))
+        else:
+            track.append(cls(tick=time, channel=channel, data=[value1] if value2 < 0 else [value1, value2]))
+    pattern.make_ticks_rel()
+    return pattern
+
+
+def table_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".parquet", ".arrow", ".feather"):
+        if find_spec("pyarrow") is None:
+            raise ImportError(f"writing {extension} files requires pyarrow to be installed")
+        return extension
+    if extension == ".npz":
+        if find_spec("numpy") is None:
+            raise ImportError("writing .npz files requires numpy to be installed")
+        return extension
+    raise ValueError(f"Unknown columnar format {extension!r}, use .parquet, .arrow, .feather or .npz")
+
+
+def column_names(table):
+    return (FILE_COLUMN, *COLUMNS) if FILE_COLUMN in table.columns else COLUMNS
+
+
+def to_arrow(table):
+    import pyarrow as pa
+
+    columns = table.columns
+    fields = [(FILE_COLUMN, pa.uint32())] if FILE_COLUMN in columns else []
+    schema = pa.schema(
+        [
+            *fields,
+            ("track", pa.uint16()),
+            ("time", pa.uint64()),
+            ("type", pa.dictionary(pa.int8(), pa.string())),
+            ("channel", pa.int8()),
+            ("value1", pa.int32()),
+            ("value2", pa.int32()),
+            ("data", pa.binary()),
+        ],
+        metadata={"format": str(table.format), "resolution": str(table.resolution)},
+    )
+    return pa.table([columns[name] for name in column_names(table)], schema=schema)
+
+
+def from_arrow(arrow_table):
+    metadata = arrow_table.schema.metadata
+    names = (FILE_COLUMN, *COLUMNS) if FILE_COLUMN in arrow_table.column_names else COLUMNS
+    columns = {name: arrow_table.column(name).to_pylist() for name in names}
+    return EventTable(int(metadata[b"format"]), int(metadata[b"resolution"]), columns)
+
+
+def to_npz(table):
+    import numpy as np
+
+    columns = table.columns
+    types = sorted(set(columns["type"]))
+    codes = {identifier: code for code, identifier in enumerate(types)}
+    lengths = np.fromiter(map(len, columns["data"]), dtype=np.uint64, count=len(table))
+    arrays = {
+        "format": np.array(table.format, dtype=np.uint16),
+        "resolution": np.array(table.resolution, dtype=np.uint16),
+        "track": np.array(columns["track"], dtype=np.uint16),
+        "time": np.array(columns["time"], dtype=np.uint64),
+        "type": np.array([codes[identifier] for identifier in columns["type"]], dtype=np.uint8),
+        "types": np.array(types, dtype=str),
+        "channel": np.array(columns["channel"], dtype=np.int8),
+        "value1": np.array(columns["value1"], dtype=np.int32),
+        "value2": np.array(columns["value2"], dtype=np.int32),
+        "data_offsets": np.concatenate(([0], np.cumsum(lengths))).astype(np.uint64),
+        "data": np.frombuffer(b"".join(columns["data"]), dtype=np.uint8),
+    }
+    if FILE_COLUMN in columns:
+        arrays[FILE_COLUMN] = np.array(columns[FILE_COLUMN], dtype=np.uint32)
+    return arrays
+
+
+def from_npz(arrays):
+    types = arrays["types"].tolist()
+    offsets = arrays["data_offsets"].tolist()
+    data = arrays["data"].tobytes()
+    columns = {
+        "track": arrays["track"].tolist(),
+        "time": arrays["time"].tolist(),
+        "type": [types[code] for code in arrays["type"].tolist()],
+        "channel": arrays["channel"].tolist(),
+        "value1": arrays["value1"].tolist(),
+        "value2": arrays["value2"].tolist(),
+        "data": [data[start:end] for start, end in zip(offsets, offsets[1:])],
+    }
+    if FILE_COLUMN in arrays:
+        columns[FILE_COLUMN] = arrays[FILE_COLUMN].tolist()
+    return EventTable(int(arrays["format"]), int(arrays["resolution"]), columns)
+
+
+def write_table(table, path):
+    """Writes an `EventTable` to disk.
+
+    The format is picked by the file extension: `.parquet` for Parquet,
+    `.arrow`/`.feather` for the Arrow IPC file format (both need pyarrow),
+    or `.npz` for the NumPy layout described in this module.
+    """
+    extension = table_format(path)
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(to_arrow(table), path)
+    elif extension == ".npz":
+        import numpy as np
+
+        np.savez(path, **to_npz(table))
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(to_arrow(table), path, compression="uncompressed")
+
+
+def read_table(path):
+    """Reads an `EventTable` written by `write_table`."""
+    extension = table_format(path)
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        return from_arrow(pq.read_table(path))
+    if extension == ".npz":
+        import numpy as np
+
+        with np.load(path) as arrays:
+            return from_npz(arrays)
+    import pyarrow.feather as feather
+
+    return from_arrow(feather.read_table(path))
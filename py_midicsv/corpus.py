@@ -0,0 +1,283 @@
+### System ###
+import hashlib
+import json
+import os
+from collections import deque
+from itertools import islice
+
+### Local ###
+from .columnar import COLUMNS, FILE_COLUMN, EventTable, midi_to_table, read_table, table_to_pattern, write_table
+from .csvmidi import parse as csv_to_midi
+from .midi.constants import DEFAULT_READ_BLOCK_SIZE
+from .midicsv import parse as midi_to_csv
+
+MANIFEST_NAME = "manifest.jsonl"
+# approximate size of a shard
+DEFAULT_SHARD_SIZE = 256 << 20
+# rough size of one row in a columnar shard, not counting its payload
+COLUMNAR_ROW_SIZE = 24
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(DEFAULT_READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def convert_corpus_file(job):
+    """Converts a single corpus file inside a worker process.
+
+    Returns:
+        A (file_id, digest, result, error) tuple, where result is the list of
+        CSV rows or an `EventTable`, and error a string if the file failed.
+    """
+    file_id, path, columnar, strict = job
+    try:
+        digest = file_digest(path)
+        result = midi_to_table(path, strict) if columnar else midi_to_csv(path, strict)
+    except Exception as e:
+        return file_id, None, None, f"{type(e).__name__}: {e}"
+    return file_id, digest, result, None
+
+
+def convert_corpus_chunk(jobs):
+    return [convert_corpus_file(job) for job in jobs]
+
+
+def convert_in_pool(jobs, workers=None, chunksize=1):
+    """Converts corpus files in a process pool, yielding the results in job order.
+
+    Unlike `Executor.map`, which submits every job up front, only two chunks
+    per worker are in flight at a time, so converted files do not pile up in
+    memory while the shards are written.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    jobs = iter(jobs)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(jobs, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(convert_corpus_chunk, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+class ShardWriter:
+    """Writes the converted files of a corpus into size-bounded shards.
+
+    Args:
+        directory: Output directory for the shards and the manifest.
+        extension: `.csv` for CSV shards, or a columnar format supported by
+                   `columnar.write_table`.
+        max_size: Approximate upper bound for the size of a shard in bytes.
+                  A single file is never split, so a shard holding one very
+                  large file can exceed it.
+        max_files: Upper bound for the number of files in a shard.
+    """
+
+    def __init__(self, directory, extension=".csv", max_size=DEFAULT_SHARD_SIZE, max_files=None):
+        self.directory = directory
+        self.extension = extension
+        self.max_size = max_size
+        self.max_files = max_files
+        self.shards = 0
+        self.name = None
+        self.file = None
+        self.tables = []
+        self.size = 0
+        self.rows = 0
+        self.files = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def columnar(self):
+        return self.extension != ".csv"
+
+    def open_shard(self):
+        self.name = f"shard-{self.shards:05d}{self.extension}"
+        self.shards += 1
+        self.size = self.rows = self.files = 0
+        if not self.columnar:
+            self.file = open(os.path.join(self.directory, self.name), "wb")
+
+    def close_shard(self):
+        if self.name is None:
+            return
+        if self.columnar:
+            write_table(concat_tables(self.tables), os.path.join(self.directory, self.name))
+            self.tables = []
+        else:
+            self.file.close()
+            self.file = None
+        self.name = None
+
+    def is_full(self):
+        return self.size >= self.max_size or (self.max_files is not None and self.files >= self.max_files)
+
+    def add(self, file_id, result):
+        """Appends the rows of one file, returning its location in the shard."""
+        if self.name is not None and self.is_full():
+            self.close_shard()
+        if self.name is None:
+            self.open_shard()
+        entry = {"shard": self.name, "first_row": self.rows}
+        if self.columnar:
+            # the header fields of a columnar shard are those of its first
+            # file, so each file keeps its own in the manifest
+            entry["format"] = result.format
+            entry["resolution"] = result.resolution
+            rows = len(result)
+            result.columns[FILE_COLUMN] = [file_id] * rows
+            self.tables.append(result)
+            size = rows * COLUMNAR_ROW_SIZE + sum(map(len, result.columns["data"]))
+        else:
+            # Header and End_of_file rows are kept, so each file reads like a CSV file of its own
+            rows = len(result)
+            text = "".join(f"{file_id}, {row}" if row.endswith("\n") else f"{file_id}, {row}\n" for row in result)
+            data = text.encode()
+            entry["offset"] = self.size
+            entry["length"] = len(data)
+            self.file.write(data)
+            size = len(data)
+        entry["rows"] = rows
+        self.size += size
+        self.rows += rows
+        self.files += 1
+        return entry
+
+    def close(self):
+        self.close_shard()
+
+
+def concat_tables(tables):
+    columns = {name: [] for name in (FILE_COLUMN, *COLUMNS)}
+    for table in tables:
+        for name, column in columns.items():
+            column.extend(table.columns[name])
+    # the header fields of every file are kept in the manifest, see `ShardWriter.add`
+    return EventTable(tables[0].format, tables[0].resolution, columns)
+
+
+def count_events(result):
+    if isinstance(result, EventTable):
+        types = result.columns["type"]
+        return len(types) - types.count("Start_track"), types.count("Start_track")
+    tracks = sum(1 for row in result if row.split(", ", 3)[2:3] == ["Start_track\n"])
+    # every row except Header, End_of_file and one Start_track row per track is an event
+    return len(result) - 2 - tracks, tracks
+
+
+def write_corpus(
+    inputs,
+    directory,
+    extension=".csv",
+    max_size=DEFAULT_SHARD_SIZE,
+    max_files=None,
+    strict=True,
+    workers=None,
+    chunksize=1,
+):
+    """Converts a corpus of MIDI files into a few large shards and a manifest.
+
+    In CSV shards every row is prefixed with the id of the file it belongs
+    to. Columnar shards carry the id in an extra `file_id` column. The manifest
+    (`manifest.jsonl` in `directory`) holds one JSON object per input with its
+    `id`, `path`, content `hash`, `shard`, `first_row` and number of `rows`
+    in the shard, `events` and `tracks`, for CSV shards the byte `offset` and
+    `length` of its rows, and for columnar shards the `format` and
+    `resolution` of its header. Inputs that failed to convert have an `error`
+    instead of a shard.
+
+    Args:
+        inputs: (path, relative_path) tuples as returned by `batch.collect_inputs`.
+        directory: Output directory.
+        extension: `.csv` for CSV shards, or `.parquet`, `.arrow`, `.feather`
+                   or `.npz` for columnar shards.
+        max_size: Approximate upper bound for the size of a shard in bytes.
+        max_files: Upper bound for the number of files in a shard.
+        workers: Number of worker processes, defaults to the number of CPUs.
+        chunksize: Number of files handed to a worker at a time.
+
+    Yields:
+        The manifest entry of each input, in input order.
+    """
+    columnar = extension != ".csv"
+    jobs = ((file_id, path, columnar, strict) for file_id, (path, _) in enumerate(inputs))
+    if workers == 1:
+        results = map(convert_corpus_file, jobs)
+    else:
+        results = convert_in_pool(jobs, workers, chunksize)
+    writer = ShardWriter(directory, extension, max_size, max_files)
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "w") as manifest:
+            for (file_id, digest, result, error), (_, relpath) in zip(results, inputs):
+                entry = {"id": file_id, "path": relpath, "hash": digest}
+                if error is not None:
+                    entry["error"] = error
+                else:
+                    entry["events"], entry["tracks"] = count_events(result)
+                    entry.update(writer.add(file_id, result))
+                manifest.write(json.dumps(entry) + "\n")
+                yield entry
+    finally:
+        writer.close()
+        if workers != 1:
+            results.close()
+
+
+def read_manifest(directory):
+    """Returns the manifest entries of a corpus, keyed by file id."""
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        return {entry["id"]: entry for entry in map(json.loads, f)}
+
+
+def strip_file_ids(lines, file_id):
+    prefix = f"{file_id}, "
+    quotes = 0
+    for line in lines:
+        # only lines starting a row carry the prefix, not continuation lines of quoted fields
+        if quotes % 2 == 0 and line.startswith(prefix):
+            line = line[len(prefix) :]
+        quotes += line.count('"')
+        yield line
+
+
+def corpus_entry(directory, file_id):
+    entry = read_manifest(directory)[file_id]
+    if "error" in entry:
+        raise ValueError(f"File {file_id} failed to convert: {entry['error']}")
+    return entry
+
+
+def read_corpus_rows(directory, file_id):
+    """Returns the CSV rows of a single file from the shards of a corpus."""
+    entry = corpus_entry(directory, file_id)
+    if not entry["shard"].endswith(".csv"):
+        raise ValueError(f"File {file_id} is stored in columnar shard {entry['shard']}")
+    with open(os.path.join(directory, entry["shard"]), "rb") as f:
+        f.seek(entry["offset"])
+        text = f.read(entry["length"]).decode()
+    return list(strip_file_ids(text.splitlines(keepends=True), file_id))
+
+
+def read_corpus_file(directory, file_id):
+    """Reconstructs a single file of a corpus as a Pattern.
+
+    CSV shards are parsed with `csvmidi.parse`, columnar shards are converted
+    with `columnar.table_to_pattern`.
+    """
+    entry = corpus_entry(directory, file_id)
+    if entry["shard"].endswith(".csv"):
+        return csv_to_midi(read_corpus_rows(directory, file_id))
+    table = read_table(os.path.join(directory, entry["shard"]))
+    start, end = entry["first_row"], entry["first_row"] + entry["rows"]
+    columns = {name: table.columns[name][start:end] for name in COLUMNS}
+    return table_to_pattern(EventTable(entry["format"], entry["resolution"], columns))
@@ -1,24 +1,6 @@
-### System ###
-import struct
-
 ### Local ###
 from .midi.events import *
-
-
-def as_midi_bytes(text):
-    midi_bytes = b""
-    X = iter(text)
-    for c in X:
-        if c == "\\":
-            cc = next(X)
-            if cc == "\\":
-                midi_bytes += struct.pack("B", ord(cc))
-            else:
-                Nstr = cc + next(X) + next(X)
-                midi_bytes += struct.pack("B", int(Nstr, base=8))
-        else:
-            midi_bytes += struct.pack("B", ord(c))
-    return midi_bytes
+from .textcodec import unescape as as_midi_bytes
 
 
 def to_NoteOffEvent(track, time, identifier, line):
@@ -1,14 +1,35 @@
 ### System ###
 import csv
+import io
+import shutil
+import tempfile
+from itertools import chain
+from struct import pack
 
+### Local ###
+from . import instrumentation
+from .columnar import read_table, table_to_pattern
 from .events import csv_to_midi_map
+from .midi.constants import DEFAULT_READ_BLOCK_SIZE
 from .midi.containers import *
-
-### Local ###
 from .midi.events import *
+from .midi.fileio import FileWriter
+from .midi.util import write_varlen
 
 COMMENT_DELIMITERS = ("#", ";")
 
+# Channel message rows that can be encoded without building event objects,
+# mapped to their status byte and the number of fields following the identifier.
+CHANNEL_ROWS = {
+    "Note_off_c": (NoteOffEvent.statusmsg, 3),
+    "Note_on_c": (NoteOnEvent.statusmsg, 3),
+    "Poly_aftertouch_c": (AfterTouchEvent.statusmsg, 3),
+    "Control_c": (ControlChangeEvent.statusmsg, 3),
+    "Program_c": (ProgramChangeEvent.statusmsg, 2),
+    "Channel_aftertouch_c": (ChannelAfterTouchEvent.statusmsg, 2),
+    "Pitch_bend_c": (PitchWheelEvent.statusmsg, 2),
+}
+
 
 def parse(file, strict=True):
     """Parses a CSV file into MIDI format.
@@ -48,3 +69,249 @@ def parse(file, strict=True):
             track.append(event)
     pattern.make_ticks_rel()
     return pattern
+
+
+def parse_columns(source):
+    """Reads a columnar file written by `midicsv.export_columns` into MIDI format.
+
+    Args:
+        source: Path of a `.parquet`, `.arrow`, `.feather` or `.npz` file.
+
+    Returns:
+        A Pattern() object, like `parse` returns for the equivalent CSV file.
+    """
+    return table_to_pattern(read_table(source))
+
+
+class TrackStream:
+    """Writes MIDI tracks to a seekable output while they are being encoded.
+
+    Encoded events are collected in `buffer` and handed to the output
+    whenever `flush` is called, so only a bounded amount of each track is
+    held in memory. The MThd header and the length of each MTrk chunk are
+    written as placeholders and patched by seeking back once known.
+
+    Args:
+        output: A seekable binary file-like object.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.start = output.tell()
+        self.tracks = 0
+        self.buffer = bytearray()
+        self.length = 0
+        self.length_pos = None
+        output.write(b"MThd" + pack(">LHHH", 6, 0, 0, 0))
+
+    def start_track(self):
+        self.end_track()
+        self.length_pos = self.output.tell() + 4
+        self.output.write(b"MTrk" + pack(">L", 0))
+        self.length = 0
+        self.tracks += 1
+
+    def flush(self):
+        self.output.write(self.buffer)
+        self.length += len(self.buffer)
+        # cleared in place, callers keep a reference to the buffer
+        self.buffer.clear()
+
+    def end_track(self):
+        if self.length_pos is None:
+            return
+        self.flush()
+        self.patch(self.length_pos, pack(">L", self.length))
+        self.length_pos = None
+
+    def close(self, format, resolution):
+        self.end_track()
+        self.patch(self.start + 8, pack(">HHH", format, self.tracks, resolution))
+
+    def patch(self, pos, data):
+        end = self.output.tell()
+        self.output.seek(pos)
+        self.output.write(data)
+        self.output.seek(end)
+
+
+def raise_outside_track(identifier):
+    # the exception `parse` runs into for such rows, where no track exists yet either
+    raise UnboundLocalError(f"{identifier} row before the first Start_track")
+
+
+class RowEncoder:
+    """Encodes CSV rows into the tracks of a MIDI file.
+
+    The encoder keeps its state between calls to `feed`, so a file can be
+    handed over in pieces as long as every piece ends on a row boundary.
+
+    Args:
+        stream: The sink receiving the tracks, see `TrackStream`.
+        blocksize: Number of encoded bytes buffered before `stream.flush` is called.
+        use_running_status: Omit repeated status bytes of channel messages,
+                            defaults to `Pattern.useRunningStatus` like `FileWriter`.
+    """
+
+    def __init__(self, stream, blocksize=DEFAULT_READ_BLOCK_SIZE, use_running_status=None):
+        self.stream = stream
+        self.blocksize = blocksize
+        self.writer = FileWriter(None, use_running_status)
+        self.header = Pattern()
+        self.declared_tracks = None
+        self.prevtime = 0
+        # whether a Start_track row has been seen, events before it belong to no track
+        self.in_track = False
+
+    def feed(self, lines):
+        """Encodes the rows read from an iterable of lines."""
+        stream = self.stream
+        buf = stream.buffer
+        blocksize = self.blocksize
+        writer = self.writer
+        use_running_status = writer.use_running_status
+        header = self.header
+        prevtime = self.prevtime
+        in_track = self.in_track
+        lines = iter(lines)
+        try:
+            for line in lines:
+                if line.startswith(COMMENT_DELIMITERS):
+                    continue
+                fields = line.split(",")
+                identifier = fields[2].strip() if len(fields) > 2 else None
+                spec = CHANNEL_ROWS.get(identifier)
+                if spec is not None and '"' not in line and len(fields) >= 3 + spec[1]:
+                    if not in_track:
+                        raise_outside_track(identifier)
+                    statusmsg, nfields = spec
+                    time = int(fields[1])
+                    delta = time - prevtime
+                    prevtime = time
+                    if 0 <= delta < 0x80:
+                        buf.append(delta)
+                    else:
+                        buf.extend(write_varlen(delta))
+                    status = statusmsg | int(fields[3])
+                    if status != writer.RunningStatus or not use_running_status:
+                        writer.RunningStatus = status
+                        buf.append(status)
+                    if nfields == 3:
+                        buf.append(int(fields[4]))
+                        buf.append(int(fields[5]))
+                    elif statusmsg == PitchWheelEvent.statusmsg:
+                        value = int(fields[4])
+                        buf.append(value & 0x7F)
+                        buf.append((value >> 7) & 0x7F)
+                    else:
+                        buf.append(int(fields[4]))
+                    if len(buf) >= blocksize:
+                        stream.flush()
+                    continue
+
+                # general path, identical to `parse`
+                row = next(csv.reader(chain([line], lines), skipinitialspace=True), None)
+                if not row:
+                    continue
+                if row[0].startswith(COMMENT_DELIMITERS):
+                    continue
+                tr = int(row[0])
+                time = int(row[1])
+                identifier = row[2].strip()
+                if identifier == "Header":
+                    header.format = int(row[3])
+                    header.resolution = int(row[5])
+                    self.declared_tracks = int(row[4])
+                elif identifier == "End_of_file":
+                    continue
+                elif identifier == "Start_track":
+                    stream.start_track()
+                    prevtime = 0
+                    in_track = True
+                else:
+                    if not in_track:
+                        raise_outside_track(identifier)
+                    event = csv_to_midi_map[identifier](tr, time, identifier, row[3:])
+                    event.tick = time - prevtime
+                    prevtime = time
+                    buf.extend(writer.encode_midi_event(event))
+                    if len(buf) >= blocksize:
+                        stream.flush()
+        finally:
+            self.prevtime = prevtime
+            self.in_track = in_track
+
+    def close(self):
+        self.stream.close(self.header.format, self.header.resolution)
+
+
+def is_seekable(output):
+    try:
+        return output.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def write(file, output, strict=True, blocksize=DEFAULT_READ_BLOCK_SIZE, use_running_status=None):
+    """Converts a CSV file into a MIDI file, streaming the result to `output`.
+
+    Tracks are written out in blocks of roughly `blocksize` bytes as the
+    input is read, so memory use does not grow with the size of the file.
+    Seekable outputs get their chunk lengths patched in place, output to
+    pipes and other unseekable streams is spilled to a temporary file first.
+    The result is identical to writing the Pattern returned by `parse`
+    with a `FileWriter`.
+
+    Args:
+        file: A string giving the path to a file on disk or
+              an open file-like object.
+        output: A string giving the path of the file to write to or
+                an open binary file-like object.
+        blocksize: Number of encoded bytes buffered before writing them out.
+        use_running_status: Omit repeated status bytes of channel messages,
+                            defaults to `Pattern.useRunningStatus` like `FileWriter`.
+    """
+
+    if isinstance(file, str):
+        with open(file) as f:
+            return write(f, output, strict, blocksize, use_running_status)
+    if isinstance(output, str):
+        with open(output, "wb") as f:
+            return write(file, f, strict, blocksize, use_running_status)
+    if not is_seekable(output):
+        with tempfile.TemporaryFile() as spill:
+            write(file, spill, strict, blocksize, use_running_status)
+            spill.seek(0)
+            shutil.copyfileobj(spill, output, blocksize)
+        return
+
+    encoder = RowEncoder(TrackStream(output), blocksize, use_running_status)
+    if instrumentation.current is not None:
+        file = instrumentation.current.count_rows(file)
+    with instrumentation.phase("encode"):
+        encoder.feed(file)
+        encoder.close()
+
+
+def encode(file, strict=True, use_running_status=None):
+    """Converts a CSV file directly into the bytes of a MIDI file.
+
+    Channel message rows are split and encoded straight into the track
+    buffer. Only other rows (meta events, sysex, anything quoted) are
+    parsed with the csv module and built as event objects.
+    The result is identical to writing the Pattern returned by `parse`
+    with a `FileWriter`.
+
+    Args:
+        file: A string giving the path to a file on disk or
+              an open file-like object.
+        use_running_status: Omit repeated status bytes of channel messages,
+                            defaults to `Pattern.useRunningStatus` like `FileWriter`.
+
+    Returns:
+        A bytes object containing the complete MIDI file.
+    """
+
+    output = io.BytesIO()
+    write(file, output, strict, use_running_status=use_running_status)
+    return output.getvalue()
@@ -33,6 +33,49 @@ midi_to_csv_map = {
     SysexF7Event: from_SysexF7Event,
 }
 
+# Row templates for channel messages with fixed-length data, producing the
+# same output as their midi_to_csv_map converters without the per-event call.
+midi_to_csv_row_formats = {
+    NoteOffEvent: "%d, %d, Note_off_c, %d, %d, %d\n",
+    NoteOnEvent: "%d, %d, Note_on_c, %d, %d, %d\n",
+    AfterTouchEvent: "%d, %d, Poly_aftertouch_c, %d, %d, %d\n",
+    ControlChangeEvent: "%d, %d, Control_c, %d, %d, %d\n",
+    ProgramChangeEvent: "%d, %d, Program_c, %d, %d\n",
+    ChannelAfterTouchEvent: "%d, %d, Channel_aftertouch_c, %d, %d\n",
+}
+
+# The identifier written into the CSV rows of each event type.
+event_identifiers = {
+    NoteOffEvent: "Note_off_c",
+    NoteOnEvent: "Note_on_c",
+    AfterTouchEvent: "Poly_aftertouch_c",
+    ControlChangeEvent: "Control_c",
+    ProgramChangeEvent: "Program_c",
+    ChannelAfterTouchEvent: "Channel_aftertouch_c",
+    PitchWheelEvent: "Pitch_bend_c",
+    SequenceNumberMetaEvent: "Sequence_number",
+    ProgramNameEvent: "Program_name_t",
+    TextMetaEvent: "Text_t",
+    CopyrightMetaEvent: "Copyright_t",
+    TrackNameEvent: "Title_t",
+    InstrumentNameEvent: "Instrument_name_t",
+    LyricsEvent: "Lyric_t",
+    MarkerEvent: "Marker_t",
+    CuePointEvent: "Cue_point_t",
+    ChannelPrefixEvent: "Channel_prefix",
+    PortEvent: "MIDI_port",
+    EndOfTrackEvent: "End_track",
+    DeviceNameEvent: "Device_name_t",
+    TrackLoopEvent: "Loop_track",
+    SetTempoEvent: "Tempo",
+    SmpteOffsetEvent: "SMPTE_offset",
+    TimeSignatureEvent: "Time_signature",
+    KeySignatureEvent: "Key_signature",
+    SequencerSpecificEvent: "Sequencer_specific",
+    SysexEvent: "System_exclusive",
+    SysexF7Event: "System_exclusive_F7",
+}
+
 csv_to_midi_map = {
     "Note_off_c": to_NoteOffEvent,
     "Note_on_c": to_NoteOnEvent,
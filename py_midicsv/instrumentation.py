@@ -0,0 +1,296 @@
+### System ###
+import os
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+# The `Stats` collecting measurements in this process, None when disabled.
+# Conversions look it up once per file or track, so the cost while disabled
+# is negligible.
+current = None
+
+# collapsed stacks are written with this many samples per second of time
+COLLAPSED_SCALE = 1e6
+COLLAPSED_EXTENSIONS = (".folded", ".collapsed")
+
+
+class Stats:
+    """Timings, counters and hooks for a conversion.
+
+    Time is attributed to exactly one phase: while a phase is running inside
+    another one, e.g. decoding events while rows are being formatted, it is
+    not counted for the outer phase as well. The phases recorded are:
+
+        header   parsing the MIDI file header
+        decode   decoding track data, including event construction and
+                 validation, which happen in the same pass
+        format   converting events into CSV rows
+        encode   converting CSV rows into MIDI data
+        read     reading from an input wrapped in `TimedFile`
+        write    writing to an output wrapped in `TimedFile`
+
+    When a `ConversionCache` is used, its counters can be stored in `cache`
+    to be included in the summary.
+
+    Tracks converted in worker processes are not broken down. Every event
+    is timed individually, so conversions take noticeably longer while
+    stats are being collected.
+
+    Args:
+        hooks: Callables invoked as `hook(name, info)` with the name of an
+               occurrence and a dict describing it: "track" once a track has
+               been converted, "summary" when collection ends.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.timings = defaultdict(float)
+        self.events = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed = 0.0
+        self.cache = None
+        self._stack = []
+        self._nested = 0.0
+
+    def enter(self, phase):
+        self._stack.append((phase, perf_counter(), self._nested))
+        self._nested = 0.0
+
+    def leave(self):
+        phase, start, nested = self._stack.pop()
+        elapsed = perf_counter() - start
+        self.timings[phase] += elapsed - self._nested
+        self._nested = nested + elapsed
+
+    @contextmanager
+    def phase(self, name):
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.leave()
+
+    def timed(self, iterable, phase, observe=None):
+        """Yields the items of `iterable`, recording the time taken to produce them under `phase`.
+
+        Args:
+            observe: Optional callable receiving every item, outside of the timing.
+        """
+        iterator = iter(iterable)
+        while True:
+            self.enter(phase)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            if observe is not None:
+                observe(item)
+            yield item
+
+    def track_rows(self, track, events, convert, identifiers):
+        """Times decoding and formatting of one track, counting its events by CSV identifier.
+
+        Args:
+            track: The 1-based track number.
+            events: The decoded events of the track.
+            convert: Callable turning the events into CSV rows.
+            identifiers: Mapping of event classes to CSV identifiers.
+        """
+        counts = Counter()
+        events = self.timed(events, "decode", lambda event: counts.update((identifiers[type(event)],)))
+        yield from self.timed(convert(events), "format")
+        self.events.update(counts)
+        self.emit("track", {"track": track, "events": sum(counts.values())})
+
+    def count_rows(self, lines):
+        """Yields CSV lines unchanged, counting the rows by identifier."""
+        for line in lines:
+            fields = line.split(",", 3)
+            if len(fields) > 2 and not line.startswith(("#", ";")):
+                identifier = fields[2].strip()
+                if identifier not in ("Header", "Start_track", "End_of_file"):
+                    self.events[identifier] += 1
+            yield line
+
+    def emit(self, name, info):
+        for hook in self.hooks:
+            hook(name, info)
+
+    def as_dict(self):
+        info = {
+            "elapsed": self.elapsed,
+            "phases": dict(self.timings),
+            "events": dict(self.events.most_common()),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+        if self.cache is not None:
+            info["cache"] = self.cache
+        return info
+
+
+@contextmanager
+def collect(hooks=()):
+    """Collects `Stats` for the conversions run within the block.
+
+    Example:
+        with collect() as stats:
+            py_midicsv.midi_to_csv("example.mid")
+        print(stats.as_dict())
+    """
+    global current
+    previous = current
+    stats = current = Stats(hooks)
+    start = perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.elapsed = perf_counter() - start
+        current = previous
+        stats.emit("summary", stats.as_dict())
+
+
+def phase(name):
+    """Context manager timing a phase in the active `Stats`, if any."""
+    return nullcontext() if current is None else current.phase(name)
+
+
+class TimedFile:
+    """Wraps a file object to record reads and writes in the active `Stats`.
+
+    Reads count towards `bytes_in` and the "read" phase, writes towards
+    `bytes_out` and the "write" phase. Data written again after seeking
+    back is not counted twice. Other attributes are passed through.
+    """
+
+    def __init__(self, file, stats):
+        self.file = file
+        self.stats = stats
+        try:
+            self.position = file.tell()
+        except (AttributeError, OSError, ValueError):
+            self.position = 0
+        self.end = self.position
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return self.stats.timed(self.file, "read", self.received)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self.file.__exit__(*exc)
+
+    def received(self, data):
+        self.stats.bytes_in += len(data)
+
+    def sent(self, data):
+        self.position += len(data)
+        if self.position > self.end:
+            self.stats.bytes_out += self.position - self.end
+            self.end = self.position
+
+    def read(self, *args):
+        with self.stats.phase("read"):
+            data = self.file.read(*args)
+        self.received(data)
+        return data
+
+    def readline(self, *args):
+        with self.stats.phase("read"):
+            line = self.file.readline(*args)
+        self.received(line)
+        return line
+
+    def write(self, data):
+        with self.stats.phase("write"):
+            result = self.file.write(data)
+        self.sent(data)
+        return result
+
+    def writelines(self, lines):
+        # producing the lines is timed by the phases inside
+        def sent(lines):
+            for line in lines:
+                self.sent(line)
+                yield line
+
+        with self.stats.phase("write"):
+            self.file.writelines(sent(lines))
+
+    def seek(self, *args):
+        self.position = self.file.seek(*args)
+        return self.position
+
+
+@contextmanager
+def profiling(path):
+    """Profiles the block with cProfile and saves the result to `path`.
+
+    Paths ending in `.folded` or `.collapsed` get collapsed stacks, as read
+    by flame graph tools, anything else a cProfile dump for `pstats`.
+    """
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if os.path.splitext(path)[1] in COLLAPSED_EXTENSIONS:
+            with open(path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in collapsed_stacks(profile).items())
+        else:
+            profile.dump_stats(path)
+
+
+def function_label(function):
+    filename, line, name = function
+    if filename == "~":
+        # built-in functions
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(profile, max_depth=64):
+    """Derives collapsed stacks from a profile.
+
+    cProfile only records caller/callee pairs, so the time of a function
+    called from several places is split between its callers in proportion
+    to the time spent in the calls from each of them.
+
+    Returns:
+        A dict mapping `;`-separated stacks to their self time in microseconds.
+    """
+    import pstats
+
+    functions = pstats.Stats(profile).stats
+    callees = defaultdict(dict)
+    for function, (_, _, _, _, callers) in functions.items():
+        for caller, edge in callers.items():
+            callees[caller][function] = edge
+    stacks = Counter()
+
+    def visit(function, stack, share, depth):
+        _, _, selftime, cumtime, _ = functions[function]
+        stack = (*stack, function)
+        stacks[";".join(map(function_label, stack))] += selftime * share
+        if depth >= max_depth:
+            return
+        for callee, (_, _, _, edgetime) in callees[function].items():
+            total = functions[callee][3]
+            # subtrees below the output resolution are left out
+            if callee not in stack and total > 0 and share * edgetime * COLLAPSED_SCALE >= 1:
+                visit(callee, stack, share * edgetime / total, depth + 1)
+
+    for function, (_, _, _, _, callers) in functions.items():
+        if not callers:
+            visit(function, (), 1.0, 0)
+    return {stack: round(time * COLLAPSED_SCALE) for stack, time in stacks.items() if round(time * COLLAPSED_SCALE)}
@@ -0,0 +1,497 @@
+/*
+ * Optional accelerator for py_midicsv.midi.codec.
+ *
+ * Implements `split_track` and `encode_track` with exactly the semantics of
+ * the pure-Python versions in codec.py, which remain the reference and are
+ * used whenever this module is not available.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+/* varlen values are decoded into 64 bits, so at most 9 bytes of 7 bits each */
+#define MAX_VARLEN_SIZE 9
+
+/* number of data bytes following each status nibble of a channel message */
+static const int DATA_LENGTHS[16] = {0, 0, 0, 0, 0, 0, 0, 0, 2, 2, 2, 2, 1, 1, 2, 0};
+
+static PyObject *empty_args;
+static PyObject *str_tick, *str_statusmsg, *str_channel, *str_metacommand, *str_data, *str_payload;
+
+static PyObject *
+new_data_list(const unsigned char *data, Py_ssize_t length)
+{
+    PyObject *list = PyList_New(length);
+    if (list == NULL)
+        return NULL;
+    for (Py_ssize_t i = 0; i < length; i++)
+        PyList_SET_ITEM(list, i, PyLong_FromLong(data[i]));
+    return list;
+}
+
+static int
+append_message(PyObject *messages, unsigned long long delta, int status, PyObject *metacommand, PyObject *data,
+               Py_ssize_t end)
+{
+    PyObject *message;
+    int result;
+
+    if (data == NULL)
+        return -1;
+    message = Py_BuildValue("(KiOOn)", delta, status, metacommand, data, end);
+    Py_DECREF(data);
+    if (message == NULL)
+        return -1;
+    result = PyList_Append(messages, message);
+    Py_DECREF(message);
+    return result;
+}
+
+static int
+append_event(PyObject *messages, PyObject *cls, unsigned long long delta, int channel, PyObject *data)
+{
+    PyObject *event, *value;
+    int result = -1;
+
+    if (data == NULL)
+        return -1;
+    /* the equivalent of object.__new__(cls), events are filled in by attribute */
+    event = PyBaseObject_Type.tp_new((PyTypeObject *)cls, empty_args, NULL);
+    if (event == NULL)
+        goto done;
+    value = PyLong_FromUnsignedLongLong(delta);
+    if (value == NULL || PyObject_SetAttr(event, str_tick, value) < 0) {
+        Py_XDECREF(value);
+        goto done;
+    }
+    Py_DECREF(value);
+    value = PyLong_FromLong(channel);
+    if (value == NULL || PyObject_SetAttr(event, str_channel, value) < 0) {
+        Py_XDECREF(value);
+        goto done;
+    }
+    Py_DECREF(value);
+    if (PyObject_SetAttr(event, str_data, data) < 0)
+        goto done;
+    result = PyList_Append(messages, event);
+
+done:
+    Py_XDECREF(event);
+    Py_DECREF(data);
+    return result;
+}
+
+/* channel messages of split_track in columns mode, copied into the arrays once it is done */
+typedef struct {
+    unsigned long long *ticks;
+    unsigned long long *offsets;
+    unsigned char *statuses;
+    Py_ssize_t size, capacity;
+} column_buffer;
+
+static int
+column_append(column_buffer *columns, unsigned long long tick, int status, Py_ssize_t offset)
+{
+    if (columns->size == columns->capacity) {
+        Py_ssize_t capacity = columns->capacity ? columns->capacity * 2 : 1024;
+        void *grown;
+
+        if ((grown = PyMem_Realloc(columns->ticks, capacity * sizeof(*columns->ticks))) == NULL)
+            goto nomemory;
+        columns->ticks = grown;
+        if ((grown = PyMem_Realloc(columns->offsets, capacity * sizeof(*columns->offsets))) == NULL)
+            goto nomemory;
+        columns->offsets = grown;
+        if ((grown = PyMem_Realloc(columns->statuses, capacity)) == NULL)
+            goto nomemory;
+        columns->statuses = grown;
+        columns->capacity = capacity;
+    }
+    columns->ticks[columns->size] = tick;
+    columns->offsets[columns->size] = offset;
+    columns->statuses[columns->size] = status;
+    columns->size++;
+    return 0;
+
+nomemory:
+    PyErr_NoMemory();
+    return -1;
+}
+
+static int
+extend_array(PyObject *array, const void *data, Py_ssize_t length)
+{
+    PyObject *result = PyObject_CallMethod(array, "frombytes", "y#", (const char *)data, length);
+
+    Py_XDECREF(result);
+    return result == NULL ? -1 : 0;
+}
+
+static int
+column_flush(column_buffer *columns, PyObject *arrays)
+{
+    Py_ssize_t size = columns->size;
+
+    if (size == 0)
+        return 0;
+    if (extend_array(PySequence_Fast_GET_ITEM(arrays, 0), columns->ticks, size * sizeof(*columns->ticks)) < 0 ||
+        extend_array(PySequence_Fast_GET_ITEM(arrays, 1), columns->statuses, size) < 0 ||
+        extend_array(PySequence_Fast_GET_ITEM(arrays, 2), columns->offsets, size * sizeof(*columns->offsets)) < 0)
+        return -1;
+    return 0;
+}
+
+static PyObject *
+split_track(PyObject *self, PyObject *args)
+{
+    Py_buffer view, known;
+    Py_ssize_t pos, start, end;
+    int running, used = 0;
+    unsigned long long tick = 0;
+    PyObject *classes, *arrays = Py_None, *messages = NULL, *result = NULL;
+    column_buffer columns = {NULL, NULL, NULL, 0, 0};
+
+    if (!PyArg_ParseTuple(args, "y*niy*O|OK", &view, &pos, &running, &known, &classes, &arrays, &tick))
+        return NULL;
+    Py_INCREF(arrays);
+    Py_INCREF(classes);
+    if (known.len < 128) {
+        PyErr_SetString(PyExc_ValueError, "known must cover all meta commands");
+        goto done;
+    }
+    if (arrays != Py_None) {
+        Py_SETREF(arrays, PySequence_Fast(arrays, "columns must be a sequence"));
+        if (arrays == NULL)
+            goto done;
+        if (PySequence_Fast_GET_SIZE(arrays) != 3) {
+            PyErr_SetString(PyExc_ValueError, "columns must be the ticks, statuses and offsets arrays");
+            goto done;
+        }
+    } else {
+        Py_SETREF(classes, PySequence_Fast(classes, "classes must be a sequence"));
+        if (classes == NULL)
+            goto done;
+        if (PySequence_Fast_GET_SIZE(classes) < 16) {
+            PyErr_SetString(PyExc_ValueError, "classes must cover all status nibbles");
+            goto done;
+        }
+    }
+    messages = PyList_New(0);
+    if (messages == NULL)
+        goto done;
+
+    const unsigned char *buf = view.buf;
+    const unsigned char *meta = known.buf;
+    end = view.len;
+    while (pos < end) {
+        unsigned long long delta;
+        int byte, status, length;
+
+        start = pos;
+        byte = buf[pos++];
+        delta = byte & 0x7F;
+        while (byte & 0x80) {
+            /* longer than any sane varlen, leave it to the Python decoder */
+            if (pos >= end || pos - start >= MAX_VARLEN_SIZE)
+                goto stop;
+            byte = buf[pos++];
+            delta = (delta << 7) | (byte & 0x7F);
+        }
+        if (pos >= end)
+            goto stop;
+        status = buf[pos];
+
+        if (status < 0xF0) {
+            Py_ssize_t first = pos;
+            if (status & 0x80) {
+                first++;
+            } else if (running) {
+                status = running;
+                used = 1;
+            } else {
+                goto stop;
+            }
+            length = DATA_LENGTHS[status >> 4];
+            if (first + length > end)
+                goto stop;
+            if ((buf[first] | (length == 2 ? buf[first + 1] : 0)) & 0x80)
+                goto stop;
+            running = status;
+            if (arrays != Py_None) {
+                tick += delta;
+                if (column_append(&columns, tick, status, first) < 0)
+                    goto done;
+            } else {
+                PyObject *cls = PySequence_Fast_GET_ITEM(classes, status >> 4);
+                if (append_event(messages, cls, delta, status & 0x0F, new_data_list(buf + first, length)) < 0)
+                    goto done;
+            }
+            pos = first + length;
+            continue;
+        }
+
+        PyObject *metacommand = Py_None;
+        pos++;
+        if (status == 0xFF) {
+            if (pos >= end || buf[pos] & 0x80 || !meta[buf[pos]])
+                goto stop;
+            metacommand = PyLong_FromLong(buf[pos++]);
+            if (metacommand == NULL)
+                goto done;
+        } else if (status != 0xF0 && status != 0xF7) {
+            goto stop;
+        }
+        unsigned long long datalen = 0;
+        Py_ssize_t lenstart = pos;
+        do {
+            if (pos >= end || pos - lenstart >= MAX_VARLEN_SIZE) {
+                if (metacommand != Py_None)
+                    Py_DECREF(metacommand);
+                goto stop;
+            }
+            byte = buf[pos++];
+            datalen = (datalen << 7) | (byte & 0x7F);
+        } while (byte & 0x80);
+        if (datalen > (unsigned long long)(end - pos)) {
+            if (metacommand != Py_None)
+                Py_DECREF(metacommand);
+            goto stop;
+        }
+        if (arrays != Py_None) {
+            /* meta and sysex events carry the absolute tick in columns mode */
+            tick += delta;
+            delta = tick;
+        }
+        int failed = append_message(messages, delta, status, metacommand,
+                                    PyBytes_FromStringAndSize((const char *)buf + pos, datalen), pos + datalen);
+        if (metacommand != Py_None)
+            Py_DECREF(metacommand);
+        if (failed < 0)
+            goto done;
+        pos += datalen;
+        continue;
+
+    stop:
+        pos = start;
+        break;
+    }
+    if (arrays != Py_None && column_flush(&columns, arrays) < 0)
+        goto done;
+    result = Py_BuildValue("(Onii)", messages, pos, running, used);
+
+done:
+    PyMem_Free(columns.ticks);
+    PyMem_Free(columns.offsets);
+    PyMem_Free(columns.statuses);
+    Py_XDECREF(messages);
+    Py_XDECREF(arrays);
+    Py_XDECREF(classes);
+    PyBuffer_Release(&view);
+    PyBuffer_Release(&known);
+    return result;
+}
+
+/* the check and message of bytearray.append, which the Python encoder relies on */
+static int
+check_byte(long value)
+{
+    if (value < 0 || value > 255) {
+        PyErr_SetString(PyExc_ValueError, "byte must be in range(0, 256)");
+        return -1;
+    }
+    return 0;
+}
+
+static int
+append_bytes(PyObject *out, const char *data, Py_ssize_t length)
+{
+    Py_ssize_t size = PyByteArray_GET_SIZE(out);
+    if (PyByteArray_Resize(out, size + length) < 0)
+        return -1;
+    memcpy(PyByteArray_AS_STRING(out) + size, data, length);
+    return 0;
+}
+
+static int
+write_varlen(PyObject *out, long long value)
+{
+    unsigned char res[4];
+    int n = 0;
+
+    /* same arithmetic as util.write_varlen, including its 4 byte limit */
+    res[3] = value & 0x7F;
+    n = 1;
+    value >>= 7;
+    while (value && n < 4) {
+        res[3 - n] = (value & 0x7F) | 0x80;
+        value >>= 7;
+        n++;
+    }
+    return append_bytes(out, (const char *)res + 4 - n, n);
+}
+
+static int
+append_data(PyObject *out, PyObject *data, int with_length)
+{
+    PyObject *seq;
+    Py_ssize_t length, size;
+    int result = -1;
+
+    if (PyBytes_Check(data)) {
+        length = PyBytes_GET_SIZE(data);
+        if (with_length && write_varlen(out, length) < 0)
+            return -1;
+        return append_bytes(out, PyBytes_AS_STRING(data), length);
+    }
+    seq = PySequence_Fast(data, "event data must be a sequence");
+    if (seq == NULL)
+        return -1;
+    length = PySequence_Fast_GET_SIZE(seq);
+    if (with_length && write_varlen(out, length) < 0)
+        goto done;
+    size = PyByteArray_GET_SIZE(out);
+    if (PyByteArray_Resize(out, size + length) < 0)
+        goto done;
+    char *dest = PyByteArray_AS_STRING(out) + size;
+    for (Py_ssize_t i = 0; i < length; i++) {
+        long value = PyLong_AsLong(PySequence_Fast_GET_ITEM(seq, i));
+        if (value == -1 && PyErr_Occurred())
+            goto done;
+        if (check_byte(value) < 0)
+            goto done;
+        dest[i] = (char)value;
+    }
+    result = 0;
+
+done:
+    Py_DECREF(seq);
+    return result;
+}
+
+static long
+get_int_attr(PyObject *obj, PyObject *name)
+{
+    PyObject *value = PyObject_GetAttr(obj, name);
+    long result;
+
+    if (value == NULL)
+        return -1;
+    result = PyLong_AsLong(value);
+    Py_DECREF(value);
+    return result;
+}
+
+static PyObject *
+encode_track(PyObject *self, PyObject *args)
+{
+    PyObject *events, *iterator, *event, *out;
+    int running, use_running_status;
+
+    if (!PyArg_ParseTuple(args, "Oip", &events, &running, &use_running_status))
+        return NULL;
+    iterator = PyObject_GetIter(events);
+    if (iterator == NULL)
+        return NULL;
+    out = PyByteArray_FromStringAndSize(NULL, 0);
+    if (out == NULL)
+        goto error;
+
+    while ((event = PyIter_Next(iterator)) != NULL) {
+        PyObject *tick = PyObject_GetAttr(event, str_tick);
+        PyObject *data;
+        long long delta;
+        long status;
+        char header[2];
+        int n = 0, failed;
+
+        if (tick == NULL)
+            goto event_error;
+        if (!PyLong_Check(tick)) {
+            PyErr_SetObject(PyExc_AssertionError, tick);
+            Py_DECREF(tick);
+            goto event_error;
+        }
+        delta = PyLong_AsLongLong(tick);
+        Py_DECREF(tick);
+        if (delta == -1 && PyErr_Occurred())
+            goto event_error;
+        status = get_int_attr(event, str_statusmsg);
+        if (status == -1 && PyErr_Occurred())
+            goto event_error;
+        if (write_varlen(out, delta) < 0)
+            goto event_error;
+
+        if (status == 0xFF) {
+            long metacommand = get_int_attr(event, str_metacommand);
+            if ((metacommand == -1 && PyErr_Occurred()) || check_byte(metacommand) < 0)
+                goto event_error;
+            running = -1;
+            header[n++] = (char)status;
+            header[n++] = (char)metacommand;
+        } else if (status == 0xF0 || status == 0xF7) {
+            running = -1;
+            header[n++] = (char)status;
+        } else {
+            long channel = get_int_attr(event, str_channel);
+            if (channel == -1 && PyErr_Occurred())
+                goto event_error;
+            status |= channel;
+            /* never equal to the running status, so the Python encoder would write it */
+            if (check_byte(status) < 0)
+                goto event_error;
+            if (status != running || !use_running_status) {
+                running = status;
+                header[n++] = (char)status;
+            }
+        }
+        if (append_bytes(out, header, n) < 0)
+            goto event_error;
+        /* meta and sysex events hand out their payload without decoding it */
+        data = PyObject_GetAttr(event, status >= 0xF0 ? str_payload : str_data);
+        if (data == NULL)
+            goto event_error;
+        failed = append_data(out, data, status >= 0xF0);
+        Py_DECREF(data);
+        if (failed < 0)
+            goto event_error;
+        Py_DECREF(event);
+        continue;
+
+    event_error:
+        Py_DECREF(event);
+        goto error;
+    }
+    if (PyErr_Occurred())
+        goto error;
+    Py_DECREF(iterator);
+    return Py_BuildValue("(Ni)", out, running);
+
+error:
+    Py_XDECREF(out);
+    Py_DECREF(iterator);
+    return NULL;
+}
+
+static PyMethodDef codec_methods[] = {
+    {"split_track", split_track, METH_VARARGS, "Splits a track body into messages up to the first irregular event."},
+    {"encode_track", encode_track, METH_VARARGS, "Encodes a sequence of events into a track body."},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef codec_module = {
+    PyModuleDef_HEAD_INIT, "_codec", NULL, -1, codec_methods,
+};
+
+PyMODINIT_FUNC
+PyInit__codec(void)
+{
+    empty_args = PyTuple_New(0);
+    str_tick = PyUnicode_InternFromString("tick");
+    str_statusmsg = PyUnicode_InternFromString("statusmsg");
+    str_channel = PyUnicode_InternFromString("channel");
+    str_metacommand = PyUnicode_InternFromString("metacommand");
+    str_data = PyUnicode_InternFromString("data");
+    str_payload = PyUnicode_InternFromString("payload");
+    if (!empty_args || !str_tick || !str_statusmsg || !str_channel || !str_metacommand || !str_data || !str_payload)
+        return NULL;
+    return PyModule_Create(&codec_module);
+}
@@ -0,0 +1,190 @@
+### Local ###
+from .constants import CHANNEL_DATA_LENGTHS
+from .util import write_varlen
+
+try:
+    from ._codec import encode_track as native_encode_track
+    from ._codec import split_track as native_split_track
+except ImportError:
+    native_encode_track = native_split_track = None
+
+# True when the compiled accelerator is in use
+NATIVE = native_split_track is not None
+
+# varlen values longer than this are left to the event-by-event decoder
+MAX_VARLEN_SIZE = 9
+
+
+def py_split_track(buf, pos, running, known, classes, columns=None, tick=0):
+    """Pure-Python implementation of `split_track`."""
+    messages = []
+    add = messages.append
+    if columns is not None:
+        add_tick, add_status, add_offset = (column.append for column in columns)
+    new_event = object.__new__
+    lengths = CHANNEL_DATA_LENGTHS
+    end = len(buf)
+    used = False
+    while pos < end:
+        start = pos
+        try:
+            byte = buf[pos]
+            pos += 1
+            delta = byte & 0x7F
+            while byte & 0x80:
+                if pos - start >= MAX_VARLEN_SIZE:
+                    raise IndexError
+                byte = buf[pos]
+                pos += 1
+                delta = (delta << 7) | (byte & 0x7F)
+            status = buf[pos]
+
+            if status < 0xF0:
+                if status & 0x80:
+                    pos += 1
+                elif running:
+                    status = running
+                    used = True
+                else:
+                    raise IndexError
+                length = lengths[status >> 4]
+                # every channel message has one or two data bytes
+                if pos + length > end or (buf[pos] | buf[pos + length - 1]) & 0x80:
+                    raise IndexError
+                running = status
+                if columns is not None:
+                    tick += delta
+                    add_tick(tick)
+                    add_status(status)
+                    add_offset(pos)
+                    pos += length
+                    continue
+                event = new_event(classes[status >> 4])
+                event.tick = delta
+                event.channel = status & 0x0F
+                event.data = list(buf[pos : pos + length])
+                pos += length
+                add(event)
+                continue
+
+            pos += 1
+            if status == 0xFF:
+                metacommand = buf[pos]
+                if metacommand & 0x80 or not known[metacommand]:
+                    raise IndexError
+                pos += 1
+            elif status == 0xF0 or status == 0xF7:
+                metacommand = None
+            else:
+                raise IndexError
+            lenstart = pos
+            datalen = 0
+            byte = 0x80
+            while byte & 0x80:
+                if pos - lenstart >= MAX_VARLEN_SIZE:
+                    raise IndexError
+                byte = buf[pos]
+                pos += 1
+                datalen = (datalen << 7) | (byte & 0x7F)
+            if pos + datalen > end:
+                raise IndexError
+            data = bytes(buf[pos : pos + datalen])
+            pos += datalen
+            if columns is not None:
+                tick += delta
+                delta = tick
+            add((delta, status, metacommand, data, pos))
+        except IndexError:
+            pos = start
+            break
+    return messages, pos, running, used
+
+
+def split_track(buf, pos, running, known, classes, columns=None, tick=0):
+    """Splits a track body into messages, up to the first irregular event.
+
+    Decoding stops in front of anything that needs the warnings or error
+    handling of `FileReader.iter_trackbuffer`: data bytes with the high bit
+    set, unknown status bytes or meta commands, a missing running status and
+    truncated events.
+
+    Args:
+        buf: The track body, without the MTrk header.
+        pos: Offset to start decoding at.
+        running: The running status in effect at `pos`, 0 if none.
+        known: 128 flags telling which meta commands may be decoded.
+        classes: The event class for each of the 16 status nibbles.
+        columns: Optional `(ticks, statuses, offsets)` arrays of typecodes
+                 "Q", "B" and "Q". Channel messages are appended to them
+                 instead of being returned as events, with their absolute
+                 tick, status byte and the offset of their first data byte.
+        tick: The absolute tick at `pos`, only used with `columns`.
+
+    Returns:
+        A tuple `(messages, pos, running, used_running_status)`. Channel
+        messages are returned as events of the given classes, meta and sysex
+        events as `(delta, status, metacommand, payload, end)` tuples, with
+        the payload as bytes and `metacommand` None for sysex. With `columns`
+        the first item of these tuples is the absolute tick instead of the
+        delta. `pos` is the offset at which decoding stopped and `running`
+        the running status in effect there.
+    """
+    if NATIVE:
+        messages, pos, running, used = native_split_track(buf, pos, running, known, classes, columns, tick)
+        return messages, pos, running, bool(used)
+    return py_split_track(buf, pos, running, known, classes, columns, tick)
+
+
+def py_encode_track(events, running_status=None, use_running_status=True):
+    """Pure-Python implementation of `encode_track`."""
+    buf = bytearray()
+    for event in events:
+        assert isinstance(event.tick, int), event.tick
+        tick = event.tick
+        if 0 <= tick < 0x80:
+            buf.append(tick)
+        else:
+            buf.extend(write_varlen(tick))
+        status = event.statusmsg
+        if status == 0xFF:
+            running_status = None
+            buf.append(status)
+            buf.append(event.metacommand)
+            payload = event.payload
+            buf.extend(write_varlen(len(payload)))
+            buf.extend(payload)
+        elif status == 0xF0 or status == 0xF7:
+            running_status = None
+            buf.append(status)
+            payload = event.payload
+            buf.extend(write_varlen(len(payload)))
+            buf.extend(payload)
+        else:
+            status |= event.channel
+            if status != running_status or not use_running_status:
+                running_status = status
+                buf.append(status)
+            buf.extend(event.data)
+    return buf, running_status
+
+
+def encode_track(events, running_status=None, use_running_status=True):
+    """Encodes a sequence of events into the body of a track.
+
+    Produces the same bytes as calling `FileWriter.encode_midi_event`
+    for each event in turn.
+
+    Args:
+        events: Events with relative ticks.
+        running_status: The running status in effect before the first event.
+        use_running_status: Omit repeated status bytes of channel messages.
+
+    Returns:
+        A tuple of the encoded bytearray and the running status after the last event.
+    """
+    if NATIVE:
+        buf, running_status = native_encode_track(
+            events, -1 if running_status is None else running_status, use_running_status
+        )
+        return buf, None if running_status < 0 else running_status
+    return py_encode_track(events, running_status, use_running_status)
@@ -50,3 +50,9 @@ THIRTYSECOND = 5
 SIXTYFOURTH = 6
 
 DEFAULT_MIDI_HEADER_SIZE = 14
+DEFAULT_READ_BLOCK_SIZE = 65536
+# tracks up to this size are read in one go and decoded from memory
+MAX_BUFFERED_TRACK_SIZE = 1 << 24
+
+# Number of data bytes following a channel message, indexed by status nibble
+CHANNEL_DATA_LENGTHS = (0, 0, 0, 0, 0, 0, 0, 0, 2, 2, 2, 2, 1, 1, 2, 0)
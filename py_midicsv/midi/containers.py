@@ -1,5 +1,9 @@
 ### System ###
-from pprint import pformat
+from array import array
+from collections.abc import MutableSequence
+
+### Local ###
+from .events import Event, EventRegistry, SysexEvent
 
 
 class Pattern(list):
@@ -12,6 +16,8 @@ class Pattern(list):
         super().__init__(tracks or [])
 
     def __repr__(self):
+        from pprint import pformat
+
         return f"midi.Pattern(format={self.format!r}, resolution={self.resolution!r}, tracks=\\\n{pformat(list(self))})"
 
     def make_ticks_abs(self):
@@ -75,4 +81,162 @@ class Track(list):
         return self.__getitem__(slice(i, j))
 
     def __repr__(self):
+        from pprint import pformat
+
         return "Track(\\\n  {})".format(pformat(list(self)).replace("\n", "\n  "))
+
+
+class CompactTrack(MutableSequence):
+    """Track that stores channel messages in parallel columns.
+
+    Ticks, status bytes and the two data bytes of each channel message are
+    kept in an `array` and three `bytearray`s, all other events are stored
+    as objects. Event objects for channel messages are only created when
+    they are accessed, so a CompactTrack uses a fraction of the memory of a
+    Track while offering the same list interface.
+
+    Channel events returned by indexing or iteration are fresh objects:
+    changing them does not change the track unless they are assigned back.
+    """
+
+    def __init__(self, events=None, tick_relative=True):
+        self.tick_relative = tick_relative
+        self.ticks = array("I")
+        self.status = bytearray()
+        self.data1 = bytearray()
+        self.data2 = bytearray()
+        # events that cannot be stored in columns, None for columnar entries
+        self.objects = []
+        if events:
+            self.extend(events)
+
+    @staticmethod
+    def pack(event):
+        cls = type(event)
+        if (
+            isinstance(event, Event)
+            and not isinstance(event, SysexEvent)
+            and EventRegistry.Events.get(cls.statusmsg) is cls
+            and 0 <= event.tick <= 0xFFFFFFFF
+            and 0 <= event.channel <= 0x0F
+        ):
+            data = event.data
+            if len(data) == 2 and cls.length == 2 and 0 <= data[0] <= 0xFF and 0 <= data[1] <= 0xFF:
+                return event.tick, cls.statusmsg | event.channel, data[0], data[1], None
+            if len(data) == 1 and cls.length == 1 and 0 <= data[0] <= 0xFF:
+                return event.tick, cls.statusmsg | event.channel, data[0], 0, None
+        return 0, 0, 0, 0, event
+
+    def unpack(self, index):
+        event = self.objects[index]
+        if event is not None:
+            return event
+        status = self.status[index]
+        cls = EventRegistry.Events[status & 0xF0]
+        if cls.length == 2:
+            data = [self.data1[index], self.data2[index]]
+        else:
+            data = [self.data1[index]]
+        return cls(tick=self.ticks[index], channel=status & 0x0F, data=data)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            track = CompactTrack(tick_relative=self.tick_relative)
+            track.ticks = self.ticks[item]
+            track.status = self.status[item]
+            track.data1 = self.data1[item]
+            track.data2 = self.data2[item]
+            track.objects = self.objects[item]
+            return track
+        return self.unpack(range(len(self))[item])
+
+    def __setitem__(self, item, value):
+        if isinstance(item, slice):
+            packed = [self.pack(event) for event in value]
+            ticks, status, data1, data2, objects = zip(*packed) if packed else ((),) * 5
+            self.ticks[item] = array("I", ticks)
+            self.status[item] = bytes(status)
+            self.data1[item] = bytes(data1)
+            self.data2[item] = bytes(data2)
+            self.objects[item] = objects
+            return
+        item = range(len(self))[item]
+        tick, status, data1, data2, event = self.pack(value)
+        self.ticks[item] = tick
+        self.status[item] = status
+        self.data1[item] = data1
+        self.data2[item] = data2
+        self.objects[item] = event
+
+    def __delitem__(self, item):
+        del self.ticks[item]
+        del self.status[item]
+        del self.data1[item]
+        del self.data2[item]
+        del self.objects[item]
+
+    def insert(self, index, event):
+        tick, status, data1, data2, event = self.pack(event)
+        self.ticks.insert(index, tick)
+        self.status.insert(index, status)
+        self.data1.insert(index, data1)
+        self.data2.insert(index, data2)
+        self.objects.insert(index, event)
+
+    def append(self, event):
+        tick, status, data1, data2, event = self.pack(event)
+        self.ticks.append(tick)
+        self.status.append(status)
+        self.data1.append(data1)
+        self.data2.append(data2)
+        self.objects.append(event)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.unpack(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, CompactTrack)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def get_tick(self, index):
+        event = self.objects[index]
+        return self.ticks[index] if event is None else event.tick
+
+    def set_tick(self, index, tick):
+        event = self.objects[index]
+        if event is not None:
+            event.tick = tick
+        elif 0 <= tick <= 0xFFFFFFFF:
+            self.ticks[index] = tick
+        else:
+            # out of range for the column, keep it as an object instead
+            event = self.unpack(index)
+            event.tick = tick
+            self.objects[index] = event
+
+    def make_ticks_abs(self):
+        if self.tick_relative:
+            self.tick_relative = False
+            running_tick = 0
+            for index in range(len(self)):
+                running_tick += self.get_tick(index)
+                self.set_tick(index, running_tick)
+
+    def make_ticks_rel(self):
+        if not self.tick_relative:
+            self.tick_relative = True
+            running_tick = 0
+            for index in range(len(self)):
+                tick = self.get_tick(index)
+                self.set_tick(index, tick - running_tick)
+                running_tick = tick
+
+    def __repr__(self):
+        from pprint import pformat
+
+        return "CompactTrack(\\\n  {})".format(pformat(list(self)).replace("\n", "\n  "))
@@ -1,5 +1,4 @@
 ### System ###
-import struct
 from abc import abstractmethod
 from functools import total_ordering
 from typing import ClassVar
@@ -37,6 +36,8 @@ class AutoRegister(type):
 
 @total_ordering
 class AbstractEvent(metaclass=AutoRegister):
+    __slots__ = ("tick", "data")
+
     name = "Generic MIDI Event"
     length = 0
     statusmsg = 0x0
@@ -71,6 +72,8 @@ class AbstractEvent(metaclass=AutoRegister):
 
 @total_ordering
 class Event(AbstractEvent):
+    __slots__ = ("channel",)
+
     name = "Event"
 
     def __init__(self, tick=0, channel=0, **kwargs):
@@ -95,13 +98,66 @@ class Event(AbstractEvent):
         return cls.statusmsg == (statusmsg & 0xF0)
 
 
-class MetaEvent(AbstractEvent):
+class LazyPayload:
+    """
+    Mixin for events carrying a variable payload, i.e. meta and sysex events.
+
+    Events read from a file are built with `from_payload`, which keeps the
+    raw bytes and leaves `data` to be decoded into a list of ints when it
+    is first accessed. Classes using it need a `_payload` slot.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_payload(cls, tick, payload):
+        event = object.__new__(cls)
+        event.tick = tick
+        event._payload = payload
+        return event
+
+    @property
+    def data(self):
+        try:
+            return AbstractEvent.data.__get__(self)
+        except AttributeError:
+            data = list(self._payload)
+            AbstractEvent.data.__set__(self, data)
+            return data
+
+    @data.setter
+    def data(self, value):
+        AbstractEvent.data.__set__(self, value)
+
+    @property
+    def payload(self):
+        """The payload as bytes, without decoding `data` if it was not accessed yet."""
+        try:
+            return bytes(AbstractEvent.data.__get__(self))
+        except AttributeError:
+            return self._payload
+
+    def __getstate__(self):
+        # the default state would be read through the `data` property and decode it
+        slots = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                try:
+                    slots[name] = cls.__dict__[name].__get__(self)
+                except AttributeError:
+                    pass
+        return None, slots
+
+
+class MetaEvent(LazyPayload, AbstractEvent):
     """
     MetaEvent is a special subclass of Event that is not meant to
     be used as a concrete class.  It defines a subset of Events known
     as the Meta events.
     """
 
+    __slots__ = ("_payload",)
+
     statusmsg = 0xFF
     metacommand = 0x0
     name = "Meta Event"
@@ -118,6 +174,8 @@ class NoteEvent(Event):
     and NoteOff events.
     """
 
+    __slots__ = ()
+
     length = 2
 
     def get_pitch(self):
@@ -142,16 +200,22 @@ class NoteEvent(Event):
 
 
 class NoteOnEvent(NoteEvent):
+    __slots__ = ()
+
     statusmsg = 0x90
     name = "Note On"
 
 
 class NoteOffEvent(NoteEvent):
+    __slots__ = ()
+
     statusmsg = 0x80
     name = "Note Off"
 
 
 class AfterTouchEvent(Event):
+    __slots__ = ()
+
     statusmsg = 0xA0
     length = 2
     name = "After Touch"
@@ -178,6 +242,8 @@ class AfterTouchEvent(Event):
 
 
 class ControlChangeEvent(Event):
+    __slots__ = ()
+
     statusmsg = 0xB0
     length = 2
     name = "Control Change"
@@ -204,6 +270,8 @@ class ControlChangeEvent(Event):
 
 
 class ProgramChangeEvent(Event):
+    __slots__ = ()
+
     statusmsg = 0xC0
     length = 1
     name = "Program Change"
@@ -221,6 +289,8 @@ class ProgramChangeEvent(Event):
 
 
 class ChannelAfterTouchEvent(Event):
+    __slots__ = ()
+
     statusmsg = 0xD0
     length = 1
     name = "Channel After Touch"
@@ -238,6 +308,8 @@ class ChannelAfterTouchEvent(Event):
 
 
 class PitchWheelEvent(Event):
+    __slots__ = ()
+
     statusmsg = 0xE0
     length = 2
     name = "Pitch Wheel"
@@ -253,109 +325,158 @@ class PitchWheelEvent(Event):
     pitch = property(get_pitch, set_pitch)
 
 
-class SysexEvent(Event):
+class SysexEvent(LazyPayload, Event):
+    __slots__ = ("_payload",)
+
     statusmsg = 0xF0
     name = "SysEx"
     length = "varlen"
 
+    @classmethod
+    def from_payload(cls, tick, payload):
+        event = super().from_payload(tick, payload)
+        event.channel = 0
+        return event
+
     @classmethod
     def is_event(cls, statusmsg):
         return cls.statusmsg == statusmsg or statusmsg == 0xF7
 
 
 class SequenceNumberMetaEvent(MetaEvent):
+    # keeps accepting the `value` keyword, which is stored but not encoded
+    __slots__ = ("value",)
+
     name = "Sequence Number"
     metacommand = 0x00
     length = 2
 
 
 class MetaEventWithText(MetaEvent):
-    def __init__(self, **kw):
-        super().__init__(**kw)
-        if "text" not in kw:
-            self.text = b"".join(struct.pack("B", datum) for datum in self.data)
+    __slots__ = ("_text",)
+
+    @property
+    def text(self):
+        # taken from the payload unless given explicitly
+        try:
+            return self._text
+        except AttributeError:
+            text = self._text = self.payload
+            return text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
 
     def __repr__(self):
-        return self.__baserepr__(["text"])
+        return f"{self.__class__.__name__}(tick={self.tick}, text={self.text!r})"
 
 
 class TextMetaEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Text"
     metacommand = 0x01
     length = "varlen"
 
 
 class CopyrightMetaEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Copyright Notice"
     metacommand = 0x02
     length = "varlen"
 
 
 class TrackNameEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Track Name"
     metacommand = 0x03
     length = "varlen"
 
 
 class InstrumentNameEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Instrument Name"
     metacommand = 0x04
     length = "varlen"
 
 
 class LyricsEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Lyrics"
     metacommand = 0x05
     length = "varlen"
 
 
 class MarkerEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Marker"
     metacommand = 0x06
     length = "varlen"
 
 
 class CuePointEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Cue Point"
     metacommand = 0x07
     length = "varlen"
 
 
 class ProgramNameEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Program Name"
     metacommand = 0x08
     length = "varlen"
 
 
 class DeviceNameEvent(MetaEventWithText):
+    __slots__ = ()
+
     name = "Device Name"
     metacommand = 0x09
     length = "varlen"
 
 
 class ChannelPrefixEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Channel Prefix"
     metacommand = 0x20
     length = 1
 
 
 class PortEvent(MetaEvent):
+    __slots__ = ()
+
     name = "MIDI Port/Cable"
     metacommand = 0x21
     length = 1
 
 
 class TrackLoopEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Track Loop"
     metacommand = 0x2E
 
 
 class EndOfTrackEvent(MetaEvent):
+    __slots__ = ()
+
     name = "End of Track"
     metacommand = 0x2F
 
 
 class SetTempoEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Set Tempo"
     metacommand = 0x51
     length = 3
@@ -380,6 +501,8 @@ class SetTempoEvent(MetaEvent):
 
 
 class SmpteOffsetEvent(MetaEvent):
+    __slots__ = ()
+
     name = "SMPTE Offset"
     metacommand = 0x54
     length = 5
@@ -426,6 +549,8 @@ class SmpteOffsetEvent(MetaEvent):
 
 
 class TimeSignatureEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Time Signature"
     metacommand = 0x58
     length = 4
@@ -464,6 +589,8 @@ class TimeSignatureEvent(MetaEvent):
 
 
 class KeySignatureEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Key Signature"
     metacommand = 0x59
     length = 2
@@ -487,11 +614,15 @@ class KeySignatureEvent(MetaEvent):
 
 
 class SequencerSpecificEvent(MetaEvent):
+    __slots__ = ()
+
     name = "Sequencer Specific"
     metacommand = 0x7F
     length = "varlen"
 
 
 class SysexF7Event(SysexEvent):
+    __slots__ = ()
+
     statusmsg = 0xF7
     name = "SysExF7"
@@ -0,0 +1,231 @@
+### System ###
+from array import array
+
+### Local ###
+from .codec import split_track
+from .constants import CHANNEL_DATA_LENGTHS as DATA_LENGTHS
+from .fileio import FileReader, warn_or_error
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EVENT_COLUMNS = (
+    ("track", "H"),
+    ("tick", "Q"),
+    ("status", "B"),
+    ("channel", "B"),
+    ("data1", "B"),
+    ("data2", "B"),
+)
+EVENT_DTYPE = list(EVENT_COLUMNS)
+# unlike the event objects, the side table records every meta command
+ALL_META_COMMANDS = bytes([True]) * 128
+
+
+class ArrayPattern:
+    """Column-oriented decoding result of a MIDI file.
+
+    `events` holds one entry per channel message (either a dict of
+    `array.array` columns or a NumPy structured array, see `read_columns`
+    and `read_array`). `meta` is a side table of
+    `(track, tick, status, metacommand, payload)` tuples for all meta and
+    sysex events, where `metacommand` is None for sysex events.
+    """
+
+    def __init__(self, format, resolution, tracks, events, meta):
+        self.format = format
+        self.resolution = resolution
+        self.tracks = tracks
+        self.events = events
+        self.meta = meta
+
+    def __repr__(self):
+        return (
+            f"ArrayPattern(format={self.format!r}, resolution={self.resolution!r}, "
+            f"tracks={self.tracks!r}, events={len(self.events['tick'])}, meta={len(self.meta)})"
+        )
+
+
+def scan_event(buf, pos, tick, running, track, meta, columns, strict=True, basepos=0):
+    """Records the single event at `pos` that `split_track` stopped in front of.
+
+    Warnings give the position in the file like `FileReader`, `basepos` is
+    the file offset of `buf`.
+
+    Returns:
+        A tuple `(pos, tick, running)` for the next event, `pos` is past the
+        end of `buf` once the track is truncated.
+    """
+    ticks, statuses, offsets = columns
+    try:
+        byte = buf[pos]
+        pos += 1
+        delta = byte & 0x7F
+        while byte & 0x80:
+            byte = buf[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7F)
+        tick += delta
+
+        status = buf[pos]
+        if status & 0x80:
+            pos += 1
+            if status < 0xF0:
+                running = status
+        elif running:
+            status = running
+        else:
+            warn_or_error(f"Unexpected data byte 0x{status:02X} at position {basepos + pos + 1}", strict)
+            return pos + 1, tick, running
+
+        if status < 0xF0:
+            # data bytes out of range are reported by `check_data_bytes`
+            ticks.append(tick)
+            statuses.append(status)
+            offsets.append(pos)
+            return pos + DATA_LENGTHS[status >> 4], tick, running
+
+        if status == 0xFF:
+            metacommand = buf[pos]
+            pos += 1
+        elif status == 0xF0 or status == 0xF7:
+            metacommand = None
+        else:
+            warn_or_error(f"Unknown MIDI Event {status} at position {basepos + pos}", strict)
+            return pos, tick, running
+        byte = buf[pos]
+        pos += 1
+        length = byte & 0x7F
+        while byte & 0x80:
+            byte = buf[pos]
+            pos += 1
+            length = (length << 7) | (byte & 0x7F)
+        meta.append((track, tick, status, metacommand, bytes(buf[pos : pos + length])))
+        return pos + length, tick, running
+    except IndexError:
+        # truncated track, same as the object path this silently ends the track
+        return len(buf), tick, running
+
+
+def scan_track(buf, track, meta, strict=True, basepos=0):
+    """Locates all channel messages in a single MTrk body.
+
+    Regular events are split by `codec.split_track`, the events it stops in
+    front of are handled one at a time by `scan_event`. Meta and sysex events
+    are appended to `meta` as they are found. `basepos` is the file offset
+    of `buf`, used in warnings.
+
+    Returns:
+        A tuple of `array.array` columns `(ticks, statuses, offsets)`, where
+        `offsets` gives the position of each message's first data byte in `buf`.
+    """
+    columns = ticks, statuses, offsets = array("Q"), array("B"), array("Q")
+    end = len(buf)
+    pos = 0
+    tick = 0
+    running = 0
+    while pos < end:
+        messages, pos, running, _ = split_track(buf, pos, running, ALL_META_COMMANDS, None, columns, tick)
+        meta.extend((track, *message[:4]) for message in messages)
+        # ticks only grow, the last message decoded has the tick at `pos`
+        tick = max(tick, ticks[-1] if ticks else 0, messages[-1][0] if messages else 0)
+        if pos < end:
+            pos, tick, running = scan_event(buf, pos, tick, running, track, meta, columns, strict, basepos)
+    # drop a trailing channel message whose data bytes were cut off
+    if offsets and offsets[-1] + DATA_LENGTHS[statuses[-1] >> 4] > end:
+        ticks.pop()
+        statuses.pop()
+        offsets.pop()
+    return ticks, statuses, offsets
+
+
+def check_data_bytes(highest, strict=True):
+    if highest > 127:
+        warn_or_error("Data byte out of range in channel message", strict, is_parse=False)
+
+
+def read_tracks(midifile, strict=True):
+    reader = FileReader()
+    pattern = reader.parse_file_header(midifile, strict)
+    meta = []
+    tracks = []
+    for index in range(len(pattern)):
+        trksz = reader.parse_track_header(midifile)
+        buf = midifile.read(trksz)
+        tracks.append((buf, *scan_track(buf, index, meta, strict, reader.basepos)))
+        reader.basepos += trksz
+    return pattern, tracks, meta
+
+
+def read_columns(midifile, strict=True):
+    """Decodes a MIDI file into `array.array` columns without building event objects.
+
+    Args:
+        midifile: A string giving the path to a file on disk or
+                  an open binary file-like object.
+
+    Returns:
+        An `ArrayPattern` whose `events` is a dict mapping each column name
+        in `EVENT_COLUMNS` to an `array.array`.
+    """
+    if type(midifile) in (str, bytes):
+        with open(midifile, "rb") as inp:
+            return read_columns(inp, strict)
+    pattern, tracks, meta = read_tracks(midifile, strict)
+    columns = {name: array(typecode) for name, typecode in EVENT_COLUMNS}
+    for index, (buf, ticks, statuses, offsets) in enumerate(tracks):
+        columns["track"].extend(array("H", [index]) * len(ticks))
+        columns["tick"].extend(ticks)
+        columns["status"].extend(array("B", [status & 0xF0 for status in statuses]))
+        columns["channel"].extend(array("B", [status & 0x0F for status in statuses]))
+        columns["data1"].extend(array("B", [buf[offset] for offset in offsets]))
+        columns["data2"].extend(
+            array(
+                "B",
+                [buf[offset + 1] if DATA_LENGTHS[status >> 4] == 2 else 0 for status, offset in zip(statuses, offsets)],
+            )
+        )
+    check_data_bytes(max(columns["data1"], default=0) | max(columns["data2"], default=0), strict)
+    return ArrayPattern(pattern.format, pattern.resolution, len(pattern), columns, meta)
+
+
+def read_array(midifile, strict=True):
+    """Decodes a MIDI file into a NumPy structured array of channel messages.
+
+    Requires NumPy to be installed.
+
+    Args:
+        midifile: A string giving the path to a file on disk or
+                  an open binary file-like object.
+
+    Returns:
+        An `ArrayPattern` whose `events` is a structured array with the
+        fields listed in `EVENT_COLUMNS`.
+    """
+    if np is None:
+        raise ImportError("read_array requires numpy to be installed")
+    if type(midifile) in (str, bytes):
+        with open(midifile, "rb") as inp:
+            return read_array(inp, strict)
+    pattern, tracks, meta = read_tracks(midifile, strict)
+    lengths = np.array(DATA_LENGTHS, dtype=np.uint8)
+    parts = []
+    for index, (buf, ticks, statuses, offsets) in enumerate(tracks):
+        data = np.frombuffer(buf, dtype=np.uint8)
+        status = np.frombuffer(statuses, dtype=np.uint8)
+        offset = np.frombuffer(offsets, dtype=np.uint64).astype(np.intp)
+        events = np.empty(len(status), dtype=EVENT_DTYPE)
+        events["track"] = index
+        events["tick"] = np.frombuffer(ticks, dtype=np.uint64)
+        events["status"] = status & 0xF0
+        events["channel"] = status & 0x0F
+        events["data1"] = data[offset]
+        second = np.minimum(offset + 1, max(len(data) - 1, 0))
+        events["data2"] = np.where(lengths[status >> 4] == 2, data[second], 0)
+        parts.append(events)
+    events = np.concatenate(parts) if parts else np.empty(0, dtype=EVENT_DTYPE)
+    if len(events):
+        check_data_bytes(int(events["data1"].max() | events["data2"].max()), strict)
+    return ArrayPattern(pattern.format, pattern.resolution, len(pattern), events, meta)
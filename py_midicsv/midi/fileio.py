@@ -1,9 +1,15 @@
+import mmap
+import os
 import sys
+from itertools import chain
 from struct import pack, unpack
 
+from . import codec
 from .constants import *
 from .containers import *
 from .events import *
+from .filters import EventFilter
+from .tempo import TempoMap
 from .util import *
 
 
@@ -24,6 +30,17 @@ def warn_or_error(text, strict=True, is_parse=True):
     print(f"Warning: {text}", file=sys.stderr)
 
 
+def read_chunk_blocks(midifile, size, blocksize=DEFAULT_READ_BLOCK_SIZE):
+    # yields the next `size` bytes of the file in blocks of at most
+    # `blocksize` bytes, so chunk bodies never have to be read in one go
+    while size > 0:
+        block = midifile.read(min(size, blocksize))
+        if not block:
+            return
+        size -= len(block)
+        yield block
+
+
 class Trackiter:
     def __init__(self, iterable, pos=0):
         self._buf = iterable
@@ -57,13 +74,87 @@ class Trackiter:
             print(f"Warning: {e}", file=sys.stderr)
         return byte
 
+    def read(self, size):
+        return [self.__next__() for x in range(size)]
+
+
+class BufferFile:
+    """Minimal read-only file object over a bytes-like buffer.
+
+    Reads return memoryview slices of the buffer, so nothing is copied.
+    Use `BufferFile.map` to back it with a memory-mapped file, which is
+    unmapped by `close` or at the end of a `with` block.
+    """
+
+    def __init__(self, buffer, pos=0):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = pos
+        self._mapping = None
+
+    @classmethod
+    def map(cls, file):
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = cls(mapping, file.tell())
+        buffer._mapping = mapping
+        return buffer
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Releases the buffer, and unmaps it if it was created by `map`.
+
+        Raises:
+            BufferError: Slices returned by `read` are still in use.
+        """
+        self._view.release()
+        if self._mapping is not None:
+            self._mapping.close()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self._view) - self._pos
+        data = self._view[self._pos : self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(offset, 0)
+        return self._pos
+
 
 class FileReader:
-    def read(self, midifile, strict=True):
+    # whether the tracks decoded since the file header used running status
+    used_running_status = False
+    # whether warnings about malformed data are left out, for passes that
+    # read a file once more after it has been or will be reported on
+    quiet = False
+
+    def read(self, midifile, strict=True, compact=False, event_filter=None):
         pattern = self.parse_file_header(midifile, strict)
-        Pattern.useRunningStatus = False
-        for track in pattern:
-            self.parse_track(midifile, track, strict)
+        if compact:
+            pattern[:] = [CompactTrack() for _ in pattern]
+        for index, track in enumerate(pattern):
+            if event_filter is None:
+                self.parse_track(midifile, track, strict)
+            elif event_filter.accepts_track(index):
+                track.extend(self.iter_track(midifile, strict, event_filter))
+            else:
+                self.skip_track(midifile)
+        Pattern.useRunningStatus = self.used_running_status
         return pattern
 
     def parse_file_header(self, midifile, strict=True):
@@ -81,7 +172,7 @@ class FileReader:
         format = data[1]
         tracks = [Track() for x in range(data[2])]
         resolution = data[3]
-        Pattern.useRunningStatus = False
+        self.used_running_status = False
         # XXX: the assumption is that any remaining bytes
         # in the header are padding
         if hdrsz > DEFAULT_MIDI_HEADER_SIZE:
@@ -99,18 +190,216 @@ class FileReader:
         self.basepos += 8
         return trksz
 
-    def parse_track(self, midifile, track, strict=True):
+    def iter_events(self, midifile, strict=True):
+        """Yields (track_index, abs_tick, event) tuples in file order.
+
+        Track bodies are read lazily from the file handle, so neither a
+        Pattern nor any Track is ever materialized.
+        """
+        pattern = self.parse_file_header(midifile, strict)
+        for index in range(len(pattern)):
+            abstick = 0
+            for event in self.iter_track(midifile, strict):
+                abstick += event.tick
+                yield index, abstick, event
+
+    def iter_track(self, midifile, strict=True, event_filter=None):
+        trksz = self.parse_track_header(midifile)
+        if event_filter is not None:
+            yield from self.iter_trackbuffer(midifile.read(trksz), self.basepos, strict, event_filter)
+        elif isinstance(midifile, BufferFile) or trksz <= MAX_BUFFERED_TRACK_SIZE:
+            yield from self.iter_trackbuffer(midifile.read(trksz), self.basepos, strict)
+        else:
+            trackdata = Trackiter(chain.from_iterable(read_chunk_blocks(midifile, trksz)), pos=self.basepos)
+            yield from self.iter_trackdata(trackdata, strict)
+        self.basepos += trksz
+
+    def iter_trackbuffer(self, buf, basepos=0, strict=True, event_filter=None):
+        """Decodes the events of a track body held in a bytes-like object.
+
+        Equivalent to running `parse_midi_event` over a Trackiter, but works
+        on an offset into the buffer and a table of data lengths per status
+        nibble, so a channel message is decoded without per-byte calls.
+        Payloads of meta and sysex events are sliced out of the buffer.
+
+        With an `EventFilter`, rejected events are stepped over without
+        building or validating event objects, and decoding ends at the first
+        event past the end of the time range. The tick of each event is then
+        relative to the previous accepted one, so absolute times are preserved.
+
+        Args:
+            buf: The track body, without the MTrk header.
+            basepos: File offset of the body, used in error messages.
+            event_filter: An optional `EventFilter` selecting the events to decode.
+        """
         self.RunningStatus = None
+        lengths = CHANNEL_DATA_LENGTHS
+        classes = [EventRegistry.Events.get(nibble << 4) for nibble in range(16)]
+        new_event = object.__new__
+        end = len(buf)
+        pos = 0
+        running = 0
+        filtering = event_filter is not None
+        if filtering:
+            accepted = [cls is not None and event_filter.accepts_type(cls) for cls in classes]
+            channels = event_filter.channels
+            start = event_filter.start or 0
+            stop = event_filter.end
+            abstick = 0
+            lasttick = 0
+        elif codec.NATIVE:
+            # decode the regular part of the track in one go, then continue
+            # below from wherever the accelerator stopped
+            known = bytes(cmd in EventRegistry.MetaEvents for cmd in range(128))
+            messages, pos, running, used = codec.split_track(buf, 0, 0, known, classes)
+            if used:
+                self.used_running_status = True
+            if running:
+                self.RunningStatus = running
+            for message in messages:
+                if message.__class__ is tuple:
+                    tick, status, metacommand, data, offset = message
+                    cls = EventRegistry.Events[status] if metacommand is None else EventRegistry.MetaEvents[metacommand]
+                    message = cls.from_payload(tick, data)
+                    try:
+                        message.check()
+                    except Exception as e:
+                        self.warn(f"{e} at position {basepos + offset}", strict, is_parse=False)
+                yield message
+        try:
+            while pos < end:
+                # first datum is varlen representing delta-time
+                byte = buf[pos]
+                pos += 1
+                tick = byte & 0x7F
+                while byte & 0x80:
+                    byte = buf[pos]
+                    pos += 1
+                    tick = (tick << 7) | (byte & 0x7F)
+                if filtering:
+                    abstick += tick
+                    if stop is not None and abstick >= stop:
+                        break
+                # next byte is status message
+                status = buf[pos]
+                pos += 1
+
+                if status < 0xF0:
+                    if status & 0x80:
+                        running = status
+                        self.RunningStatus = status
+                    elif running:
+                        self.used_running_status = True
+                    else:
+                        raise AssertionError(f"Unexpected data byte 0x{status:02X} at position {basepos + pos}")
+                    nibble = running >> 4
+                    if filtering:
+                        if (
+                            abstick < start
+                            or not accepted[nibble]
+                            or (channels is not None and running & 0x0F not in channels)
+                        ):
+                            pos += lengths[nibble] if status & 0x80 else lengths[nibble] - 1
+                            continue
+                        tick = abstick - lasttick
+                        lasttick = abstick
+                    if status & 0x80:
+                        data1 = buf[pos]
+                        pos += 1
+                        if data1 & 0x80:
+                            self.warn_data_byte(data1, basepos + pos)
+                    else:
+                        data1 = status
+                    event = new_event(classes[nibble])
+                    event.tick = tick
+                    event.channel = running & 0x0F
+                    if lengths[nibble] == 2:
+                        data2 = buf[pos]
+                        pos += 1
+                        if data2 & 0x80:
+                            self.warn_data_byte(data2, basepos + pos)
+                        event.data = [data1, data2]
+                        data1 |= data2
+                    else:
+                        event.data = [data1]
+                    if data1 & 0x80:
+                        try:
+                            event.check()
+                        except Exception as e:
+                            self.warn(f"{e} at position {basepos + pos}", strict, is_parse=False)
+                    yield event
+                    continue
+
+                # is the event a MetaEvent?
+                if status == MetaEvent.statusmsg:
+                    cmd = buf[pos]
+                    pos += 1
+                    if cmd & 0x80:
+                        self.warn_data_byte(cmd, basepos + pos)
+                    if cmd not in EventRegistry.MetaEvents:
+                        if not self.quiet:
+                            print(f"Unknown Meta MIDI Event {cmd} at position {basepos + pos}", file=sys.stderr)
+                        continue
+                    cls = EventRegistry.MetaEvents[cmd]
+                # is this event a Sysex Event?
+                elif SysexEvent.is_event(status):
+                    cls = EventRegistry.Events[status]
+                else:
+                    self.warn(f"Unknown MIDI Event {status} at position {basepos + pos}", strict)
+                    continue
+                byte = buf[pos]
+                pos += 1
+                datalen = byte & 0x7F
+                while byte & 0x80:
+                    byte = buf[pos]
+                    pos += 1
+                    datalen = (datalen << 7) | (byte & 0x7F)
+                if pos + datalen > end:
+                    break
+                if filtering:
+                    if abstick < start or not event_filter.accepts_type(cls):
+                        pos += datalen
+                        continue
+                    tick = abstick - lasttick
+                    lasttick = abstick
+                event = cls.from_payload(tick, bytes(buf[pos : pos + datalen]))
+                pos += datalen
+                try:
+                    event.check()
+                except Exception as e:
+                    self.warn(f"{e} at position {basepos + pos}", strict, is_parse=False)
+                yield event
+        except IndexError:
+            # the track ended in the middle of an event
+            pass
+
+    def skip_track(self, midifile):
         trksz = self.parse_track_header(midifile)
-        trackdata = Trackiter(midifile.read(trksz), pos=self.basepos)
+        midifile.read(trksz)
+        self.basepos += trksz
+
+    def warn(self, text, strict=True, is_parse=True):
+        # errors are still raised in strict mode, only warnings are silenced
+        if strict or not self.quiet:
+            warn_or_error(text, strict, is_parse)
+
+    def warn_data_byte(self, data, pos):
+        if self.quiet:
+            return
+        print(f"Warning: Unexpected status byte 0x{data:02X} at position {pos}", file=sys.stderr)
+
+    def iter_trackdata(self, trackdata, strict=True):
+        self.RunningStatus = None
         while True:
             try:
                 event = self.parse_midi_event(trackdata, strict)
-                if event:
-                    track.append(event)
             except StopIteration:
                 break
-        self.basepos += trksz
+            if event:
+                yield event
+
+    def parse_track(self, midifile, track, strict=True):
+        track.extend(self.iter_track(midifile, strict))
 
     def parse_midi_event(self, trackdata, strict=True):
         # first datum is varlen representing delta-time
@@ -128,8 +417,8 @@ class FileReader:
                 return
             cls = EventRegistry.MetaEvents[cmd]
             datalen = read_varlen(trackdata)
-            data = [next(trackdata) for x in range(datalen)]
-            event = cls(tick=tick, data=data)
+            data = trackdata.read(datalen)
+            event = cls.from_payload(tick, bytes(data))
             try:
                 event.check()
             except Exception as e:
@@ -138,7 +427,7 @@ class FileReader:
         # is this event a Sysex Event?
         elif SysexEvent.is_event(stsmsg):
             datalen = read_varlen(trackdata)
-            data = [next(trackdata) for x in range(datalen)]
+            data = trackdata.read(datalen)
             if stsmsg not in EventRegistry.Events:
                 warn_or_error(
                     f"Unknown Sysex Event {stsmsg:02x} at position {trackdata.pos()}",
@@ -146,7 +435,7 @@ class FileReader:
                 )
                 return
             cls = EventRegistry.Events[stsmsg]
-            event = cls(tick=tick, data=data)
+            event = cls.from_payload(tick, bytes(data))
             try:
                 event.check()
             except Exception as e:
@@ -158,7 +447,7 @@ class FileReader:
             if key not in EventRegistry.Events:
                 if not self.RunningStatus:
                     trackdata.assert_status_byte(stsmsg)
-                Pattern.useRunningStatus = True
+                self.used_running_status = True
                 key = self.RunningStatus & 0xF0
                 cls = EventRegistry.Events[key]
                 channel = self.RunningStatus & 0x0F
@@ -189,11 +478,108 @@ class FileReader:
         warn_or_error(f"Unknown MIDI Event {stsmsg} at position {trackdata.pos()}", strict)
 
 
+class MidiIndex:
+    """Index of the chunks in a MIDI file, built without decoding any track.
+
+    Only the MThd header and the tag and length of each following chunk are
+    read, chunk bodies are skipped by seeking. Individual tracks can then
+    be decoded on their own with `read_track`.
+
+    A path is opened once and kept open for reading tracks until `close` is
+    called or the `with` block ends, file objects are left open.
+
+    Args:
+        midifile: A string giving the path to a file on disk or
+                  an open, seekable binary file-like object.
+    """
+
+    def __init__(self, midifile, strict=True):
+        self.file = midifile
+        self.handle = open(midifile, "rb") if type(midifile) in (str, bytes) else midifile
+        try:
+            self._build(self.handle, strict)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.handle is not self.file:
+            self.handle.close()
+
+    def _build(self, midifile, strict):
+        if not midifile.seekable():
+            raise ValueError("Reading tracks on their own needs a path or seekable file, not a stream")
+        self.start = midifile.tell()
+        reader = FileReader()
+        header = reader.parse_file_header(midifile, strict)
+        self.format = header.format
+        self.resolution = header.resolution
+        self.declared_tracks = len(header)
+        self.chunks = []
+        offset = reader.basepos
+        while True:
+            chunk = midifile.read(8)
+            if len(chunk) < 8:
+                break
+            tag, size = chunk[:4], unpack(">L", chunk[4:])[0]
+            self.chunks.append((bytes(tag), offset + 8, size))
+            midifile.seek(size, os.SEEK_CUR)
+            offset += 8 + size
+        self.tracks = [(offset, size) for tag, offset, size in self.chunks if tag == b"MTrk"]
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __repr__(self):
+        return f"MidiIndex(format={self.format!r}, resolution={self.resolution!r}, tracks={self.tracks!r})"
+
+    def read_track_data(self, index):
+        offset, size = self.tracks[index]
+        self.handle.seek(self.start + offset)
+        return self.handle.read(size)
+
+    def iter_track(self, index, strict=True):
+        offset, _ = self.tracks[index]
+        return FileReader().iter_trackbuffer(self.read_track_data(index), offset, strict)
+
+    def read_track(self, index, strict=True):
+        """Decodes the track with the given (0-based) index into a Track."""
+        return Track(self.iter_track(index, strict))
+
+    def read(self, tracks=None, strict=True):
+        """Decodes the given track indices (default: all declared) into a Pattern."""
+        if tracks is None:
+            tracks = range(self.declared_tracks)
+        return Pattern(
+            tracks=[self.read_track(index, strict) for index in tracks],
+            resolution=self.resolution,
+            format=self.format,
+        )
+
+
 class FileWriter:
+    """Writes Patterns as MIDI files.
+
+    Args:
+        file: An open binary file-like object.
+        use_running_status: Omit repeated status bytes of channel messages.
+                            Defaults to `Pattern.useRunningStatus`, i.e.
+                            whether the last file read used running status.
+    """
+
     RunningStatus = None
 
-    def __init__(self, file):
+    def __init__(self, file, use_running_status=None):
         self.file = file
+        if use_running_status is None:
+            use_running_status = Pattern.useRunningStatus
+        self.use_running_status = use_running_status
 
     def write(self, pattern):
         self.write_file_header(pattern, len(pattern))
@@ -208,11 +594,8 @@ class FileWriter:
         self.file.write(b"MThd" + packdata)
 
     def write_track(self, track):
-        hlen = len(self.encode_track_header(0))
-        buf = bytearray(b"0" * hlen)
-        for event in track:
-            buf.extend(self.encode_midi_event(event))
-        buf[:hlen] = self.encode_track_header(len(buf) - hlen)
+        buf, self.RunningStatus = codec.encode_track(track, self.RunningStatus, self.use_running_status)
+        self.file.write(self.encode_track_header(len(buf)))
         self.file.write(buf)
 
     def write_track_header(self, track=None):
@@ -241,18 +624,20 @@ class FileWriter:
             self.RunningStatus = None
             ret.append(event.statusmsg)
             ret.append(event.metacommand)
-            ret.extend(write_varlen(len(event.data)))
-            ret.extend(event.data)
+            payload = event.payload
+            ret.extend(write_varlen(len(payload)))
+            ret.extend(payload)
         # is this event a Sysex Event?
         elif isinstance(event, SysexEvent):
             self.RunningStatus = None
             ret.append(event.statusmsg)
-            ret.extend(write_varlen(len(event.data)))
-            ret.extend(event.data)
+            payload = event.payload
+            ret.extend(write_varlen(len(payload)))
+            ret.extend(payload)
         # not a Meta MIDI event or a Sysex event, must be a general message
         elif isinstance(event, Event):
             status = event.statusmsg | event.channel
-            if status != self.RunningStatus or not Pattern.useRunningStatus:
+            if status != self.RunningStatus or not self.use_running_status:
                 self.RunningStatus = status
                 ret.append(status)
             ret.extend(event.data)
@@ -269,9 +654,113 @@ def write_midifile(midifile, pattern):
     return writer.write(pattern)
 
 
-def read_midifile(midifile, strict):
+def decode_track(job):
+    """Decodes a single track body, meant to run in a worker process.
+
+    Returns:
+        A tuple of the decoded Track and whether it used running status.
+    """
+    path, data, offset, size, strict = job
+    if data is None:
+        with open(path, "rb") as inp:
+            inp.seek(offset)
+            data = inp.read(size)
+    reader = FileReader()
+    track = Track(reader.iter_trackbuffer(data, offset, strict))
+    return track, reader.used_running_status
+
+
+def track_jobs(midifile, strict=True, tracks=None):
+    """Indexes the tracks of a MIDI file for decoding in separate processes.
+
+    Returns:
+        The MidiIndex of the file and a list of jobs for `decode_track`, one
+        per selected track index (default: all). For files given by path,
+        workers read their track themselves, otherwise the track bodies
+        are read here. The index is closed already, only its fields are
+        left to be used.
+    """
+    with MidiIndex(midifile, strict) as index:
+        if tracks is None:
+            tracks = range(index.declared_tracks)
+        if type(midifile) in (str, bytes):
+            return index, [(midifile, None, *index.tracks[i], strict) for i in tracks]
+        return index, [(None, index.read_track_data(i), *index.tracks[i], strict) for i in tracks]
+
+
+def read_midifile(midifile, strict, use_mmap=False, workers=1, compact=False, event_filter=None):
+    """Reads a MIDI file into a Pattern.
+
+    With an `EventFilter`, only the accepted events are decoded. Tracks that
+    are not selected stay empty so that the remaining ones keep their index.
+    A range in seconds needs a path or seekable file, as the tempo changes
+    are read in a first pass. Filtered files are always decoded in-process.
+
+    With `workers` other than 1 the tracks are decoded in worker processes,
+    see `read_midifile_parallel`. They read their tracks themselves, so
+    `use_mmap` can not be combined with it.
+    """
+    if workers != 1 and event_filter is None:
+        if use_mmap:
+            raise ValueError("use_mmap can not be combined with workers, which read their tracks themselves")
+        return read_midifile_parallel(midifile, strict, workers, compact)
+    if type(midifile) in (str, bytes):
+        with open(midifile, "rb") as inp:
+            return read_midifile(inp, strict, use_mmap, workers, compact, event_filter)
+    if use_mmap:
+        with BufferFile.map(midifile) as buffer:
+            return read_midifile(buffer, strict, False, workers, compact, event_filter)
+    if event_filter is not None and event_filter.uses_seconds:
+        event_filter = event_filter.resolve(read_tempo_map(midifile, strict))
+    reader = FileReader()
+    return reader.read(midifile, strict, compact, event_filter)
+
+
+def read_tempo_map(midifile, strict=True):
+    """Reads only the tempo changes of a MIDI file into a `TempoMap`.
+
+    A file object is rewound to its original position afterwards. Warnings
+    are left out, as the file is read for its events as well.
+    """
+    if type(midifile) in (str, bytes):
+        with open(midifile, "rb") as inp:
+            return read_tempo_map(inp, strict)
+    start = midifile.tell()
+    reader = FileReader()
+    reader.quiet = True
+    pattern = reader.read(midifile, strict, event_filter=EventFilter(types=[SetTempoEvent]))
+    midifile.seek(start)
+    return TempoMap.from_pattern(pattern, strict)
+
+
+def read_midifile_parallel(midifile, strict=True, workers=None, compact=False):
+    """Reads a MIDI file, decoding its tracks concurrently in worker processes.
+
+    The input must be a path or a seekable file object.
+    `workers` defaults to the number of CPUs. With `compact`, the decoded
+    tracks are stored as `CompactTrack`s.
+    """
+    index, jobs = track_jobs(midifile, strict)
+    pattern = Pattern(resolution=index.resolution, format=index.format)
+    running_status = False
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for track, used in executor.map(decode_track, jobs):
+            pattern.append(CompactTrack(track) if compact else track)
+            running_status |= used
+    Pattern.useRunningStatus = running_status
+    return pattern
+
+
+def iter_midifile(midifile, strict=True, use_mmap=False):
     if type(midifile) in (str, bytes):
         with open(midifile, "rb") as inp:
-            return read_midifile(inp, strict)
+            yield from iter_midifile(inp, strict, use_mmap)
+        return
+    if use_mmap:
+        with BufferFile.map(midifile) as buffer:
+            yield from iter_midifile(buffer, strict)
+        return
     reader = FileReader()
-    return reader.read(midifile, strict)
+    yield from reader.iter_events(midifile, strict)
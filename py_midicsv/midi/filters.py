@@ -0,0 +1,78 @@
+### System ###
+import math
+
+
+class EventFilter:
+    """Selects the events to decode from a MIDI file.
+
+    Rejected events are skipped while decoding, without building event
+    objects for them. All criteria that are given have to match.
+
+    Args:
+        start: First absolute tick to include.
+        end: Absolute tick at which to stop, excluded.
+        channels: Channels (0-15) of the channel messages to include.
+                  Meta and sysex events have no channel and are not
+                  affected, use `types` to exclude them.
+        types: Event classes to include, subclasses match as well,
+               e.g. `NoteEvent` or `MetaEvent`.
+        tracks: 0-based indices of the tracks to decode.
+        start_seconds: Like `start`, in seconds from the start of the file.
+        end_seconds: Like `end`, in seconds from the start of the file.
+                     Seconds are converted to ticks with the tempo map of
+                     the file, see `resolve`.
+    """
+
+    def __init__(
+        self,
+        start=None,
+        end=None,
+        channels=None,
+        types=None,
+        tracks=None,
+        start_seconds=None,
+        end_seconds=None,
+    ):
+        self.start = start
+        self.end = end
+        self.channels = None if channels is None else frozenset(channels)
+        self.types = None if types is None else tuple(types)
+        self.tracks = None if tracks is None else frozenset(tracks)
+        self.start_seconds = start_seconds
+        self.end_seconds = end_seconds
+        self._accepted = {}
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items() if not name.startswith("_"))
+        return f"EventFilter({fields})"
+
+    @property
+    def uses_seconds(self):
+        return self.start_seconds is not None or self.end_seconds is not None
+
+    def resolve(self, tempo_map):
+        """Returns a copy with the range in seconds converted to ticks.
+
+        Args:
+            tempo_map: The `TempoMap` of the file to be decoded.
+        """
+        start, end = self.start, self.end
+        if self.start_seconds is not None:
+            tick = math.ceil(tempo_map.seconds_to_tick(self.start_seconds))
+            start = tick if start is None else max(start, tick)
+        if self.end_seconds is not None:
+            tick = math.ceil(tempo_map.seconds_to_tick(self.end_seconds))
+            end = tick if end is None else min(end, tick)
+        return EventFilter(start, end, self.channels, self.types, self.tracks)
+
+    def accepts_track(self, index):
+        return self.tracks is None or index in self.tracks
+
+    def accepts_type(self, cls):
+        if self.types is None:
+            return True
+        try:
+            return self._accepted[cls]
+        except KeyError:
+            accepted = self._accepted[cls] = issubclass(cls, self.types)
+            return accepted
@@ -0,0 +1,130 @@
+### System ###
+import sys
+from bisect import bisect_right
+
+### Local ###
+from .events import SetTempoEvent
+
+DEFAULT_MPQN = 500000
+
+# frames per second for the negative SMPTE format values in the file header
+SMPTE_FRAME_RATES = {24: 24, 25: 25, 29: 30000 / 1001, 30: 30}
+
+
+def numpy():
+    # arrays can only be passed in once numpy has been imported, so it is
+    # never imported here
+    return sys.modules.get("numpy")
+
+
+class TempoMap:
+    """Converts between ticks and seconds for a MIDI file.
+
+    Tempo changes are kept sorted by tick together with the time elapsed
+    up to each of them, so a conversion is a binary search plus a linear
+    interpolation within a single tempo segment.
+
+    Both conversions accept a single number, a sequence (returning a list)
+    or a NumPy array (returning an array of floats).
+
+    Args:
+        resolution: The division field of the file header, either ticks per
+                    quarter note or, with the high bit set, an SMPTE format.
+        tempos: (tick, mpqn) tuples with absolute ticks. Until the first
+                tempo change 120 BPM are assumed, as per the specification.
+        strict: Raise a ValueError if the division is 0 ticks, which leaves
+                times in seconds undefined. Otherwise 1 tick per quarter
+                note or frame is assumed, with a warning.
+    """
+
+    def __init__(self, resolution, tempos=(), strict=True):
+        self.resolution = resolution
+        self.smpte = bool(resolution & 0x8000)
+        if not resolution & (0xFF if self.smpte else 0x7FFF):
+            unit = "frame" if self.smpte else "quarter note"
+            text = f"Division of 0 ticks per {unit} in the file header, times in seconds are undefined"
+            if strict:
+                raise ValueError(text)
+            print(f"Warning: {text}, assuming 1 tick per {unit}", file=sys.stderr)
+            resolution |= 1
+        ticks = [0]
+        mpqns = [DEFAULT_MPQN]
+        for tick, mpqn in sorted(tempos, key=lambda tempo: tempo[0]):
+            if tick == ticks[-1]:
+                # several changes at the same tick, the last one wins
+                mpqns[-1] = mpqn
+            else:
+                ticks.append(tick)
+                mpqns.append(mpqn)
+        self.ticks = ticks
+        self.mpqns = mpqns
+        # elapsed time at each tempo change in microseconds times resolution,
+        # kept as integers so that long files do not accumulate rounding errors
+        elapsed = [0]
+        for index in range(1, len(ticks)):
+            elapsed.append(elapsed[-1] + (ticks[index] - ticks[index - 1]) * mpqns[index - 1])
+        self.elapsed = elapsed
+        if self.smpte:
+            fps = SMPTE_FRAME_RATES.get(256 - (resolution >> 8), 256 - (resolution >> 8))
+            self.seconds_per_tick = 1 / (fps * (resolution & 0xFF))
+        else:
+            self.scale = resolution * 1e6
+
+    @classmethod
+    def from_pattern(cls, pattern, strict=True):
+        """Collects the tempo changes from all tracks of a Pattern."""
+        tempos = []
+        for track in pattern:
+            tick = 0
+            for event in track:
+                tick = tick + event.tick if pattern.tick_relative else event.tick
+                if isinstance(event, SetTempoEvent) and len(event.data) == 3:
+                    tempos.append((tick, event.get_mpqn()))
+        return cls(pattern.resolution, tempos, strict)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __repr__(self):
+        return f"TempoMap(resolution={self.resolution!r}, tempos={list(zip(self.ticks, self.mpqns))!r})"
+
+    def tick_to_seconds(self, tick):
+        """Converts absolute ticks into seconds from the start of the file."""
+        np = numpy()
+        if np is not None and isinstance(tick, np.ndarray):
+            if self.smpte:
+                return tick * self.seconds_per_tick
+            index = np.maximum(np.searchsorted(self.ticks, tick, side="right") - 1, 0)
+            ticks = np.asarray(self.ticks, dtype=np.float64)[index]
+            mpqns = np.asarray(self.mpqns, dtype=np.float64)[index]
+            elapsed = np.asarray(self.elapsed, dtype=np.float64)[index]
+            return (elapsed + (tick - ticks) * mpqns) / self.scale
+        if hasattr(tick, "__iter__"):
+            return [self.tick_to_seconds(value) for value in tick]
+        if self.smpte:
+            return tick * self.seconds_per_tick
+        index = max(bisect_right(self.ticks, tick) - 1, 0)
+        return (self.elapsed[index] + (tick - self.ticks[index]) * self.mpqns[index]) / self.scale
+
+    def seconds_to_tick(self, seconds):
+        """Converts seconds from the start of the file into (fractional) ticks."""
+        np = numpy()
+        if np is not None and isinstance(seconds, np.ndarray):
+            if self.smpte:
+                return seconds / self.seconds_per_tick
+            position = seconds * self.scale
+            index = np.maximum(np.searchsorted(self.elapsed, position, side="right") - 1, 0)
+            ticks = np.asarray(self.ticks, dtype=np.float64)[index]
+            mpqns = np.asarray(self.mpqns, dtype=np.float64)[index]
+            elapsed = np.asarray(self.elapsed, dtype=np.float64)[index]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(mpqns > 0, ticks + (position - elapsed) / mpqns, ticks)
+        if hasattr(seconds, "__iter__"):
+            return [self.seconds_to_tick(value) for value in seconds]
+        if self.smpte:
+            return seconds / self.seconds_per_tick
+        position = seconds * self.scale
+        index = max(bisect_right(self.elapsed, position) - 1, 0)
+        if not self.mpqns[index]:
+            return self.ticks[index]
+        return self.ticks[index] + (position - self.elapsed[index]) / self.mpqns[index]
@@ -1,15 +1,5 @@
-def as_csv_str(bytestr):
-    csv_str = ""
-    for byte in bytestr:
-        if byte < 32 or byte > 126:
-            csv_str += f"\\{byte:03o}"
-        elif byte == ord('"'):
-            csv_str += '""'
-        elif byte == ord("\\"):
-            csv_str += "\\\\"
-        else:
-            csv_str += chr(byte)
-    return csv_str
+### Local ###
+from .textcodec import escape as as_csv_str
 
 
 def write_event(track, time, identifier, data):
@@ -137,13 +127,19 @@ def from_KeySignatureEvent(track, time, event):
     )
 
 
+def payload_fields(event):
+    # the payload is formatted in one go instead of byte by byte
+    payload = event.payload
+    return [len(payload), payload.hex(" ").upper().replace(" ", ", ")] if payload else [0]
+
+
 def from_SequencerSpecificEvent(track, time, event):
-    return write_event(track, time, "Sequencer_specific", [len(event.data), *event.data])
+    return write_event(track, time, "Sequencer_specific", payload_fields(event))
 
 
 def from_SysexEvent(track, time, event):
-    return write_event(track, time, "System_exclusive", [len(event.data), *event.data])
+    return write_event(track, time, "System_exclusive", payload_fields(event))
 
 
 def from_SysexF7Event(track, time, event):
-    return write_event(track, time, "System_exclusive_F7", [len(event.data), *event.data])
+    return write_event(track, time, "System_exclusive_F7", payload_fields(event))
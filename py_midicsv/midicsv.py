@@ -1,14 +1,247 @@
+### System ###
+from itertools import accumulate, islice
+
 ### Local ###
-from .events import midi_to_csv_map
-from .midi.fileio import read_midifile
+from . import instrumentation
+from .columnar import midi_to_table, write_table
+from .events import event_identifiers, midi_to_csv_map, midi_to_csv_row_formats
+from .midi.containers import Pattern
+from .midi.events import PitchWheelEvent
+from .midi.fileio import BufferFile, FileReader, MidiIndex, decode_track, read_midifile, read_tempo_map, track_jobs
+from .midi.tempo import TempoMap
+
+FORMAT_BATCH_SIZE = 4096
+
+
+def format_events(track, events, abstime=0):
+    """Converts a batch of events from a single track into CSV rows.
+
+    Channel messages are formatted from precomputed row templates in a single
+    pass, all other events go through their `midi_to_csv_map` converter.
+    The output is identical to converting each event individually.
+
+    Args:
+        track: The 1-based track number written into each row.
+        events: An iterable of events with relative ticks.
+        abstime: The absolute time preceding the first event.
+
+    Returns:
+        A tuple of the list of CSV rows and the absolute time of the last event.
+    """
+    rows = []
+    add = rows.append
+    formats = midi_to_csv_row_formats
+    for event in events:
+        abstime += event.tick
+        cls = type(event)
+        fmt = formats.get(cls)
+        try:
+            if fmt is not None:
+                add(fmt % (track, abstime, event.channel, *event.data))
+                continue
+            if cls is PitchWheelEvent:
+                data = event.data
+                add("%d, %d, Pitch_bend_c, %d, %d\n" % (track, abstime, event.channel, data[0] | (data[1] << 7)))
+                continue
+        except (TypeError, IndexError):
+            # unusual data length, let the generic converter deal with it
+            pass
+        add(midi_to_csv_map[cls](track, abstime, event))
+    return rows, abstime
+
+
+def iter_track_rows(track, events, tempo_map=None):
+    """Converts the events of a single track into CSV rows, batch by batch.
+
+    With a `TempoMap`, every row gets the time of its event in seconds
+    appended as an extra column.
+    """
+    stats = instrumentation.current
+    if stats is None:
+        return format_track_rows(track, events, tempo_map)
+    return stats.track_rows(
+        track, events, lambda events: format_track_rows(track, events, tempo_map), event_identifiers
+    )
+
+
+def format_track_rows(track, events, tempo_map=None):
+    if tempo_map is not None:
+        yield from iter_track_rows_seconds(track, events, tempo_map)
+        return
+    yield f"{track}, {0}, Start_track\n"
+    events = iter(events)
+    abstime = 0
+    while True:
+        rows, abstime = format_events(track, islice(events, FORMAT_BATCH_SIZE), abstime)
+        if not rows:
+            break
+        yield from rows
+
+
+def iter_track_rows_seconds(track, events, tempo_map):
+    yield f"{track}, {0}, Start_track, {0.0:.6f}\n"
+    events = iter(events)
+    abstime = 0
+    while True:
+        batch = list(islice(events, FORMAT_BATCH_SIZE))
+        if not batch:
+            break
+        ticks = list(accumulate((event.tick for event in batch), initial=abstime))[1:]
+        rows, abstime = format_events(track, batch, abstime)
+        for row, seconds in zip(rows, tempo_map.tick_to_seconds(ticks)):
+            yield f"{row[:-1]}, {seconds:.6f}\n"
+
+
+def convert_track(job):
+    """Decodes and converts a single track, meant to run in a worker process."""
+    index, job = job
+    track, _ = decode_track(job)
+    return list(iter_track_rows(index + 1, track))
+
+
+def iter_parse_parallel(file, strict=True, workers=None, tracks=None):
+    midi_index, jobs = track_jobs(file, strict, tracks)
+    if tracks is None:
+        tracks = range(midi_index.declared_tracks)
+    yield f"0, 0, Header, {midi_index.format}, {len(jobs)}, {midi_index.resolution}\n"
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in executor.map(convert_track, zip(tracks, jobs)):
+            yield from rows
+    yield "0, 0, End_of_file"
 
 
-def parse(file, strict=True):
+def iter_parse_tracks(file, tracks, strict=True):
+    with instrumentation.phase("header"):
+        midi_index = MidiIndex(file, strict)
+    yield f"0, 0, Header, {midi_index.format}, {len(tracks)}, {midi_index.resolution}\n"
+    for index in tracks:
+        yield from iter_track_rows(index + 1, midi_index.iter_track(index, strict))
+    yield "0, 0, End_of_file"
+
+
+def iter_parse_seconds(file, strict=True, use_mmap=False, workers=1, tracks=None):
+    # the tempo map needs every tempo change before the first row can be timed
+    pattern = read_midifile(file, strict, use_mmap, workers)
+    tempo_map = TempoMap.from_pattern(pattern, strict)
+    if tracks is None:
+        tracks = range(len(pattern))
+    yield f"0, 0, Header, {pattern.format}, {len(tracks)}, {pattern.resolution}\n"
+    for index in tracks:
+        yield from iter_track_rows(index + 1, pattern[index], tempo_map)
+    yield "0, 0, End_of_file"
+
+
+def iter_parse_filtered(file, event_filter, strict=True, use_mmap=False, tracks=None, seconds=False):
+    if isinstance(file, (str, bytes)):
+        with open(file, "rb") as f:
+            yield from iter_parse_filtered(f, event_filter, strict, use_mmap, tracks, seconds)
+        return
+    if use_mmap:
+        with BufferFile.map(file) as buffer:
+            yield from iter_parse_filtered(buffer, event_filter, strict, False, tracks, seconds)
+        return
+    tempo_map = read_tempo_map(file, strict) if seconds or event_filter.uses_seconds else None
+    if event_filter.uses_seconds:
+        event_filter = event_filter.resolve(tempo_map)
+    reader = FileReader()
+    with instrumentation.phase("header"):
+        pattern = reader.parse_file_header(file, strict)
+    selected = {
+        index
+        for index in range(len(pattern))
+        if event_filter.accepts_track(index) and (tracks is None or index in tracks)
+    }
+    yield f"0, 0, Header, {pattern.format}, {len(selected)}, {pattern.resolution}\n"
+    for index in range(len(pattern)):
+        if index in selected:
+            events = reader.iter_track(file, strict, event_filter)
+            yield from iter_track_rows(index + 1, events, tempo_map if seconds else None)
+        else:
+            reader.skip_track(file)
+    Pattern.useRunningStatus = reader.used_running_status
+    yield "0, 0, End_of_file"
+
+
+def iter_parse(file, strict=True, use_mmap=False, workers=1, tracks=None, seconds=False, event_filter=None):
+    """Parses a MIDI file into CSV format, one row at a time.
+
+    Unlike `parse`, events are converted in small batches as soon as they
+    are decoded, which keeps memory usage bounded for very large files.
+
+    Args:
+        file: A string giving the path to a file on disk or
+              an open file-like object.
+        use_mmap: Memory-map the input file instead of reading it,
+                  track bodies are then decoded straight from the mapping.
+                  Can not be combined with `workers`.
+        workers: Number of processes decoding tracks concurrently,
+                 None for one per CPU. Requires a path or seekable file.
+        tracks: 0-based indices of the tracks to convert, default all.
+                Other tracks are skipped without being decoded, the
+                selected ones keep their original track number.
+                The Header row declares the number of selected tracks.
+                `csvmidi` numbers tracks by their Start_track rows, so
+                the output converts back into a file of just these tracks.
+                Requires a path or seekable file.
+        seconds: Append the time of each event in seconds as an extra
+                 column, computed from the tempo changes in the file.
+                 The whole file is decoded before the first row is produced.
+                 Such output can not be converted back with `csvmidi`.
+        event_filter: An `EventFilter` selecting the events to convert.
+                      Rejected events and tracks are skipped while decoding.
+                      Selected tracks are converted in file order, in-process.
+
+    Yields:
+        Strings, each containing one atomic MIDI command in CSV format.
+    """
+    if event_filter is not None:
+        yield from iter_parse_filtered(file, event_filter, strict, use_mmap, tracks, seconds)
+        return
+    if seconds:
+        yield from iter_parse_seconds(file, strict, use_mmap, workers, tracks)
+        return
+    if workers != 1:
+        if use_mmap:
+            raise ValueError("use_mmap can not be combined with workers, which read their tracks themselves")
+        yield from iter_parse_parallel(file, strict, workers, tracks)
+        return
+    if isinstance(file, (str, bytes)):
+        with open(file, "rb") as f:
+            yield from iter_parse(f, strict, use_mmap, workers, tracks)
+        return
+    if use_mmap:
+        with BufferFile.map(file) as buffer:
+            yield from iter_parse(buffer, strict, False, workers, tracks)
+        return
+    if tracks is not None:
+        yield from iter_parse_tracks(file, tracks, strict)
+        return
+
+    reader = FileReader()
+    with instrumentation.phase("header"):
+        pattern = reader.parse_file_header(file, strict)
+    yield f"0, 0, Header, {pattern.format}, {len(pattern)}, {pattern.resolution}\n"
+    for index in range(len(pattern)):
+        yield from iter_track_rows(index + 1, reader.iter_track(file, strict))
+    # like `read_midifile`, so that writing the result back matches the input
+    Pattern.useRunningStatus = reader.used_running_status
+    yield "0, 0, End_of_file"
+
+
+def parse(file, strict=True, use_mmap=False, workers=1, tracks=None, seconds=False, event_filter=None):
     """Parses a MIDI file into CSV format.
 
     Args:
         file: A string giving the path to a file on disk or
               an open file-like object.
+        use_mmap: Memory-map the input file instead of reading it.
+        workers: Number of processes decoding tracks concurrently,
+                 None for one per CPU.
+        tracks: 0-based indices of the tracks to convert, default all.
+        seconds: Append the time of each event in seconds as an extra column.
+        event_filter: An `EventFilter` selecting the events to convert.
 
     Returns:
         A list of strings, with each string containing one atomic MIDI command
@@ -18,15 +251,20 @@ def parse(file, strict=True):
          "1, 0, Start_track",
          "1, 0, Tempo, 500000"]
     """
-    csv_file = []
-    pattern = read_midifile(file, strict)
-    csv_file.append(f"0, 0, Header, {pattern.format}, {len(pattern)}, {pattern.resolution}\n")
-    for index, track in enumerate(pattern):
-        csv_file.append(f"{index + 1}, {0}, Start_track\n")
-        abstime = 0
-        for event in track:
-            abstime += event.tick
-            converted = midi_to_csv_map[type(event)](index + 1, abstime, event)
-            csv_file.append(converted)
-    csv_file.append("0, 0, End_of_file")
-    return csv_file
+    return list(iter_parse(file, strict, use_mmap, workers, tracks, seconds, event_filter))
+
+
+def export_columns(file, destination, strict=True, event_filter=None):
+    """Converts a MIDI file into a typed columnar file instead of CSV text.
+
+    The rows are the same as those of `parse`, see `py_midicsv.columnar`
+    for the columns and the supported formats.
+
+    Args:
+        file: A string giving the path to a file on disk or
+              an open binary file-like object.
+        destination: Path of the output file, ending in `.parquet`,
+                     `.arrow`, `.feather` or `.npz`.
+        event_filter: An optional `EventFilter` selecting the events to export.
+    """
+    write_table(midi_to_table(file, strict, event_filter), destination)
@@ -0,0 +1,288 @@
+### System ###
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+from contextlib import contextmanager
+from struct import pack, unpack
+
+# Every message is a 4 byte big-endian length followed by that many bytes.
+# Requests and responses are a JSON header message followed by a data message:
+#
+#   request header   {"op": "midi_to_csv" or "csv_to_midi", "strict": true,
+#                     "input": path, "output": path, "tracks": [0, 2], "seconds": false}
+#                    "input" and "output" are optional, "tracks" and "seconds"
+#                    only apply to midi_to_csv
+#   request data     the input file, empty if "input" is given
+#   response header  {"ok": true} or {"ok": false, "error": "ParseError: ..."}
+#   response data    the converted file, empty if "output" was given or on error
+#
+# A connection can carry any number of requests, one after the other.
+# Paths are opened by the server, so they should be absolute.
+MAX_MESSAGE_SIZE = 1 << 31
+OPERATIONS = ("midi_to_csv", "csv_to_midi")
+
+
+class ServerError(Exception):
+    """A conversion failed on the server, the message describes the exception raised there."""
+
+
+def default_socket_path():
+    """Returns $MIDICSV_SOCKET, or a per-user path in the temporary directory."""
+    if os.environ.get("MIDICSV_SOCKET"):
+        return os.environ["MIDICSV_SOCKET"]
+    # not imported up front, the client commands should start quickly
+    import tempfile
+
+    return os.path.join(tempfile.gettempdir(), f"py_midicsv-{os.getuid()}.sock")
+
+
+def send_message(file, data):
+    file.write(pack(">I", len(data)))
+    file.write(data)
+
+
+def recv_message(file):
+    """Reads one message from a binary file object.
+
+    Returns:
+        The message, or None if the stream ended before it started.
+
+    Raises:
+        ConnectionError: The stream ended in the middle of the message.
+    """
+    prefix = file.read(4)
+    if not prefix:
+        return None
+    if len(prefix) < 4:
+        raise ConnectionError("Connection closed in the middle of a message")
+    (length,) = unpack(">I", prefix)
+    if length > MAX_MESSAGE_SIZE:
+        raise ConnectionError(f"Message of {length} bytes exceeds the maximum size")
+    data = file.read(length)
+    if len(data) < length:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return data
+
+
+def preload():
+    # the server shuts the workers down on Ctrl+C, which reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # workers import the converters once instead of on their first request
+    from . import csvmidi, midicsv  # noqa: F401
+
+
+def open_input(request, data, binary):
+    source = request.get("input")
+    if source is None:
+        # decoded the same way `open` does for the command line tools
+        return io.BytesIO(data) if binary else io.TextIOWrapper(io.BytesIO(data))
+    return open(source, "rb" if binary else "r")
+
+
+@contextmanager
+def replacing(destination):
+    """Opens a binary file that replaces `destination` once the block has completed.
+
+    The data is written to a temporary file next to `destination` first, so
+    `destination` is left untouched if the block raises.
+    """
+    directory, name = os.path.split(os.path.abspath(destination))
+    temp = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with open(temp, "xb") as f:
+            yield f
+        os.replace(temp, destination)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def convert(request, file, output):
+    strict = request.get("strict", True)
+    if request["op"] == "midi_to_csv":
+        from .midicsv import iter_parse
+
+        rows = iter_parse(file, strict, tracks=request.get("tracks"), seconds=request.get("seconds", False))
+        output.writelines(row.encode() for row in rows)
+    else:
+        from .csvmidi import write
+
+        # not `Pattern.useRunningStatus`, which is left over from whatever this
+        # worker decoded last; a new csvmidipy process starts out with it set
+        write(file, output, strict, use_running_status=True)
+
+
+def convert_request(request, data):
+    """Runs a single conversion request inside a worker process.
+
+    The input is opened before anything is written, and an "output" file is
+    only replaced once the conversion has succeeded.
+
+    Returns:
+        The converted file, or an empty bytes object if it was written to
+        the "output" path of the request.
+    """
+    op = request.get("op")
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation {op!r}, use one of {', '.join(OPERATIONS)}")
+    destination = request.get("output")
+    with open_input(request, data, op == "midi_to_csv") as file:
+        if destination is None:
+            output = io.BytesIO()
+            convert(request, file, output)
+            return output.getvalue()
+        with replacing(destination) as output:
+            convert(request, file, output)
+    return b""
+
+
+class ConversionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            header = recv_message(self.rfile)
+            if header is None:
+                return
+            data = recv_message(self.rfile)
+            if data is None:
+                raise ConnectionError("Connection closed before the request data")
+            try:
+                result = self.server.executor.submit(convert_request, json.loads(header), data).result()
+                response = {"ok": True}
+            except Exception as e:
+                result = b""
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            send_message(self.wfile, json.dumps(response).encode())
+            send_message(self.wfile, result)
+
+
+class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Resident conversion server listening on a Unix domain socket.
+
+    Each connection is served by a thread, the conversions themselves run
+    in a pool of worker processes that have the library loaded already.
+    Only the user running the server can connect to the socket.
+
+    Example:
+        with ConversionServer("/tmp/midicsv.sock") as server:
+            server.serve_forever()
+
+    Args:
+        path: Path of the socket. A stale socket left behind by a server
+              that is no longer running is replaced.
+        workers: Number of worker processes, defaults to the number of CPUs.
+
+    Raises:
+        OSError: Another server is listening on `path` already.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, workers=None):
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+
+        remove_stale_socket(path)
+        super().__init__(path, ConversionHandler)
+        # workers are started while connections are being served, which
+        # forking a process with several threads does not handle well
+        self.executor = ProcessPoolExecutor(workers, get_context("spawn"), initializer=preload)
+
+    def server_bind(self):
+        super().server_bind()
+        os.chmod(self.server_address, stat.S_IRUSR | stat.S_IWUSR)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def remove_stale_socket(path):
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+    raise OSError(f"A server is listening on {path} already")
+
+
+class Client:
+    """Connection to a `ConversionServer`.
+
+    Inputs are given as bytes, sent along with the request, or as the path
+    of a file the server reads itself. Results are returned as bytes, or
+    written by the server to `destination` if it is given.
+
+    Example:
+        with Client() as client:
+            csv_data = client.midi_to_csv("example.mid")
+            client.csv_to_midi(csv_data, "example_converted.mid")
+
+    Args:
+        path: Path of the server socket, see `default_socket_path`.
+    """
+
+    def __init__(self, path=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(path or default_socket_path())
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def request(self, request, data=b""):
+        """Sends a request as described in this module and returns the response data.
+
+        Raises:
+            ServerError: The conversion failed.
+        """
+        send_message(self.file, json.dumps(request).encode())
+        send_message(self.file, data)
+        self.file.flush()
+        header = recv_message(self.file)
+        result = recv_message(self.file)
+        if header is None or result is None:
+            raise ConnectionError("Server closed the connection")
+        response = json.loads(header)
+        if not response["ok"]:
+            raise ServerError(response["error"])
+        return result
+
+    def convert(self, op, source, destination=None, **options):
+        request = {"op": op, **options}
+        if isinstance(source, str):
+            request["input"] = os.path.abspath(source)
+            source = b""
+        if destination is not None:
+            request["output"] = os.path.abspath(destination)
+        return self.request(request, bytes(source))
+
+    def midi_to_csv(self, source, destination=None, strict=True, tracks=None, seconds=False):
+        """Converts a MIDI file into CSV, with the options of `midicsv.parse`."""
+        return self.convert("midi_to_csv", source, destination, strict=strict, tracks=tracks, seconds=seconds)
+
+    def csv_to_midi(self, source, destination=None, strict=True):
+        """Converts a CSV file into MIDI, like `csvmidi.write`."""
+        return self.convert("csv_to_midi", source, destination, strict=strict)
@@ -0,0 +1,49 @@
+### System ###
+import re
+
+# Text in meta events is written as a quoted CSV field: printable ASCII is
+# kept, quotes are doubled, backslashes doubled and every other byte written
+# as a three digit octal escape like \033.
+ESCAPES = {byte: f"\\{byte:03o}" for byte in range(256) if byte < 32 or byte > 126}
+ESCAPES[ord('"')] = '""'
+ESCAPES[ord("\\")] = "\\\\"
+# any byte that is not written as is
+NEEDS_ESCAPE = re.compile(rb"[^\x20\x21\x23-\x5b\x5d-\x7e]")
+
+ESCAPE_SEQUENCE = re.compile(r"\\(\\|[0-3][0-7]{2})")
+UNESCAPES = {f"{byte:03o}": chr(byte) for byte in range(256)}
+UNESCAPES["\\"] = "\\"
+
+
+def escape(data):
+    """Converts the text of a meta event into its CSV representation.
+
+    Args:
+        data: The text as bytes, or any iterable of byte values.
+
+    Returns:
+        The escaped text, without the surrounding quotes.
+    """
+    data = bytes(data)
+    if NEEDS_ESCAPE.search(data) is None:
+        return data.decode("ascii")
+    # latin-1 maps every byte to the code point of the same value
+    return data.decode("latin-1").translate(ESCAPES)
+
+
+def unescape(text):
+    """Converts text written by `escape` back into bytes.
+
+    Raises:
+        ValueError: The text has a backslash not starting a valid escape,
+                    or characters that do not fit into a byte.
+    """
+    if "\\" not in text:
+        return text.encode("latin-1")
+    # literal text and escape sequences alternate
+    parts = ESCAPE_SEQUENCE.split(text)
+    for index in range(0, len(parts), 2):
+        if "\\" in parts[index]:
+            raise ValueError(f"Invalid escape sequence in {text!r}")
+    parts[1::2] = map(UNESCAPES.__getitem__, parts[1::2])
+    return "".join(parts).encode("latin-1")
@@ -0,0 +1,76 @@
+import asyncio
+import io
+
+from py_midicsv.aio import ChunkReader, parse_csv_stream, parse_midi_stream
+from py_midicsv.csvmidi import encode
+from py_midicsv.midicsv import parse
+
+QUOTED = '0, 0, Header, 1, 1, 96\n1, 0, Start_track\n1, 0, Title_t, "multi\nline, ""quoted"""\n1, 0, End_track\n'
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_parse_midi_stream_chunks():
+    with open("tests/sample.mid", "rb") as f:
+        data = f.read()
+    rows = asyncio.run(collect(parse_midi_stream(chunked(data, 7))))
+    assert rows == parse("tests/sample.mid")
+
+
+def test_parse_midi_stream_reader():
+    async def run():
+        reader = asyncio.StreamReader()
+        with open("tests/sample.mid", "rb") as f:
+            reader.feed_data(f.read())
+        reader.feed_eof()
+        return await collect(parse_midi_stream(reader))
+
+    assert asyncio.run(run()) == parse("tests/sample.mid")
+
+
+def test_parse_csv_stream_chunks():
+    rows = parse("tests/sample.mid")
+    for data in ("".join(rows).encode(), QUOTED.encode()):
+        chunks = asyncio.run(collect(parse_csv_stream(chunked(data, 5))))
+        assert b"".join(chunks) == encode(data.decode().splitlines(keepends=True))
+
+
+def test_iter_records_keeps_rows_whole():
+    text = '1, 0, Start_track\n1, 0, Text_t, "' + "line\n" * 50 + 'end"\n1, 0, End_track'
+    records = asyncio.run(collect(ChunkReader(chunked(text.encode(), 3)).iter_records()))
+    assert records[0] == ["1, 0, Start_track\n"]
+    assert "".join(records[1]).count("\n") == 51
+    assert records[-1] == ["1, 0, End_track"]
+    assert "".join(line for record in records for line in record) == text
+
+
+def test_interleaved_streams():
+    from py_midicsv.midi.containers import Pattern
+    from py_midicsv.midi.fileio import FileWriter, read_midifile
+
+    # a MIDI file without running status resets the running status of a
+    # reader, which must not leak into an encoder working at the same time
+    out = io.BytesIO()
+    FileWriter(out, use_running_status=False).write(read_midifile("tests/sample.mid", True))
+    midi = out.getvalue()
+    rows = parse("tests/sample.mid")
+    csv_data = "".join(rows).encode()
+    Pattern.useRunningStatus = True
+    expected = encode(rows)
+
+    async def run():
+        return await asyncio.gather(
+            collect(parse_midi_stream(chunked(midi, 3))),
+            collect(parse_csv_stream(chunked(csv_data, 3))),
+        )
+
+    converted, chunks = asyncio.run(run())
+    assert b"".join(chunks) == expected
+    assert converted == parse(io.BytesIO(midi))
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from py_midicsv.batch import collect_inputs, run_batch
+
+
+def test_run_batch_reports_failures(tmp_path):
+    source = tmp_path / "in"
+    (source / "sub").mkdir(parents=True)
+    (source / "sub" / "sample.mid").write_bytes(open("tests/sample.mid", "rb").read())
+    (source / "broken.mid").write_bytes(b"not a midi file")
+
+    inputs = collect_inputs([str(source)])
+    results = list(run_batch(inputs, str(tmp_path / "out"), workers=1))
+
+    errors = {src.rsplit("/", 1)[-1]: error for src, _, error in results}
+    assert errors["sample.mid"] is None
+    assert errors["broken.mid"] is not None
+    assert (tmp_path / "out" / "sub" / "sample.csv").exists()
+    assert not (tmp_path / "out" / "broken.csv").exists()
+
+
+def test_failed_rerun_keeps_previous_output(tmp_path):
+    source = tmp_path / "song.mid"
+    source.write_bytes(open("tests/sample.mid", "rb").read())
+    output = tmp_path / "out"
+    inputs = [(str(source), "song.mid")]
+    assert [error for _, _, error in run_batch(inputs, str(output), workers=1)] == [None]
+    converted = (output / "song.csv").read_bytes()
+
+    source.write_bytes(b"not a midi file")
+    assert [error for _, _, error in run_batch(inputs, str(output), workers=1)] != [None]
+    assert (output / "song.csv").read_bytes() == converted
+    assert sorted(path.name for path in output.iterdir()) == ["song.csv"]
+
+
+def test_outputs_never_collide(tmp_path, monkeypatch):
+    sample = open("tests/sample.mid", "rb").read()
+    monkeypatch.chdir(tmp_path)
+    for path in ("a/song.mid", "b/song.mid", "b/song.midi", "c/a/song.mid"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(sample)
+
+    # plain files keep their relative path, which the directory c shares with a/song.mid
+    inputs = collect_inputs(["a/song.mid", "b/song.mid", "b/song.midi", "c"])
+    results = list(run_batch(inputs, "out", workers=1))
+
+    assert [source for source, _, _ in results] == ["a/song.mid", "b/song.mid", "b/song.midi", "c/a/song.mid"]
+    assert [error is None for _, _, error in results] == [True, True, False, False]
+    assert "b/song.mid" in results[2][2]
+    assert "a/song.mid" in results[3][2]
+    assert sorted(str(path.relative_to("out")) for path in Path("out").rglob("*.csv")) == [
+        "a/song.csv",
+        "b/song.csv",
+    ]
@@ -0,0 +1,73 @@
+import io
+import json
+
+from click.testing import CliRunner
+
+from py_midicsv.cache import ConversionCache
+from py_midicsv.cli import midicsv
+from py_midicsv.csvmidi import encode
+from py_midicsv.midi.containers import Pattern
+from py_midicsv.midicsv import parse
+
+
+def test_cache_hit_returns_same_rows(tmp_path):
+    cache = ConversionCache(str(tmp_path))
+    first = cache.midi_to_csv("tests/sample.mid")
+    second = cache.midi_to_csv("tests/sample.mid")
+    assert first == second == parse("tests/sample.mid")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ConversionCache(str(tmp_path), max_size=1)
+    cache.midi_to_csv("tests/sample.mid")
+    assert cache.stats["entries"] == 0
+    assert cache.evictions == 1
+
+
+def test_cache_keeps_running_size(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path))
+    cache.midi_to_csv("tests/sample.mid")
+    cache.midi_to_csv("tests/sample.mid", seconds=True)
+    size = cache.stats["size"]
+
+    def scan():
+        raise AssertionError("cache directory scanned below its size bound")
+
+    monkeypatch.setattr(cache, "scan", scan)
+    cache.midi_to_csv("tests/sample.mid", tracks=[1])
+    assert cache.stats["entries"] == 3
+    assert cache.stats["size"] > size
+    monkeypatch.undo()
+    assert ConversionCache(str(tmp_path)).stats == {**cache.stats, "hits": 0, "misses": 0}
+
+
+def test_cache_workers(tmp_path):
+    cache = ConversionCache(str(tmp_path))
+    assert cache.midi_to_csv("tests/sample.mid", workers=2) == parse("tests/sample.mid")
+    assert cache.midi_to_csv("tests/sample.mid") == parse("tests/sample.mid")
+    assert cache.hits == 1
+
+
+def test_cache_ignores_running_status_of_earlier_files(tmp_path):
+    rows = parse("tests/sample.mid")
+    expected = encode(rows, use_running_status=True)
+    cache = ConversionCache(str(tmp_path))
+    Pattern.useRunningStatus = False
+    try:
+        assert cache.csv_to_midi(io.StringIO("".join(rows))) == expected
+        assert ConversionCache(str(tmp_path)).csv_to_midi(io.StringIO("".join(rows))) == expected
+    finally:
+        Pattern.useRunningStatus = True
+    assert cache.csv_to_midi(io.StringIO("".join(rows)), use_running_status=False) == encode(rows, True, False)
+    assert cache.stats["entries"] == 2
+
+
+def test_cli_reports_cache_stats(tmp_path):
+    output = str(tmp_path / "sample.csv")
+    arguments = ["--cache-dir", str(tmp_path / "cache"), "--stats", "tests/sample.mid", output]
+    for hits in (0, 1):
+        result = CliRunner().invoke(midicsv, arguments)
+        assert result.exit_code == 0, result.output
+        summary = json.loads(result.stderr)
+        assert (summary["cache"]["hits"], summary["cache"]["misses"]) == (hits, 1 - hits)
@@ -0,0 +1,93 @@
+import random
+from array import array
+from types import SimpleNamespace
+
+import pytest
+
+from py_midicsv.midi import codec
+from py_midicsv.midi.events import EventRegistry, NoteOnEvent
+from py_midicsv.midi.fileio import FileReader, FileWriter, MidiIndex, read_midifile
+
+KNOWN = bytes(cmd in EventRegistry.MetaEvents for cmd in range(128))
+CLASSES = [EventRegistry.Events.get(nibble << 4) for nibble in range(16)]
+
+native = pytest.mark.skipif(not codec.NATIVE, reason="C accelerator not built")
+
+
+def describe(messages):
+    return [
+        m if isinstance(m, (tuple, str)) else (type(m), m.tick, getattr(m, "channel", None), m.data) for m in messages
+    ]
+
+
+def corrupted_tracks(count=200):
+    index = MidiIndex("tests/sample.mid")
+    rng = random.Random(0)
+    for _ in range(count):
+        data = bytearray(index.read_track_data(rng.randrange(len(index))))
+        for _ in range(rng.randrange(1, 4)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+        yield bytes(data[: rng.randrange(len(data) + 1)])
+
+
+def test_encode_track_matches_encode_midi_event():
+    for track in read_midifile("tests/sample.mid", True):
+        writer = FileWriter(None)
+        expected = b"".join(writer.encode_midi_event(event) for event in track)
+        buf, running = codec.py_encode_track(track)
+        assert (bytes(buf), running) == (expected, writer.RunningStatus)
+
+
+@native
+def test_native_encode_track_matches_python():
+    for track in read_midifile("tests/sample.mid", True):
+        for use_running_status in (True, False):
+            expected = codec.py_encode_track(track, 0x90, use_running_status)
+            assert codec.encode_track(track, 0x90, use_running_status) == expected
+
+
+@pytest.mark.parametrize("native_codec", [False, pytest.param(True, marks=native)])
+def test_encode_track_rejects_out_of_range_bytes(native_codec, monkeypatch):
+    monkeypatch.setattr(codec, "NATIVE", native_codec)
+    for event in (
+        NoteOnEvent(tick=0, channel=16 << 4, data=[60, 100]),
+        NoteOnEvent(tick=0, channel=-1, data=[60, 100]),
+        NoteOnEvent(tick=0, channel=0, data=[60, 0x100]),
+        # event classes are registered by their meta command, so this one is a stand-in
+        SimpleNamespace(tick=0, statusmsg=0xFF, metacommand=0x103, payload=b"Lead"),
+    ):
+        for running_status in (None, 0x90):
+            with pytest.raises(ValueError, match="byte must be in range"):
+                codec.encode_track([event], running_status)
+
+
+@native
+def test_native_split_track_matches_python():
+    for data in corrupted_tracks():
+        expected = codec.py_split_track(data, 0, 0, KNOWN, CLASSES)
+        messages, *rest = codec.split_track(data, 0, 0, KNOWN, CLASSES)
+        assert (describe(messages), *rest) == (describe(expected[0]), *expected[1:])
+
+
+@native
+def test_native_split_track_columns_match_python():
+    for data in corrupted_tracks():
+        results = []
+        for split_track in (codec.py_split_track, codec.split_track):
+            columns = (array("Q"), array("B"), array("Q"))
+            results.append((split_track(data, 0, 0, KNOWN, None, columns, 100), columns))
+        assert results[0] == results[1]
+
+
+def test_iter_trackbuffer_independent_of_accelerator(monkeypatch, capsys):
+    for data in corrupted_tracks(50):
+        results = []
+        for enabled in (False, codec.NATIVE):
+            monkeypatch.setattr(codec, "NATIVE", enabled)
+            events = []
+            try:
+                events.extend(FileReader().iter_trackbuffer(data, strict=False))
+            except AssertionError as e:
+                events.append(str(e))
+            results.append((describe(events), capsys.readouterr()))
+        assert results[0] == results[1]
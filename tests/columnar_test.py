@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+from py_midicsv.columnar import midi_to_table, read_table, table_to_pattern, write_table
+from py_midicsv.csvmidi import parse as csv_to_midi
+from py_midicsv.csvmidi import parse_columns
+from py_midicsv.midi.fileio import FileWriter, read_midifile
+from py_midicsv.midicsv import export_columns, parse
+
+SYSEX_ROWS = [
+    "0, 0, Header, 0, 1, 96\n",
+    "1, 0, Start_track\n",
+    "1, 10, System_exclusive, 5, 7E, 7F, 09, 01, F7\n",
+    "1, 20, System_exclusive_F7, 2, 01, 02\n",
+    "1, 20, End_track\n",
+    "0, 0, End_of_file\n",
+]
+
+
+def pattern_bytes(pattern):
+    out = io.BytesIO()
+    FileWriter(out).write(pattern)
+    return out.getvalue()
+
+
+def test_table_rows_match_csv_rows():
+    table = midi_to_table("tests/sample.mid")
+    rows = parse("tests/sample.mid")[1:-1]
+    assert len(table) == len(rows)
+    assert table.columns["type"] == [row.split(", ")[2].strip() for row in rows]
+    assert table.columns["time"] == [int(row.split(", ")[1]) for row in rows]
+
+
+def test_table_to_pattern_roundtrip():
+    expected = pattern_bytes(read_midifile("tests/sample.mid", True))
+    assert pattern_bytes(table_to_pattern(midi_to_table("tests/sample.mid"))) == expected
+
+
+def test_sysex_payload_roundtrip():
+    midi = pattern_bytes(csv_to_midi(SYSEX_ROWS))
+    table = midi_to_table(io.BytesIO(midi))
+    assert table.columns["data"][1:3] == [b"\x7e\x7f\x09\x01\xf7", b"\x01\x02"]
+    assert pattern_bytes(table_to_pattern(table)) == midi
+
+
+def test_meta_values():
+    rows = [
+        "0, 0, Header, 1, 1, 480\n",
+        "1, 0, Start_track\n",
+        "1, 0, Tempo, 500000\n",
+        "1, 0, Time_signature, 6, 3, 24, 8\n",
+        '1, 0, Key_signature, -3, "minor"\n',
+        "1, 0, End_track\n",
+        "0, 0, End_of_file\n",
+    ]
+    midi = pattern_bytes(csv_to_midi(rows))
+    table = midi_to_table(io.BytesIO(midi))
+    assert table.columns["value1"][1:4] == [500000, 6, -3]
+    assert table.columns["value2"][1:4] == [-1, 3, 1]
+    assert pattern_bytes(table_to_pattern(table)) == midi
+
+
+@pytest.mark.parametrize("extension", [".npz", ".parquet", ".arrow"])
+def test_write_read_table(tmp_path, extension):
+    pytest.importorskip("numpy" if extension == ".npz" else "pyarrow")
+    path = str(tmp_path / f"sample{extension}")
+    export_columns("tests/sample.mid", path)
+    table = read_table(path)
+    assert table.columns == midi_to_table("tests/sample.mid").columns
+    assert pattern_bytes(parse_columns(path)) == pattern_bytes(read_midifile("tests/sample.mid", True))
+    sysex = pattern_bytes(csv_to_midi(SYSEX_ROWS))
+    path = str(tmp_path / f"sysex{extension}")
+    export_columns(io.BytesIO(sysex), path)
+    assert pattern_bytes(parse_columns(path)) == sysex
+
+
+def test_unknown_extension(tmp_path):
+    with pytest.raises(ValueError):
+        write_table(midi_to_table("tests/sample.mid"), str(tmp_path / "sample.txt"))
@@ -0,0 +1,19 @@
+from py_midicsv.midi.containers import CompactTrack
+from py_midicsv.midi.events import NoteOnEvent
+from py_midicsv.midi.fileio import read_midifile
+
+
+def test_compact_track_matches_track():
+    pattern = read_midifile("tests/sample.mid", True)
+    compact = read_midifile("tests/sample.mid", True, compact=True)
+    assert all(isinstance(track, CompactTrack) for track in compact)
+    assert compact == pattern
+
+
+def test_compact_track_ticks():
+    track = CompactTrack([NoteOnEvent(tick=5, pitch=60, velocity=1), NoteOnEvent(tick=5, pitch=62, velocity=1)])
+    track.make_ticks_abs()
+    assert [event.tick for event in track] == [5, 10]
+    track.make_ticks_rel()
+    assert [event.tick for event in track] == [5, 5]
+    assert track[1].pitch == 62
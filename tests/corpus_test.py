@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from py_midicsv.batch import collect_inputs
+from py_midicsv.cli import SHARD_SIZE_HELP
+from py_midicsv.corpus import DEFAULT_SHARD_SIZE, read_corpus_file, read_corpus_rows, read_manifest, write_corpus
+from py_midicsv.midi.fileio import FileWriter
+from py_midicsv.midicsv import parse
+
+SAMPLE = "tests/sample.mid"
+
+
+def encode(pattern):
+    out = io.BytesIO()
+    FileWriter(out).write(pattern)
+    return out.getvalue()
+
+
+def corpus_inputs(tmp_path, copies=3):
+    source = tmp_path / "in"
+    source.mkdir()
+    for index in range(copies):
+        (source / f"sample{index}.mid").write_bytes(open(SAMPLE, "rb").read())
+    (source / "broken.mid").write_bytes(b"not a midi file")
+    return collect_inputs([str(source)])
+
+
+def test_corpus_csv_shards(tmp_path):
+    inputs = corpus_inputs(tmp_path)
+    output = tmp_path / "out"
+    entries = list(write_corpus(inputs, str(output), max_files=2, workers=1))
+
+    assert [entry["id"] for entry in entries] == list(range(len(inputs)))
+    manifest = read_manifest(str(output))
+    failed = [entry for entry in manifest.values() if "error" in entry]
+    assert [entry["path"] for entry in failed] == ["broken.mid"]
+    shards = {entry["shard"] for entry in manifest.values() if "error" not in entry}
+    assert shards == {"shard-00000.csv", "shard-00001.csv"}
+
+    rows = parse(SAMPLE)
+    expected = open(SAMPLE, "rb").read()
+    for file_id, entry in manifest.items():
+        if "error" in entry:
+            with pytest.raises(ValueError):
+                read_corpus_file(str(output), file_id)
+            continue
+        assert entry["rows"] == len(rows)
+        assert entry["tracks"] + entry["events"] == len(rows) - 2
+        assert read_corpus_rows(str(output), file_id)[:-1] == rows[:-1]
+        assert encode(read_corpus_file(str(output), file_id)) == expected
+
+
+def test_corpus_columnar_shards(tmp_path):
+    pytest.importorskip("numpy")
+    inputs = corpus_inputs(tmp_path, copies=2)
+    output = tmp_path / "out"
+    list(write_corpus(inputs, str(output), extension=".npz", workers=1))
+
+    expected = open(SAMPLE, "rb").read()
+    for file_id, entry in read_manifest(str(output)).items():
+        if "error" not in entry:
+            assert entry["shard"] == "shard-00000.npz"
+            assert encode(read_corpus_file(str(output), file_id)) == expected
+
+
+def test_corpus_columnar_mixed_headers(tmp_path):
+    pytest.importorskip("numpy")
+    sample = open(SAMPLE, "rb").read()
+    # same events at another resolution, which the shard header cannot hold as well
+    other = sample[:12] + (960).to_bytes(2, "big") + sample[14:]
+    source = tmp_path / "in"
+    source.mkdir()
+    (source / "a.mid").write_bytes(sample)
+    (source / "b.mid").write_bytes(other)
+    output = tmp_path / "out"
+    list(write_corpus(collect_inputs([str(source)]), str(output), extension=".npz", workers=2))
+
+    manifest = read_manifest(str(output))
+    assert {entry["shard"] for entry in manifest.values()} == {"shard-00000.npz"}
+    assert [entry["resolution"] for entry in manifest.values()] == [480, 960]
+    assert encode(read_corpus_file(str(output), 0)) == sample
+    assert encode(read_corpus_file(str(output), 1)) == other
+
+
+def test_cli_shard_size_default():
+    assert f"[default: {DEFAULT_SHARD_SIZE >> 20}]" in SHARD_SIZE_HELP
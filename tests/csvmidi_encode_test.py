@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from py_midicsv.csvmidi import encode, parse, write
+from py_midicsv.midi.fileio import FileWriter
+from py_midicsv.midicsv import parse as midi_to_csv
+
+ROWS = [
+    "0, 0, Header, 1, 1, 96\n",
+    "1, 0, Start_track\n",
+    "# comment\n",
+    '1, 0, Title_t, "multi\n',
+    'line, ""quoted"""\n',
+    "1, 0, Program_c, 2, 5\n",
+    "1, 0, Note_on_c, 2, 60, 100\n",
+    "1, 200, Pitch_bend_c, 2, 1000\n",
+    "1, 300, Note_off_c, 2, 60, 0\n",
+    "1, 300, System_exclusive, 2, 01, F7\n",
+    "1, 300, End_track\n",
+    "0, 0, End_of_file",
+]
+
+
+def pattern_bytes(rows):
+    out = io.BytesIO()
+    FileWriter(out).write(parse(rows))
+    return out.getvalue()
+
+
+def test_encode_matches_filewriter():
+    assert encode(ROWS) == pattern_bytes(ROWS)
+
+
+def test_encode_roundtrip_sample():
+    rows = midi_to_csv("tests/sample.mid")
+    assert encode(rows) == pattern_bytes(rows)
+
+
+class Pipe(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+def test_write_streams_in_blocks():
+    rows = midi_to_csv("tests/sample.mid")
+    out = io.BytesIO()
+    write(rows, out, blocksize=16)
+    assert out.getvalue() == pattern_bytes(rows)
+
+
+def test_write_unseekable_output():
+    out = Pipe()
+    write(ROWS, out)
+    assert out.getvalue() == pattern_bytes(ROWS)
+
+
+def test_rows_before_start_track():
+    for row in ("1, 0, Note_on_c, 2, 60, 100\n", '1, 0, Title_t, "title"\n'):
+        rows = [ROWS[0], row, *ROWS[1:]]
+        for convert in (parse, encode):
+            with pytest.raises(UnboundLocalError):
+                convert(rows)
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from py_midicsv.midi.events import Event, SysexEvent
+from py_midicsv.midi.fast import EVENT_COLUMNS, read_array, read_columns
+from py_midicsv.midi.fileio import read_midifile
+from py_midicsv.midicsv import parse
+
+
+def channel_rows(path):
+    rows = []
+    for index, track in enumerate(read_midifile(path, True)):
+        tick = 0
+        for event in track:
+            tick += event.tick
+            if isinstance(event, Event) and not isinstance(event, SysexEvent):
+                data2 = event.data[1] if len(event.data) > 1 else 0
+                rows.append((index, tick, event.statusmsg, event.channel, event.data[0], data2))
+    return rows
+
+
+def test_read_columns_matches_object_path():
+    result = read_columns("tests/sample.mid")
+    columns = [result.events[name] for name, _ in EVENT_COLUMNS]
+    assert list(zip(*columns)) == channel_rows("tests/sample.mid")
+    assert [row[3] for row in result.meta if row[2] == 0xFF][:3] == [0x03, 0x51, 0x58]
+
+
+def test_read_array_matches_object_path():
+    pytest.importorskip("numpy")
+    result = read_array("tests/sample.mid")
+    assert [tuple(int(x) for x in row) for row in result.events] == channel_rows("tests/sample.mid")
+
+
+def test_warnings_give_file_positions(capsys):
+    # an unknown status byte in the first event of the track
+    body = b"\x00\xf4\x00\xff\x2f\x00"
+    midi = b"MThd\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60MTrk" + len(body).to_bytes(4, "big") + body
+    read_columns(io.BytesIO(midi), False)
+    fast = capsys.readouterr().err
+    parse(io.BytesIO(midi), False)
+    assert capsys.readouterr().err == fast == "Warning: Unknown MIDI Event 244 at position 24\n"
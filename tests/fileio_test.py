@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from py_midicsv.midi.fileio import BufferFile, iter_midifile, read_midifile
+from py_midicsv.midicsv import iter_parse
+
+
+def test_iter_midifile_matches_read_midifile():
+    pattern = read_midifile("tests/sample.mid", True)
+    expected = []
+    for index, track in enumerate(pattern):
+        abstick = 0
+        for event in track:
+            abstick += event.tick
+            expected.append((index, abstick, event))
+    assert list(iter_midifile("tests/sample.mid")) == expected
+
+
+def test_read_midifile_mmap(monkeypatch):
+    mappings = []
+    original = BufferFile.map.__func__
+
+    def map(cls, file):
+        buffer = original(cls, file)
+        mappings.append(buffer._mapping)
+        return buffer
+
+    monkeypatch.setattr(BufferFile, "map", classmethod(map))
+    assert read_midifile("tests/sample.mid", True, use_mmap=True) == read_midifile("tests/sample.mid", True)
+    assert list(iter_midifile("tests/sample.mid", use_mmap=True))
+    rows = iter_parse("tests/sample.mid", use_mmap=True)
+    assert next(rows).startswith("0, 0, Header")
+    rows.close()
+    assert len(mappings) == 3
+    assert all(mapping.closed for mapping in mappings)
+
+
+def test_read_midifile_buffer():
+    from py_midicsv.midi.fileio import BufferFile
+
+    with open("tests/sample.mid", "rb") as f:
+        data = f.read()
+    assert read_midifile(BufferFile(data), True) == read_midifile("tests/sample.mid", True)
+
+
+def test_read_midifile_parallel():
+    from py_midicsv.midi.containers import CompactTrack
+
+    pattern = read_midifile("tests/sample.mid", True)
+    assert read_midifile("tests/sample.mid", True, workers=2) == pattern
+    compact = read_midifile("tests/sample.mid", True, workers=2, compact=True)
+    assert all(isinstance(track, CompactTrack) for track in compact)
+    assert compact == pattern
+    with pytest.raises(ValueError, match="use_mmap"):
+        read_midifile("tests/sample.mid", True, use_mmap=True, workers=2)
+
+
+def test_read_midifile_parallel_stream():
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, "rb") as stream:
+        with open(write_fd, "wb") as pipe:
+            pipe.write(open("tests/sample.mid", "rb").read(64))
+        with pytest.raises(ValueError, match="seekable"):
+            read_midifile(stream, True, workers=2)
+
+
+def test_midi_index_read_track():
+    from py_midicsv.midi.fileio import MidiIndex
+
+    index = MidiIndex("tests/sample.mid")
+    pattern = read_midifile("tests/sample.mid", True)
+    assert len(index) == len(pattern)
+    assert index.read_track(3) == pattern[3]
+
+
+def test_iter_trackbuffer_matches_trackiter():
+    from py_midicsv.midi.fileio import FileReader, MidiIndex, Trackiter
+
+    index = MidiIndex("tests/sample.mid")
+    for i in range(len(index)):
+        data = index.read_track_data(i)
+        reader = FileReader()
+        reader.RunningStatus = None
+        trackdata = Trackiter(data)
+        expected = []
+        while True:
+            try:
+                event = reader.parse_midi_event(trackdata)
+            except StopIteration:
+                break
+            if event:
+                expected.append(event)
+        assert list(FileReader().iter_trackbuffer(data)) == expected
+
+
+def test_meta_payloads_are_decoded_lazily():
+    import pickle
+
+    from py_midicsv.midi.events import AbstractEvent, MetaEventWithText, SysexEvent
+
+    pattern = read_midifile("tests/sample.mid", True)
+    events = [event for track in pattern for event in track if isinstance(event, (MetaEventWithText, SysexEvent))]
+    assert events
+    for event in events:
+        raw = event.payload
+        assert isinstance(raw, bytes)
+        restored = pickle.loads(pickle.dumps(event))
+        for copy in (event, restored):
+            try:
+                AbstractEvent.data.__get__(copy)
+            except AttributeError:
+                pass
+            else:
+                raise AssertionError(f"{copy!r} was decoded eagerly")
+        assert event.data == list(raw)
+        assert event.data is event.data
+        assert restored == event
+        if isinstance(event, MetaEventWithText):
+            assert event.text == raw
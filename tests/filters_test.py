@@ -0,0 +1,65 @@
+import io
+
+from py_midicsv.midi.events import MetaEvent, NoteOnEvent, SetTempoEvent
+from py_midicsv.midi.fileio import read_midifile, read_tempo_map
+from py_midicsv.midi.filters import EventFilter
+from py_midicsv.midicsv import parse
+
+
+def absolute_events(pattern):
+    events = []
+    for index, track in enumerate(pattern):
+        tick = 0
+        for event in track:
+            tick += event.tick
+            events.append((index, tick, event))
+    return events
+
+
+def describe(events):
+    return [(index, tick, type(event), event.data, getattr(event, "channel", None)) for index, tick, event in events]
+
+
+def test_read_midifile_filter_matches_full_decode():
+    event_filter = EventFilter(start=5000, end=60000, channels={9}, types=[NoteOnEvent, MetaEvent], tracks=[0, 3])
+    full = read_midifile("tests/sample.mid", True)
+    filtered = read_midifile("tests/sample.mid", True, event_filter=event_filter)
+    assert len(filtered) == len(full)
+    assert not any(filtered[index] for index in (1, 2, 4, 5))
+    expected = [
+        (index, tick, event)
+        for index, tick, event in absolute_events(full)
+        if index in (0, 3)
+        and 5000 <= tick < 60000
+        and (isinstance(event, MetaEvent) or isinstance(event, NoteOnEvent) and event.channel == 9)
+    ]
+    assert expected
+    assert describe(absolute_events(filtered)) == describe(expected)
+
+
+def test_parse_filter_by_seconds():
+    tempo_map = read_tempo_map("tests/sample.mid")
+    rows = parse("tests/sample.mid", event_filter=EventFilter(start_seconds=10, end_seconds=20))
+    times = [int(row.split(", ")[1]) for row in rows if "Start_track" not in row][1:-1]
+    assert times
+    assert all(10 <= tempo_map.tick_to_seconds(tick) < 20 for tick in times)
+
+
+def test_tempo_prepass_only_decodes_tempo_events():
+    pattern = read_midifile("tests/sample.mid", True, event_filter=EventFilter(types=[SetTempoEvent]))
+    assert all(isinstance(event, SetTempoEvent) for track in pattern for event in track)
+
+
+def test_tempo_prepass_is_quiet(capsys):
+    # a tempo change, and an unknown meta event past the end that is reported with a warning
+    body = b"\x00\xff\x51\x03\x07\xa1\x20\x00\xff\x2f\x00\x00\xff\x60"
+    midi = b"MThd\x00\x00\x00\x06\x00\x00\x00\x01\x01\xe0MTrk" + len(body).to_bytes(4, "big") + body
+    rows = parse(io.BytesIO(midi), False, event_filter=EventFilter(end_seconds=10))
+    assert [row.split(", ")[2].strip() for row in rows] == [
+        "Header",
+        "Start_track",
+        "Tempo",
+        "End_track",
+        "End_of_file",
+    ]
+    assert capsys.readouterr().err.count("Unknown Meta MIDI Event 96") == 1
@@ -0,0 +1,55 @@
+import io
+from collections import Counter
+
+from py_midicsv import instrumentation
+from py_midicsv.csvmidi import encode
+from py_midicsv.instrumentation import TimedFile, collect, profiling
+from py_midicsv.midicsv import parse
+
+SAMPLE = "tests/sample.mid"
+
+
+def test_collect_midi_to_csv():
+    calls = []
+    with open(SAMPLE, "rb") as f, collect([lambda name, info: calls.append((name, info))]) as stats:
+        rows = parse(TimedFile(f, stats))
+    assert instrumentation.current is None
+
+    identifiers = Counter(row.split(", ")[2].strip() for row in rows)
+    track_count = identifiers.pop("Start_track")
+    del identifiers["Header"], identifiers["End_of_file"]
+    assert stats.events == identifiers
+    assert set(stats.timings) >= {"header", "decode", "format", "read"}
+    assert stats.bytes_in == len(open(SAMPLE, "rb").read())
+
+    tracks = [info for name, info in calls if name == "track"]
+    assert [info["track"] for info in tracks] == list(range(1, track_count + 1))
+    assert sum(info["events"] for info in tracks) == sum(identifiers.values())
+    assert calls[-1] == ("summary", stats.as_dict())
+
+
+def test_collect_csv_to_midi():
+    rows = parse(SAMPLE)
+    output = io.BytesIO()
+    with collect() as stats:
+        encoded = encode(rows)
+        TimedFile(output, stats).write(encoded)
+    assert stats.events == Counter(parse_stats_events(SAMPLE))
+    assert "encode" in stats.timings
+    assert stats.bytes_out == len(encoded) == len(output.getvalue())
+
+
+def parse_stats_events(path):
+    with collect() as stats:
+        parse(path)
+    return stats.events
+
+
+def test_profiling_collapsed_stacks(tmp_path):
+    path = tmp_path / "profile.folded"
+    with profiling(str(path)):
+        parse(SAMPLE)
+    lines = path.read_text().splitlines()
+    assert lines
+    assert any("format_events" in line for line in lines)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
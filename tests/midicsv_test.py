@@ -0,0 +1,93 @@
+import io
+
+from py_midicsv.csvmidi import parse as csv_to_midi
+from py_midicsv.midi import fileio
+from py_midicsv.midi.containers import Pattern
+from py_midicsv.midi.fileio import read_midifile
+from py_midicsv.midicsv import iter_parse, parse
+
+
+def encode(pattern):
+    out = io.BytesIO()
+    fileio.FileWriter(out).write(pattern)
+    return out.getvalue()
+
+
+def test_iter_parse_matches_baseline():
+    # written by the list-building implementation that iter_parse replaced
+    with open("tests/sample.csv") as f:
+        expected = f.readlines()
+    assert list(iter_parse("tests/sample.mid")) == expected
+    assert parse("tests/sample.mid") == expected
+
+
+def test_iter_parse_file_object():
+    with open("tests/sample.mid", "rb") as f:
+        rows = iter_parse(f)
+        assert next(rows).startswith("0, 0, Header")
+        assert list(rows)[-1] == "0, 0, End_of_file"
+
+
+def test_format_events_matches_converters():
+    from py_midicsv.events import midi_to_csv_map
+    from py_midicsv.midi.events import (
+        ChannelAfterTouchEvent,
+        ControlChangeEvent,
+        NoteOnEvent,
+        PitchWheelEvent,
+        TrackNameEvent,
+    )
+    from py_midicsv.midicsv import format_events
+
+    events = [
+        TrackNameEvent(tick=0, data=list(b"Lead")),
+        NoteOnEvent(tick=0, channel=3, pitch=60, velocity=100),
+        ControlChangeEvent(tick=5, channel=3, control=7, value=90),
+        PitchWheelEvent(tick=10, channel=3, pitch=-200),
+        ChannelAfterTouchEvent(tick=0, channel=3, value=12),
+    ]
+    expected = []
+    abstime = 0
+    for event in events:
+        abstime += event.tick
+        expected.append(midi_to_csv_map[type(event)](2, abstime, event))
+    assert format_events(2, events) == (expected, 15)
+
+
+def test_parse_selected_tracks():
+    rows = parse("tests/sample.mid", tracks=[0, 2])
+    assert rows[0] == "0, 0, Header, 1, 2, 480\n"
+    expected = [row for row in parse("tests/sample.mid") if row.split(",")[0] in ("1", "3")]
+    assert rows[1:-1] == expected
+
+
+def test_selected_tracks_roundtrip():
+    # rows keep their original track number, csvmidi numbers tracks by their Start_track rows
+    full = read_midifile("tests/sample.mid", True)
+    selected = Pattern(tracks=[full[2], full[4]], resolution=full.resolution, format=full.format)
+    pattern = csv_to_midi(parse("tests/sample.mid", tracks=[2, 4]))
+    assert len(pattern) == 2
+    assert encode(pattern) == encode(selected)
+    assert [row.split(", ")[0] for row in parse(io.BytesIO(encode(pattern))) if "Start_track" in row] == ["1", "2"]
+
+
+def test_midi_index_reuses_handle(monkeypatch):
+    opened = []
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(fileio, "open", counting_open, raising=False)
+    with fileio.MidiIndex("tests/sample.mid") as index:
+        index.read()
+    assert opened == ["tests/sample.mid"]
+    assert index.handle.closed
+
+
+def test_parse_seconds_column():
+    rows = parse("tests/sample.mid", seconds=True)
+    plain = parse("tests/sample.mid")
+    assert rows[0] == plain[0]
+    assert rows[-2] == "6, 122461, End_track, 127.563542\n"
+    assert [row.rsplit(",", 1)[0] + "\n" for row in rows[1:-1]] == plain[1:-1]
@@ -0,0 +1,100 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from py_midicsv.csvmidi import encode
+from py_midicsv.midi.fileio import FileWriter, read_midifile
+from py_midicsv.midicsv import parse
+from py_midicsv.server import Client, ConversionServer, ServerError, convert_request
+
+SAMPLE = "tests/sample.mid"
+
+
+@pytest.fixture(scope="module")
+def server_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("server") / "midicsv.sock")
+    server = ConversionServer(path, workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    assert not os.path.exists(path)
+
+
+def test_midi_to_csv(server_path):
+    expected = "".join(parse(SAMPLE)).encode()
+    with Client(server_path) as client:
+        assert client.midi_to_csv(SAMPLE) == expected
+        with open(SAMPLE, "rb") as f:
+            assert client.midi_to_csv(f.read()) == expected
+        rows = client.midi_to_csv(SAMPLE, tracks=[1], seconds=True)
+    assert rows == "".join(parse(SAMPLE, tracks=[1], seconds=True)).encode()
+
+
+def test_csv_to_midi(server_path, tmp_path):
+    rows = parse(SAMPLE)
+    destination = str(tmp_path / "sample.mid")
+    with Client(server_path) as client:
+        assert client.csv_to_midi("".join(rows).encode()) == encode(rows)
+        assert client.csv_to_midi("".join(rows).encode(), destination) == b""
+    with open(destination, "rb") as f:
+        assert f.read() == encode(rows)
+
+
+def test_csv_to_midi_ignores_earlier_requests(server_path, tmp_path):
+    # a file without running status makes the worker's decoder clear `Pattern.useRunningStatus`
+    plain = str(tmp_path / "plain.mid")
+    with open(plain, "wb") as f:
+        FileWriter(f, use_running_status=False).write(read_midifile(SAMPLE, True))
+    rows = parse(SAMPLE)
+    with Client(server_path) as client:
+        client.midi_to_csv(plain)
+        assert client.csv_to_midi("".join(rows).encode()) == encode(rows, use_running_status=True)
+
+
+def test_errors_keep_connection(server_path, tmp_path):
+    destination = str(tmp_path / "broken.csv")
+    with Client(server_path) as client:
+        with pytest.raises(ServerError, match="Bad header"):
+            client.midi_to_csv(b"not a midi file", destination)
+        assert not os.path.exists(destination)
+        with pytest.raises(ServerError, match="Unknown operation"):
+            client.request({"op": "transpose"})
+        assert client.midi_to_csv(SAMPLE) == "".join(parse(SAMPLE)).encode()
+
+
+def test_failures_keep_existing_output(tmp_path):
+    destination = tmp_path / "existing.mid"
+    destination.write_bytes(b"keep me")
+    output = str(destination)
+    failing = [
+        ({"op": "csv_to_midi", "input": str(tmp_path / "missing.csv"), "output": output}, b"", FileNotFoundError),
+        ({"op": "transpose", "output": output}, b"", ValueError),
+        ({"op": "midi_to_csv", "output": output}, b"not a midi file", TypeError),
+        ({"op": "csv_to_midi", "output": output}, b"0, 0, Header, 1, 1\n1, 0, Unknown_event\n", IndexError),
+    ]
+    for request, data, error in failing:
+        with pytest.raises(error):
+            convert_request(request, data)
+        assert destination.read_bytes() == b"keep me"
+    assert os.listdir(tmp_path) == ["existing.mid"]
+
+    rows = "".join(parse(SAMPLE)).encode()
+    assert convert_request({"op": "csv_to_midi", "output": output}, rows) == b""
+    assert destination.read_bytes() == encode(parse(SAMPLE))
+
+
+def test_socket_in_use(server_path, tmp_path):
+    with pytest.raises(OSError, match="listening"):
+        ConversionServer(server_path, workers=1)
+
+    # a socket nobody listens on is left behind by a server that was killed
+    stale = str(tmp_path / "stale.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.bind(stale)
+    server = ConversionServer(stale, workers=1)
+    server.server_close()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import py_midicsv
+
+# cumulative import time of the command line module, in microseconds; it was
+# over 250ms while every converter and numpy were loaded on startup. Wall-clock
+# times depend on the machine, so the budget is only checked when it is set.
+IMPORT_BUDGET = int(os.environ.get("MIDICSV_IMPORT_BUDGET", 0))
+# modules only needed by some conversions, which are slow to import
+DEFERRED_MODULES = ("numpy", "pyarrow", "concurrent.futures", "cProfile", "pprint", "py_midicsv.csvmidi")
+
+
+def import_times(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports():
+    times = import_times("import py_midicsv.cli")
+    assert not [name for name in DEFERRED_MODULES if name in times]
+    assert "py_midicsv.midi.fileio" not in times
+
+
+@pytest.mark.skipif(not IMPORT_BUDGET, reason="set MIDICSV_IMPORT_BUDGET (microseconds) to check import time")
+def test_cli_import_budget():
+    assert import_times("import py_midicsv.cli")["py_midicsv.cli"] < IMPORT_BUDGET
+
+
+def test_star_import_exports_note_names():
+    namespace = {}
+    exec("from py_midicsv.midi.constants import *", namespace)
+    assert namespace["NOTE_NAME_MAP_SHARP"]["C_0"] == namespace["C_0"] == 0
+    assert namespace["NOTE_VALUE_MAP_FLAT"][1] == "Db_0.08333333333333333"
+
+
+def test_conversion_imports():
+    times = import_times("import py_midicsv.midicsv")
+    assert not [name for name in DEFERRED_MODULES if name in times]
+
+
+def test_lazy_exports():
+    from py_midicsv.midicsv import parse
+
+    assert py_midicsv.midi_to_csv is parse
+    assert py_midicsv.midicsv.parse is parse
+    assert "csv_to_midi" in dir(py_midicsv)
+    with pytest.raises(AttributeError):
+        py_midicsv.missing  # noqa: B018
@@ -0,0 +1,56 @@
+import pytest
+
+from py_midicsv.midi.containers import Pattern, Track
+from py_midicsv.midi.events import NoteOnEvent, SetTempoEvent
+from py_midicsv.midi.tempo import TempoMap
+
+
+def tempo(tick, mpqn):
+    event = SetTempoEvent(tick=tick)
+    event.mpqn = mpqn
+    return event
+
+
+def test_tick_to_seconds_across_tempo_changes():
+    tempo_map = TempoMap(480, [(960, 250000), (0, 1000000)])
+    assert tempo_map.tick_to_seconds(480) == 1.0
+    assert tempo_map.tick_to_seconds(960) == 2.0
+    assert tempo_map.tick_to_seconds(1440) == 2.25
+    assert tempo_map.tick_to_seconds([0, 1440]) == [0.0, 2.25]
+    assert tempo_map.seconds_to_tick(2.25) == 1440
+    assert tempo_map.seconds_to_tick([1.0, 2.0]) == [480, 960]
+
+
+def test_from_pattern_relative_ticks():
+    track = Track([tempo(0, 600000), NoteOnEvent(tick=480), tempo(480, 300000)])
+    other = Track([tempo(1920, 1000000)])
+    tempo_map = TempoMap.from_pattern(Pattern([track, other], resolution=480))
+    assert list(zip(tempo_map.ticks, tempo_map.mpqns)) == [(0, 600000), (960, 300000), (1920, 1000000)]
+    assert tempo_map.tick_to_seconds(2400) == pytest.approx(0.6 * 2 + 0.3 * 2 + 1.0)
+
+
+def test_smpte_division():
+    # 25 frames per second, 40 ticks per frame: one tick per millisecond
+    tempo_map = TempoMap(((256 - 25) << 8) | 40, [(0, 1000000)])
+    assert tempo_map.tick_to_seconds(1500) == pytest.approx(1.5)
+    assert tempo_map.seconds_to_tick(0.25) == pytest.approx(250)
+
+
+def test_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    tempo_map = TempoMap(480, [(0, 1000000), (960, 250000)])
+    ticks = np.array([0, 480, 960, 1440])
+    seconds = tempo_map.tick_to_seconds(ticks)
+    assert seconds.tolist() == [0.0, 1.0, 2.0, 2.25]
+    assert tempo_map.seconds_to_tick(seconds).tolist() == ticks.tolist()
+
+
+def test_zero_division(capsys):
+    with pytest.raises(ValueError, match="0 ticks per quarter note"):
+        TempoMap(0)
+    with pytest.raises(ValueError, match="0 ticks per frame"):
+        TempoMap(0xE700)
+    tempo_map = TempoMap(0, [(0, 1000000)], strict=False)
+    assert tempo_map.tick_to_seconds(3) == 3.0
+    assert tempo_map.seconds_to_tick(3.0) == 3
+    assert "assuming 1 tick per quarter note" in capsys.readouterr().err
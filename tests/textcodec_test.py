@@ -0,0 +1,63 @@
+import random
+import struct
+
+import pytest
+
+from py_midicsv.textcodec import escape, unescape
+
+
+# the original per-character implementations, kept as a reference
+def reference_escape(bytestr):
+    csv_str = ""
+    for byte in bytestr:
+        if byte < 32 or byte > 126:
+            csv_str += f"\\{byte:03o}"
+        elif byte == ord('"'):
+            csv_str += '""'
+        elif byte == ord("\\"):
+            csv_str += "\\\\"
+        else:
+            csv_str += chr(byte)
+    return csv_str
+
+
+def reference_unescape(text):
+    midi_bytes = b""
+    X = iter(text)
+    for c in X:
+        if c == "\\":
+            cc = next(X)
+            if cc == "\\":
+                midi_bytes += struct.pack("B", ord(cc))
+            else:
+                Nstr = cc + next(X) + next(X)
+                midi_bytes += struct.pack("B", int(Nstr, base=8))
+        else:
+            midi_bytes += struct.pack("B", ord(c))
+    return midi_bytes
+
+
+def blobs():
+    rng = random.Random(0)
+    yield b""
+    yield b"plain ASCII text"
+    yield bytes(range(256))
+    yield 'café "quoted" \\ back\\slash'.encode()
+    for _ in range(50):
+        yield bytes(rng.randrange(256) for _ in range(rng.randrange(200)))
+
+
+def test_matches_reference():
+    for data in blobs():
+        text = escape(data)
+        assert text == reference_escape(data)
+        assert escape(list(data)) == text
+        assert unescape(text) == reference_unescape(text)
+        # doubled quotes are undone by the CSV reader
+        assert unescape(text.replace('""', '"')) == data
+
+
+@pytest.mark.parametrize("text", ["\\", "trailing \\01", "\\9ab", "\\400", "\\x41"])
+def test_invalid_escapes(text):
+    with pytest.raises(ValueError):
+        unescape(text)